@@ -4,95 +4,305 @@ Module for generating audio from text using Google Cloud Text-to-Speech.
 import asyncio
 import os
 import subprocess
-from typing import List, Dict
+import tempfile
+from typing import Callable, List, Dict, Optional, Tuple
 from google.cloud import texttospeech
 from dotenv import load_dotenv
 
+try:
+    from .tts_client import TTSClientPool, beta_client_factory, close_tts_pool, get_tts_pool
+    from .tts_scheduler import TTSScheduler
+    from .clip_cache import ClipCache, clip_key
+    from .ssml_batcher import build_batches, build_ssml, clip_spans, split_clip
+    from .line_chunker import chunk_text, join_clips
+    from .pcm_assembler import SAMPLE_RATE, PCMAssembler, decode_audio
+    from .tts_providers import EdgeTTSProvider, GTTSProvider, ProviderChain
+    from .voices import VOICES
+except ImportError:
+    from tts_client import TTSClientPool, beta_client_factory, close_tts_pool, get_tts_pool
+    from tts_scheduler import TTSScheduler
+    from clip_cache import ClipCache, clip_key
+    from ssml_batcher import build_batches, build_ssml, clip_spans, split_clip
+    from line_chunker import chunk_text, join_clips
+    from pcm_assembler import SAMPLE_RATE, PCMAssembler, decode_audio
+    from tts_providers import EdgeTTSProvider, GTTSProvider, ProviderChain
+    from voices import VOICES
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Voice Configuration - Using Google Cloud WaveNet voices (most natural)
-VOICES = {
-    "Zeta": {
-        "language_code": "en-US",
-        "name": "en-US-Wavenet-F",  # WaveNet female voice (most natural)
-        "pitch": 2.5,  # Moderate-high pitch for energetic feel
-        "speaking_rate": 1.08,  # Slightly faster for enthusiasm
-        "effects_profile": ["headphone-class-device"]  # Optimize for headphones
-    },
-    "Quill": {
-        "language_code": "en-US",
-        "name": "en-US-Wavenet-D",  # WaveNet male voice (most natural)
-        "pitch": -2.0,  # Moderate lower pitch for distinction
-        "speaking_rate": 0.95,  # Slightly slower for measured delivery
-        "effects_profile": ["headphone-class-device"]  # Optimize for headphones
-    }
-}
-
-async def generate_audio_for_line(text: str, speaker: str, index: int, output_dir: str) -> str:
+# Encoding requested from Google Cloud TTS (part of the clip cache key)
+AUDIO_ENCODING = "MP3"
+# Google Cloud TTS returns MP3 at a constant 32 kbps, so a clip's duration follows from its size
+GOOGLE_MP3_BITRATE = 32000
+
+def _voice_settings(tts, speaker: str, encoding: str = AUDIO_ENCODING, sample_rate: int = 0):
     """
-    Generate audio for a single line of dialogue using Google Cloud TTS.
-    Falls back to gTTS if Google Cloud TTS fails.
+    Voice and audio config for a speaker, built from the given API module
+    (v1 or v1beta1). sample_rate 0 keeps the voice's native rate.
+    """
+    # Get voice config for speaker
+    voice_config = VOICES.get(speaker, VOICES["Zeta"])
+    
+    # Configure voice parameters
+    voice = tts.VoiceSelectionParams(
+        language_code=voice_config["language_code"],
+        name=voice_config["name"]
+    )
+    
+    # Configure audio settings
+    audio_config = tts.AudioConfig(
+        audio_encoding=tts.AudioEncoding[encoding],
+        sample_rate_hertz=sample_rate,
+        pitch=voice_config["pitch"],
+        speaking_rate=voice_config["speaking_rate"],
+        effects_profile_id=voice_config.get("effects_profile", [])
+    )
+    return voice, audio_config
+
+def _write_audio(audio_content: bytes, output_file: str):
+    # Replace rather than truncate: the old file may be a clip linked from the cache
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, "wb") as out:
+        out.write(audio_content)
+    os.replace(tmp_file, output_file)
+
+def _synthesize_google(client, text: str, speaker: str, output_file: str):
+    """Synthesize one line with Google Cloud TTS and write the MP3 (blocking)."""
+    voice, audio_config = _voice_settings(texttospeech, speaker)
+    
+    # Perform the text-to-speech request
+    response = client.synthesize_speech(
+        input=texttospeech.SynthesisInput(text=text),
+        voice=voice,
+        audio_config=audio_config
+    )
+    _write_audio(response.audio_content, output_file)
+
+def _synthesize_google_pcm(client, text: str, speaker: str, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Synthesize one line as LINEAR16 at sample_rate and return the 16-bit samples (blocking)."""
+    voice, audio_config = _voice_settings(texttospeech, speaker, encoding="LINEAR16", sample_rate=sample_rate)
+    response = client.synthesize_speech(
+        input=texttospeech.SynthesisInput(text=text),
+        voice=voice,
+        audio_config=audio_config
+    )
+    return decode_audio(response.audio_content, sample_rate)
+
+def _synthesize_google_ssml(client, ssml: str, speaker: str, output_file: str) -> Dict[str, float]:
     """
-    output_file = os.path.join(output_dir, f"{index:03d}_{speaker}.mp3")
+    Synthesize an SSML batch with a v1beta1 client and write the MP3
+    (blocking). Returns the time in seconds of every <mark> by name.
+    """
+    from google.cloud import texttospeech_v1beta1
+    voice, audio_config = _voice_settings(texttospeech_v1beta1, speaker)
+    response = client.synthesize_speech(request=texttospeech_v1beta1.SynthesizeSpeechRequest(
+        input=texttospeech_v1beta1.SynthesisInput(ssml=ssml),
+        voice=voice,
+        audio_config=audio_config,
+        enable_time_pointing=[texttospeech_v1beta1.SynthesizeSpeechRequest.TimepointType.SSML_MARK]
+    ))
+    _write_audio(response.audio_content, output_file)
+    return {timepoint.mark_name: timepoint.time_seconds for timepoint in response.timepoints}
+
+async def _synthesize_chunks(chunks: List[str], speaker: str, label: str, output_file: str,
+                             pool: TTSClientPool, scheduler: Optional[TTSScheduler],
+                             on_start: Callable[[], None] = lambda: None):
+    """Synthesize the chunks of an over-long line concurrently and join them into output_file."""
+    part_files = [f"{output_file}.part{n}.mp3" for n in range(len(chunks))]
+    
+    async def run_part(n: int):
+        def run():
+            on_start()
+            _synthesize_google(pool.client(), chunks[n], speaker, part_files[n])
+        if scheduler:
+            await scheduler.run(run, cost=len(chunks[n]), label=f"{label} part {n + 1}/{len(chunks)}")
+        else:
+            await asyncio.to_thread(run)
     
-    # Try Google Cloud TTS first
     try:
+        await asyncio.gather(*(run_part(n) for n in range(len(chunks))))
+        await asyncio.to_thread(join_clips, part_files, output_file)
+    finally:
+        for part_file in part_files:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+
+def _clip_path(output_dir: str, index: int, speaker: str) -> str:
+    return os.path.join(output_dir, f"{index:03d}_{speaker}.mp3")
+
+def _clip_key(text: str, speaker: str) -> str:
+    return clip_key(text, VOICES.get(speaker, VOICES["Zeta"]), AUDIO_ENCODING)
+
+def _record_duration(durations: Optional[Dict[int, float]], index: int, output_file: str):
+    """Note the duration of a Google clip for duration_estimator calibration, without probing it."""
+    if durations is not None:
+        durations[index] = os.path.getsize(output_file) * 8 / GOOGLE_MP3_BITRATE
+
+class GoogleTTSProvider:
+    """Google Cloud TTS with the speaker's WaveNet voice, for tts_providers.ProviderChain."""
+    
+    name = "google"
+    
+    def __init__(self, pool: TTSClientPool, scheduler: Optional[TTSScheduler] = None):
+        self.pool = pool
+        self.scheduler = scheduler
+    
+    async def synthesize(self, text: str, speaker: str, output_file: str,
+                         on_start: Callable[[], None] = lambda: None, label: str = "line"):
+        chunks = chunk_text(text)
+        if len(chunks) > 1:
+            # Too long for one request: synthesize the parts in parallel, in the same voice
+            print(f"[INFO] {label.capitalize()} is over the TTS input limit; synthesizing it in {len(chunks)} parts.")
+            await _synthesize_chunks(chunks, speaker, label, output_file, self.pool, self.scheduler, on_start)
+            return
+        
         def run_google_tts():
-            client = texttospeech.TextToSpeechClient()
-            
-            # Get voice config for speaker
-            voice_config = VOICES.get(speaker, VOICES["Zeta"])
-            
-            # Set up the synthesis input
-            synthesis_input = texttospeech.SynthesisInput(text=text)
-            
-            # Configure voice parameters
-            voice = texttospeech.VoiceSelectionParams(
-                language_code=voice_config["language_code"],
-                name=voice_config["name"]
-            )
-            
-            # Configure audio settings
-            audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3,
-                pitch=voice_config["pitch"],
-                speaking_rate=voice_config["speaking_rate"],
-                effects_profile_id=voice_config.get("effects_profile", [])
-            )
-            
-            # Perform the text-to-speech request
-            response = client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config
-            )
-            
-            # Write the response to the output file
-            with open(output_file, "wb") as out:
-                out.write(response.audio_content)
+            on_start()
+            _synthesize_google(self.pool.client(), text, speaker, output_file)
         
-        await asyncio.to_thread(run_google_tts)
+        if self.scheduler:
+            await self.scheduler.run(run_google_tts, cost=len(text), label=label)
+        else:
+            await asyncio.to_thread(run_google_tts)
+
+class GooglePCMProvider(GoogleTTSProvider):
+    """
+    Google Cloud TTS as LINEAR16 at sample_rate, for PCM assembly: writes the
+    raw 16-bit samples instead of an MP3. Over-long lines are synthesized in
+    parts concurrently and the samples joined.
+    """
+    
+    def __init__(self, pool: TTSClientPool, scheduler: Optional[TTSScheduler] = None,
+                 sample_rate: int = SAMPLE_RATE):
+        super().__init__(pool, scheduler)
+        self.sample_rate = sample_rate
+    
+    async def synthesize(self, text: str, speaker: str, output_file: str,
+                         on_start: Callable[[], None] = lambda: None, label: str = "line"):
+        chunks = chunk_text(text)
         
-    except Exception as e:
-        print(f"[WARN] Google Cloud TTS failed for line {index}: {e}. Falling back to gTTS.")
-        try:
-            from gtts import gTTS
-            # Run gTTS in a separate thread to avoid blocking the event loop
-            def run_gtts():
-                tts = gTTS(text=text, lang='en')
-                tts.save(output_file)
-            
-            await asyncio.to_thread(run_gtts)
-        except Exception as gtts_e:
-            print(f"[ERROR] gTTS also failed: {gtts_e}")
-            return ""
+        async def run_part(n: int) -> bytes:
+            def run():
+                on_start()
+                return _synthesize_google_pcm(self.pool.client(), chunks[n], speaker, self.sample_rate)
+            if self.scheduler:
+                part = label if len(chunks) == 1 else f"{label} part {n + 1}/{len(chunks)}"
+                return await self.scheduler.run(run, cost=len(chunks[n]), label=part)
+            return await asyncio.to_thread(run)
+        
+        pcm = b"".join(await asyncio.gather(*(run_part(n) for n in range(len(chunks)))))
+        await asyncio.to_thread(_write_audio, pcm, output_file)
+
+def build_provider_chain(pool: TTSClientPool, scheduler: Optional[TTSScheduler] = None,
+                         hedge: bool = False, sample_rate: Optional[int] = None) -> ProviderChain:
+    """
+    Google Cloud TTS first, then edge-tts, then gTTS, with breakers shared by
+    every line. With a sample_rate, Google writes raw PCM at that rate (see
+    GooglePCMProvider) while the other providers still write MP3.
+    """
+    google = GooglePCMProvider(pool, scheduler, sample_rate) if sample_rate else GoogleTTSProvider(pool, scheduler)
+    return ProviderChain([google, EdgeTTSProvider(), GTTSProvider()], hedge=hedge)
 
+async def generate_audio_for_line(text: str, speaker: str, index: int, output_dir: str,
+                                  pool: Optional[TTSClientPool] = None,
+                                  scheduler: Optional[TTSScheduler] = None,
+                                  clip_cache: Optional[ClipCache] = None,
+                                  providers: Optional[ProviderChain] = None,
+                                  durations: Optional[Dict[int, float]] = None) -> str:
+    """
+    Generate audio for a single line of dialogue using Google Cloud TTS.
+    Falls back to edge-tts, then gTTS, if Google Cloud TTS fails; pass the
+    run's providers chain so a provider that keeps failing is skipped for
+    every line instead of failing on each one.
+    The client comes from pool (the shared pool if None) instead of being
+    created per line. With a scheduler, the request waits for a free slot
+    and quota errors are retried before falling back. With a clip_cache, a
+    line already synthesized with the same voice is reused, and new Google
+    clips are added to it. Lines over the TTS input limit are split at
+    sentence boundaries and the parts synthesized concurrently. durations,
+    when given, gets the duration of the clip by index if it is Google's.
+    """
+    output_file = _clip_path(output_dir, index, speaker)
+    key = _clip_key(text, speaker) if clip_cache else None
+    if clip_cache and clip_cache.get(key, output_file):
+        _record_duration(durations, index, output_file)
+        return output_file
+    # A clip left by an earlier run may be linked to the cache; never write through it
+    if os.path.lexists(output_file):
+        os.remove(output_file)
+    providers = providers or build_provider_chain(pool or get_tts_pool(), scheduler)
+    
+    provider = await providers.synthesize(text, speaker, output_file, label=f"line {index}")
+    if provider is None:
+        print(f"[ERROR] All TTS providers failed for line {index}.")
+        return ""
+    if provider == GoogleTTSProvider.name:
+        _record_duration(durations, index, output_file)
+        # Only Google clips match the voice in the cache key
+        if clip_cache:
+            await asyncio.to_thread(clip_cache.put, key, output_file)
     return output_file
 
-async def generate_audio_files(script: List[Dict[str, str]], output_dir: str = "outputs/temp_audio") -> List[str]:
+async def generate_audio_batch(batch: List[Tuple[int, Dict[str, str]]], output_dir: str,
+                               batch_pool: TTSClientPool, pool: TTSClientPool, scheduler: TTSScheduler,
+                               clip_cache: Optional[ClipCache] = None,
+                               providers: Optional[ProviderChain] = None,
+                               durations: Optional[Dict[int, float]] = None) -> List[str]:
+    """
+    Synthesize (index, line) entries of one speaker as a single SSML request
+    and cut the audio back into one clip per line at the <mark> timepoints.
+    If the batch fails (or cannot be split), or Google is currently being
+    skipped by the providers chain, its lines are synthesized one by one
+    instead.
+    """
+    speaker = batch[0][1]["speaker"]
+    providers = providers or build_provider_chain(pool, scheduler)
+    if len(batch) > 1 and not providers.is_open(GoogleTTSProvider.name):
+        outputs = [_clip_path(output_dir, index, speaker) for index, _ in batch]
+        batch_file = os.path.join(output_dir, f"batch_{batch[0][0]:03d}_{speaker}.mp3")
+        
+        def run_batch():
+            timepoints = _synthesize_google_ssml(batch_pool.client(), build_ssml(batch), speaker, batch_file)
+            try:
+                spans = clip_spans(batch, timepoints)
+                for (index, line), (start, end), output_file in zip(batch, spans, outputs):
+                    if os.path.lexists(output_file):
+                        os.remove(output_file)
+                    split_clip(batch_file, start, end, output_file)
+                    _record_duration(durations, index, output_file)
+                    if clip_cache:
+                        clip_cache.put(_clip_key(line["text"], speaker), output_file)
+            finally:
+                os.remove(batch_file)
+        
+        try:
+            await scheduler.run(run_batch, cost=sum(len(line["text"]) for _, line in batch),
+                                label=f"batch of {len(batch)} {speaker} lines")
+            return outputs
+        except Exception as e:
+            print(f"[WARN] SSML batch of {len(batch)} {speaker} lines failed: {e}. Synthesizing them one by one.")
+    
+    return list(await asyncio.gather(*(
+        generate_audio_for_line(line["text"], speaker, index, output_dir, pool, scheduler, clip_cache, providers,
+                                durations)
+        for index, line in batch
+    )))
+
+async def generate_audio_files(script: List[Dict[str, str]], output_dir: str = "outputs/temp_audio",
+                               scheduler: Optional[TTSScheduler] = None, use_cache: bool = True,
+                               batch: bool = False, hedge: bool = False,
+                               durations: Optional[Dict[int, float]] = None) -> List[str]:
     """
     Generate audio files for the entire script.
+    Lines are synthesized through a scheduler (TTS_CONCURRENCY at a time by
+    default), longest first. Lines found in the clip cache are not
+    synthesized again unless use_cache is False. With batch=True each
+    speaker's lines are packed into a few SSML requests instead of one
+    request per line. Providers fail over for the whole run (see
+    tts_providers); hedge=True also races a slow request against the next
+    provider. durations, when given, is filled with the duration of every
+    Google clip by line index, for calibrating the duration estimator.
     """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -100,22 +310,173 @@ async def generate_audio_files(script: List[Dict[str, str]], output_dir: str = "
     print(f"[INFO] Generating audio for {len(script)} lines...")
     audio_files = []
     
-    tasks = []
-    for i, line in enumerate(script):
-        speaker = line.get("speaker")
-        text = line.get("text")
-        if speaker and text:
-            tasks.append(generate_audio_for_line(text, speaker, i, output_dir))
+    scheduler = scheduler or TTSScheduler.from_env()
+    clip_cache = ClipCache() if use_cache else None
+    # One set of clients for the whole episode (a channel per slot), closed once every line is done
+    pool = get_tts_pool(scheduler.max_concurrency)
+    providers = build_provider_chain(pool, scheduler, hedge=hedge)
+    lines = [(i, line) for i, line in enumerate(script) if line.get("speaker") and line.get("text")]
+    batch_pool = None
+    if batch:
+        batch_pool = TTSClientPool(scheduler.max_concurrency, factory=beta_client_factory)
+        cached = []
+        pending = []
+        for i, line in lines:
+            output_file = _clip_path(output_dir, i, line["speaker"])
+            if clip_cache and clip_cache.get(_clip_key(line["text"], line["speaker"]), output_file):
+                _record_duration(durations, i, output_file)
+                cached.append(output_file)
+            else:
+                pending.append((i, line))
+        batches = build_batches(pending)
+        # Queue the longest batches first so they do not finish last
+        batches.sort(key=lambda entries: sum(len(line["text"]) for _, line in entries), reverse=True)
+        print(f"[INFO] Packed {len(pending)} lines into {len(batches)} SSML requests "
+              f"({len(cached)} lines from the clip cache).")
+        tasks = [
+            generate_audio_batch(entries, output_dir, batch_pool, pool, scheduler, clip_cache, providers, durations)
+            for entries in batches
+        ]
+    else:
+        # Queue the longest lines first so they do not finish last
+        lines.sort(key=lambda entry: len(entry[1]["text"]), reverse=True)
+        tasks = [
+            generate_audio_for_line(line["text"], line["speaker"], i, output_dir, pool, scheduler, clip_cache, providers,
+                                    durations)
+            for i, line in lines
+        ]
             
     # Run concurrently
-    audio_files = await asyncio.gather(*tasks)
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        close_tts_pool()
+        if batch_pool:
+            batch_pool.close()
+    audio_files = cached + [f for files in results for f in files] if batch else list(results)
+    
+    # Sort to ensure correct order based on index
+    audio_files.sort()
+    
+    print(f"[SUCCESS] Generated {len(audio_files)} audio clips.")
+    print(scheduler.report())
+    print(providers.report())
+    if clip_cache:
+        print(clip_cache.report())
+    return list(audio_files)
+
+async def generate_audio_files_streaming(lines: asyncio.Queue, output_dir: str = "outputs/temp_audio",
+                                         scheduler: Optional[TTSScheduler] = None, use_cache: bool = True,
+                                         hedge: bool = False,
+                                         durations: Optional[Dict[int, float]] = None) -> List[str]:
+    """
+    Generate audio for (index, line) pairs as they arrive on the queue, so
+    synthesis can overlap script generation. A None entry ends the stream.
+    Lines waiting for a scheduler slot are dispatched longest first.
+    durations is filled like in generate_audio_files.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        
+    print("[INFO] Generating audio as script lines arrive...")
+    scheduler = scheduler or TTSScheduler.from_env()
+    clip_cache = ClipCache() if use_cache else None
+    pool = get_tts_pool(scheduler.max_concurrency)
+    providers = build_provider_chain(pool, scheduler, hedge=hedge)
+    tasks = []
+    try:
+        while True:
+            entry = await lines.get()
+            if entry is None:
+                break
+            index, line = entry
+            speaker = line.get("speaker")
+            text = line.get("text")
+            if speaker and text:
+                tasks.append(asyncio.create_task(generate_audio_for_line(
+                    text, speaker, index, output_dir, pool, scheduler, clip_cache, providers, durations
+                )))
+        
+        audio_files = await asyncio.gather(*tasks)
+    finally:
+        close_tts_pool()
     
     # Sort to ensure correct order based on index
     audio_files.sort()
     
     print(f"[SUCCESS] Generated {len(audio_files)} audio clips.")
+    print(scheduler.report())
+    print(providers.report())
+    if clip_cache:
+        print(clip_cache.report())
     return list(audio_files)
 
+async def generate_pcm_for_line(text: str, speaker: str, index: int, work_dir: str, providers: ProviderChain,
+                                sample_rate: int = SAMPLE_RATE) -> Tuple[Optional[bytes], bool]:
+    """
+    Generate a line as 16-bit mono PCM through providers, a chain built with
+    build_provider_chain(sample_rate=...), so its breakers skip a failing
+    Google for every line. Audio from a fallback provider is decoded and
+    resampled to sample_rate. The provider's output passes through work_dir
+    and is removed once read. Returns (samples, True if they did not come
+    from Google); samples is None if every provider fails.
+    """
+    output_file = os.path.join(work_dir, f"{index:03d}_{speaker}.pcm")
+    provider = await providers.synthesize(text, speaker, output_file, label=f"line {index}")
+    if provider is None:
+        print(f"[ERROR] All TTS providers failed for line {index}.")
+        return None, True
+    try:
+        with open(output_file, "rb") as f:
+            data = f.read()
+    finally:
+        os.remove(output_file)
+    if provider == GoogleTTSProvider.name:
+        return data, False
+    try:
+        return await asyncio.to_thread(decode_audio, data, sample_rate), True
+    except Exception as e:
+        print(f"[ERROR] Could not decode {provider} audio for line {index}: {e}")
+        return None, True
+
+async def generate_episode_pcm(script: List[Dict[str, str]], scheduler: Optional[TTSScheduler] = None,
+                               sample_rate: int = SAMPLE_RATE,
+                               gains_db: Optional[Dict[str, float]] = None,
+                               hedge: bool = False) -> PCMAssembler:
+    """
+    Generate the audio for the entire script as LINEAR16 and keep it in
+    memory for pcm_assembler.encode_episode. No per-line clips are kept;
+    each provider's output only passes through a temporary directory. Lines
+    are scheduled longest first like generate_audio_files and go through the
+    same provider chain (breakers, and hedging with hedge=True); lines that
+    fail entirely are left out.
+    """
+    print(f"[INFO] Generating audio for {len(script)} lines in memory...")
+    scheduler = scheduler or TTSScheduler.from_env()
+    pool = get_tts_pool(scheduler.max_concurrency)
+    providers = build_provider_chain(pool, scheduler, hedge=hedge, sample_rate=sample_rate)
+    assembler = PCMAssembler(sample_rate=sample_rate, gains_db=gains_db)
+    lines = [(i, line) for i, line in enumerate(script) if line.get("speaker") and line.get("text")]
+    # Queue the longest lines first so they do not finish last
+    lines.sort(key=lambda entry: len(entry[1]["text"]), reverse=True)
+    
+    async def render(i: int, line: Dict[str, str], work_dir: str):
+        pcm, fallback = await generate_pcm_for_line(line["text"], line["speaker"], i, work_dir, providers,
+                                                    sample_rate)
+        if pcm:
+            assembler.add(i, line["speaker"], pcm, fallback=fallback)
+    
+    try:
+        with tempfile.TemporaryDirectory(prefix="clankers-pcm-") as work_dir:
+            await asyncio.gather(*(render(i, line, work_dir) for i, line in lines))
+    finally:
+        close_tts_pool()
+    
+    print(f"[SUCCESS] Generated {len(assembler)} audio clips.")
+    print(scheduler.report())
+    print(providers.report())
+    return assembler
+
 def combine_audio_files(audio_files: List[str], output_file: str) -> str:
     """
     Combine multiple audio files into a single file using ffmpeg.
@@ -12,17 +12,97 @@ from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from src.news_fetcher import fetch_news
-from src.script_generator import generate_script
-from src.audio_generator import generate_audio_files
+from src.duration_estimator import DurationEstimator, format_duration, record_rendered_episode
+from src.feed_scheduler import FeedScheduler
+from src.llm_client import get_client
+from src.story_store import StoryStore
+from src.script_generator import (
+    fit_script_length, generate_script, generate_script_segmented, generate_script_streaming, generate_script_structured
+)
+from src.audio_generator import generate_audio_files, generate_audio_files_streaming, generate_episode_pcm
+from src.pcm_assembler import encode_episode
 from src.podcast_producer import assemble_podcast
 from src.tweet_generator import generate_tweets
-from src.twitter_poster import post_tweets
+from src.tweet_outbox import OutboxWorker, TweetOutbox
+from src.twitter_poster import get_twitter_api
 
 load_dotenv()
 
-async def generate_daily_episode(categories=None, mode="daily", holiday_theme=None, generate_tweet=False, post_tweet=False):
+async def _stream_script_and_audio(news, mode, holiday_theme, use_llm_cache, output_dir, use_tts_cache=True, hedge_tts=False,
+                                   clip_durations=None):
+    """
+    Stream the script from Gemini and start synthesizing each line as soon as
+    it is complete. Returns ((script, title), audio task).
+    """
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+    audio_task = asyncio.create_task(generate_audio_files_streaming(
+        lines, output_dir=output_dir, use_cache=use_tts_cache, hedge=hedge_tts, durations=clip_durations
+    ))
+    
+    def on_line(index, line):
+        loop.call_soon_threadsafe(lines.put_nowait, (index, line))
+    
+    try:
+        result = await asyncio.to_thread(
+            generate_script_streaming, news, mode=mode, holiday_theme=holiday_theme,
+            on_line=on_line, use_cache=use_llm_cache
+        )
+    finally:
+        lines.put_nowait(None)
+    return result, audio_task
+
+async def _finish_outbox(task, outbox):
+    """Wait for the background tweet worker; anything unposted stays queued for the next run."""
+    if task is None:
+        return
+    try:
+        posted = await task
+        print(f"[INFO] Posted {posted} tweets. Outbox: {outbox.stats()}")
+    except Exception as e:
+        print(f"[WARN] Tweet worker stopped: {e}. Queued tweets will be retried next run.")
+    outbox.close()
+
+async def _render_pcm_episode(script, title, date_str, estimator, outbox_task, outbox, hedge_tts=False):
+    """Steps 4 and 5 in PCM mode: synthesize in memory, lay out the episode and write it once."""
+    assembler = await generate_episode_pcm(script, hedge=hedge_tts)
+    if not len(assembler):
+        print("[ERROR] Audio generation failed. Aborting.")
+        await _finish_outbox(outbox_task, outbox)
+        return False
+    
+    print("\n[INFO] Assembling podcast in memory...")
+    output_filename = os.path.join("outputs", f"{title}_{date_str}.mp3")
+    result = await asyncio.to_thread(encode_episode, assembler.render(), output_filename, assembler.sample_rate)
+    await _finish_outbox(outbox_task, outbox)
+    
+    if result:
+        record_rendered_episode(estimator, script, title, output_filename, assembler.durations(include_fallbacks=False))
+        print(f"\n[SUCCESS] Podcast generated successfully: {output_filename}")
+        print(f"[INFO] Completed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        return True
+    print("[ERROR] Podcast assembly failed.")
+    return False
+
+async def generate_daily_episode(categories=None, mode="daily", holiday_theme=None, generate_tweet=False, post_tweet=False, from_store=False, use_llm_cache=True, stream=False, segmented=False,
+                                 structured=False, length_gate=True, use_tts_cache=True, batch_tts=False,
+                                 pcm_assembly=False, hedge_tts=False):
     """
     Generate a complete podcast episode automatically.
+    
+    With stream=True, audio synthesis starts on each script line while Gemini
+    is still writing the rest of the script. With segmented=True the script is
+    written as concurrent per-category segments, and with structured=True the
+    script and title come from one schema-constrained call (both ignored when
+    streaming). With length_gate=True a script whose estimated duration is off
+    target is extended or regenerated before any TTS is spent. With
+    use_tts_cache=True lines already synthesized with the same voice reuse
+    their cached clips, and with batch_tts=True each speaker's lines are
+    synthesized in a few SSML requests (ignored when streaming). With
+    pcm_assembly=True the audio is kept as PCM in memory and the episode is
+    encoded once, without per-line clips (not with streaming, the TTS cache
+    or batching). With hedge_tts=True a TTS request slower than its
+    provider's p95 is raced against the next provider.
     """
     if categories is None:
         categories = ["ai", "tech", "business", "science"]
@@ -36,7 +116,8 @@ async def generate_daily_episode(categories=None, mode="daily", holiday_theme=No
     # 1. Fetch News
     print("\n[INFO] Fetching news...")
     time_window = "7d" if mode == "weekly" else "24h"
-    news = fetch_news(time_window=time_window, categories=categories)
+    store = StoryStore() if from_store else None
+    news = fetch_news(time_window=time_window, categories=categories, store=store)
     
     if not news:
         print("[ERROR] No news found. Aborting.")
@@ -44,15 +125,43 @@ async def generate_daily_episode(categories=None, mode="daily", holiday_theme=No
     
     # 2. Generate Script
     print("\n[INFO] Generating script...")
-    result = generate_script(news, mode=mode, holiday_theme=holiday_theme)
+    audio_task = None
+    # Durations of the Google clips, for calibrating the duration estimator
+    clip_durations = {}
+    if stream:
+        result, audio_task = await _stream_script_and_audio(
+            news, mode, holiday_theme, use_llm_cache, output_dir="outputs/temp_audio", use_tts_cache=use_tts_cache,
+            hedge_tts=hedge_tts, clip_durations=clip_durations
+        )
+    elif segmented:
+        result = generate_script_segmented(news, mode=mode, holiday_theme=holiday_theme, use_cache=use_llm_cache)
+    elif structured:
+        result = generate_script_structured(news, mode=mode, holiday_theme=holiday_theme, use_cache=use_llm_cache)
+    else:
+        result = generate_script(news, mode=mode, holiday_theme=holiday_theme, use_cache=use_llm_cache)
     
     if not result or not result[0]:
         print("[ERROR] Script generation failed. Aborting.")
+        if audio_task:
+            await audio_task
         return False
     
     script, title = result
     print(f"[INFO] Episode title: {title}")
     
+    # Check the predicted duration before paying for TTS (streamed audio has already started)
+    estimator = DurationEstimator()
+    if length_gate and not stream:
+        script = fit_script_length(script, news, mode=mode, holiday_theme=holiday_theme,
+                                   estimator=estimator, use_cache=use_llm_cache)
+    else:
+        print(f"[INFO] Estimated duration: {format_duration(estimator.estimate(script))}")
+    
+    # Credit the feeds whose stories made it into the script
+    scheduler = FeedScheduler()
+    scheduler.record_script(news, script)
+    scheduler.save()
+    
     # 3. Save Script
     script_dir = "outputs/scripts"
     os.makedirs(script_dir, exist_ok=True)
@@ -66,6 +175,7 @@ async def generate_daily_episode(categories=None, mode="daily", holiday_theme=No
     print(f"[INFO] Script saved to {script_filename}")
     
     # 3.5 Generate Tweets (Optional)
+    outbox = outbox_task = None
     if generate_tweet or post_tweet:
         print("\n[INFO] Generating promotional tweets...")
         tweets = generate_tweets(script, title)
@@ -80,29 +190,46 @@ async def generate_daily_episode(categories=None, mode="daily", holiday_theme=No
             
             # 3.6 Post to Twitter (Optional)
             if post_tweet:
-                print("\n[INFO] Posting to X/Twitter...")
-                # Post the first tweet option by default
-                if post_tweets([tweets[0]]):
-                    print("[SUCCESS] Successfully posted to Twitter!")
+                api = get_twitter_api()
+                if api:
+                    print("\n[INFO] Queueing tweet for X/Twitter; posting in the background...")
+                    outbox = TweetOutbox()
+                    # Post the first tweet option by default
+                    outbox.enqueue([tweets[0]], label=title)
+                    # Also resumes threads left over from earlier runs
+                    outbox_task = asyncio.create_task(OutboxWorker(outbox, api).drain())
                 else:
                     print("[WARN] Failed to post to Twitter.")
         else:
             print("[WARN] Tweet generation failed or returned empty.")
+    
+    client = get_client()
+    if client:
+        print(client.report())
 
     # 4. Generate Audio
     print("\n[INFO] Generating audio...")
-    audio_files = await generate_audio_files(script, output_dir="outputs/temp_audio")
+    if pcm_assembly and not audio_task:
+        return await _render_pcm_episode(script, title, date_str, estimator, outbox_task, outbox, hedge_tts)
+    if audio_task:
+        audio_files = await audio_task
+    else:
+        audio_files = await generate_audio_files(script, output_dir="outputs/temp_audio", use_cache=use_tts_cache,
+                                                 batch=batch_tts, hedge=hedge_tts, durations=clip_durations)
     
     if not audio_files:
         print("[ERROR] Audio generation failed. Aborting.")
+        await _finish_outbox(outbox_task, outbox)
         return False
     
     # 5. Assemble Podcast
     print("\n[INFO] Assembling podcast...")
     output_filename = os.path.join("outputs", f"{title}_{date_str}.mp3")
     result = assemble_podcast(audio_files, output_file=output_filename)
+    await _finish_outbox(outbox_task, outbox)
     
     if result:
+        record_rendered_episode(estimator, script, title, output_filename, clip_durations)
         print(f"\n[SUCCESS] Podcast generated successfully: {output_filename}")
         print(f"[INFO] Completed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         return True
@@ -122,6 +249,17 @@ def main():
                        help="Holiday theme (e.g., 'Thanksgiving', 'Christmas', 'New Year')")
     parser.add_argument("--tweet", action="store_true", help="Generate promotional tweets")
     parser.add_argument("--post-tweet", action="store_true", help="Automatically post to X/Twitter (requires API keys)")
+    parser.add_argument("--from-store", action="store_true", help="Read news from the local story store filled by 'news_fetcher.py --ingest'")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call Gemini instead of reusing cached responses")
+    parser.add_argument("--no-tts-cache", action="store_true", help="Always synthesize audio instead of reusing cached clips")
+    parser.add_argument("--batch-tts", action="store_true", help="Synthesize each speaker's lines in a few SSML requests instead of one per line")
+    parser.add_argument("--pcm", action="store_true", help="Assemble the episode from in-memory PCM and encode it once (no temp clips)")
+    parser.add_argument("--hedge-tts", action="store_true", help="Race TTS requests slower than their provider's p95 against the next provider")
+    script_mode = parser.add_mutually_exclusive_group()
+    script_mode.add_argument("--stream", action="store_true", help="Start audio synthesis while the script is still being generated")
+    script_mode.add_argument("--segmented", action="store_true", help="Write the script as concurrent per-category segments")
+    script_mode.add_argument("--structured", action="store_true", help="Get the script and title from one schema-constrained call")
+    parser.add_argument("--no-length-gate", action="store_true", help="Skip the pre-TTS duration check")
     
     args = parser.parse_args()
     categories = [c.strip() for c in args.categories.split(",")]
@@ -132,7 +270,17 @@ def main():
         mode=args.mode,
         holiday_theme=args.holiday,
         generate_tweet=args.tweet,
-        post_tweet=args.post_tweet
+        post_tweet=args.post_tweet,
+        from_store=args.from_store,
+        use_llm_cache=not args.no_llm_cache,
+        stream=args.stream,
+        segmented=args.segmented,
+        structured=args.structured,
+        length_gate=not args.no_length_gate,
+        use_tts_cache=not args.no_tts_cache,
+        batch_tts=args.batch_tts,
+        pcm_assembly=args.pcm,
+        hedge_tts=args.hedge_tts
     ))
     
     # Exit with appropriate code for task scheduler
@@ -0,0 +1,130 @@
+"""
+Module for caching synthesized TTS clips on disk.
+
+Clips are content-addressed: the key is a hash of the line's text, the full
+voice configuration (voice name, pitch, speaking rate, effects profile) and the
+audio encoding, so the intro, recurring sign-offs and reruns after a failed
+assembly reuse earlier audio instead of synthesizing it again. A hit is
+hard-linked into the output directory (copied where links are not possible),
+and the least recently used clips are evicted once the cache grows past
+max_bytes.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Dict
+
+DEFAULT_CACHE_DIR = os.path.join("outputs", "cache", "clips")
+# Upper bound on the total size of the cached clips
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+def clip_key(text: str, voice: Dict, encoding: str = "MP3") -> str:
+    """Hash everything that determines the synthesized audio."""
+    payload = json.dumps({"text": text, "voice": voice, "encoding": encoding}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _link_or_copy(src: str, dest: str):
+    # Replace, never write through: dest may itself be a link to another cached clip
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+class ClipCache:
+    """
+    On-disk LRU cache of audio clips, bounded by total size.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 extension: str = ".mp3"):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.extension}")
+
+    def get(self, key: str, dest: str) -> bool:
+        """Place the cached clip at dest. Returns False on a miss."""
+        path = self._path(key)
+        try:
+            _link_or_copy(path, dest)
+            # Bump the modification time so eviction sees this clip as recently used
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def put(self, key: str, src: str):
+        """Add a freshly synthesized clip to the cache."""
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[WARN] Could not cache clip {os.path.basename(src)}: {e}")
+            return
+        with self._lock:
+            self.stored += 1
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used clips until the cache fits in
+        max_bytes. Returns the number of files removed.
+        """
+        with self._lock:
+            files = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(self.extension):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+            removed = 0
+            total = sum(size for _, size, _ in files)
+            # Least recently used first
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            return removed
+
+    def size_bytes(self) -> int:
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(self.extension):
+                try:
+                    total += os.path.getsize(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+        return total
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        rate = f"{100 * self.hits / lookups:.0f}%" if lookups else "n/a"
+        return (f"[INFO] Clip cache: {self.hits} hits, {self.misses} misses ({rate} hit rate), "
+                f"{self.stored} stored, {self.size_bytes() / (1024 * 1024):.1f} MB on disk")
@@ -0,0 +1,96 @@
+"""
+Module for picking the most salient parts of a script as compact LLM context.
+
+The script is cut into short exchanges (consecutive lines, so a Zeta line
+keeps Quill's reply). Exchanges are scored with TF-IDF, where the "documents"
+are the exchanges themselves: words that are frequent in one exchange but rare
+across the episode mark what that exchange is about. Exchanges are then picked
+greedily by score with a penalty for overlap with what is already picked
+(maximal marginal relevance), so the selection covers different stories from
+the whole episode rather than the densest one, until the character budget is
+used. The result is returned in episode order.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Lines per exchange
+EXCHANGE_LINES = 2
+# Trade-off between salience (1.0) and novelty (0.0) when picking exchanges
+MMR_LAMBDA = 0.7
+# Marks a skipped part of the episode between two selected exchanges
+GAP_MARKER = "\n...\n"
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "over", "after", "about", "your", "have",
+    "will", "says", "said", "what", "when", "how", "are", "was", "were", "you", "they", "them", "their",
+    "its", "it's", "but", "not", "just", "like", "can", "could", "would", "should", "really", "there",
+    "here", "than", "then", "now", "our", "out", "all", "any", "one", "some", "get", "got", "yeah",
+    "zeta", "quill", "i'm", "that's", "don't", "you're", "we're", "let's", "more", "even", "been", "also"
+}
+
+def _terms(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS]
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(weight * b.get(term, 0.0) for term, weight in a.items())
+    norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+    return dot / norm if norm else 0.0
+
+def select_salient_exchanges(script: List[Dict[str, str]], max_chars: int,
+                             exchange_lines: int = EXCHANGE_LINES) -> List[Tuple[int, str]]:
+    """
+    Return (position, exchange) pairs, where an exchange is "Speaker: text"
+    lines joined by newlines, in episode order. Each exchange is budgeted
+    with room for a gap marker, so the joined context fits max_chars.
+    """
+    lines = [f"{line['speaker']}: {line['text']}" for line in script if line.get("speaker") and line.get("text")]
+    exchanges = ["\n".join(lines[i:i + exchange_lines]) for i in range(0, len(lines), exchange_lines)]
+    if sum(len(exchange) + len(GAP_MARKER) for exchange in exchanges) <= max_chars:
+        return list(enumerate(exchanges))
+
+    counts = [Counter(_terms(exchange)) for exchange in exchanges]
+    document_frequency = Counter(term for count in counts for term in count)
+    total = len(exchanges)
+    vectors = []
+    for count in counts:
+        length = sum(count.values()) or 1
+        vectors.append({
+            term: (n / length) * math.log(1 + total / document_frequency[term])
+            for term, n in count.items()
+        })
+    # Sum of distinct term weights, damped so long exchanges do not win on length alone
+    salience = [sum(vector.values()) * math.sqrt(len(vector)) for vector in vectors]
+    top = max(salience) or 1.0
+    salience = [score / top for score in salience]
+
+    selected: List[int] = []
+    used = 0
+    candidates = set(range(total))
+    while candidates:
+        def mmr(i):
+            overlap = max((_cosine(vectors[i], vectors[j]) for j in selected), default=0.0)
+            return MMR_LAMBDA * salience[i] - (1 - MMR_LAMBDA) * overlap
+        best = max(candidates, key=lambda i: (mmr(i), -i))
+        candidates.discard(best)
+        cost = len(exchanges[best]) + len(GAP_MARKER)
+        if used + cost > max_chars:
+            continue
+        selected.append(best)
+        used += cost
+    return [(i, exchanges[i]) for i in sorted(selected)]
+
+def build_episode_context(script: List[Dict[str, str]], max_chars: int) -> str:
+    """Join the selected exchanges, marking skipped parts of the episode with '...'."""
+    context = ""
+    previous = None
+    for position, exchange in select_salient_exchanges(script, max_chars):
+        if previous is not None:
+            context += "\n" if position == previous + 1 else GAP_MARKER
+        context += exchange
+        previous = position
+    return context
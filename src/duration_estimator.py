@@ -0,0 +1,170 @@
+"""
+Module for predicting an episode's duration before any audio is synthesized.
+
+Each line's duration is estimated from its word count and its speaker's
+speaking_rate in voices.VOICES, plus the silence the producer puts
+after every clip. Per-speaker correction factors are learned from past
+rendered episodes (actual clip durations vs. the raw estimate) and persisted,
+so the estimate tracks the real voices over time. Only clips in the hosts'
+own voices count; fallback voices speak at other rates. Scripts whose estimate falls
+outside the target range for the mode can then be fixed while it is still
+cheap, before TTS is paid for.
+"""
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .voices import VOICES
+except ImportError:
+    from voices import VOICES
+
+DEFAULT_CALIBRATION_PATH = os.path.join("outputs", "cache", "duration_calibration.json")
+# Words per minute of a WaveNet voice at speaking_rate 1.0, before calibration
+BASE_WORDS_PER_MINUTE = 150
+# Silence inserted after every clip by podcast_producer.assemble_podcast
+PAUSE_SECONDS = 0.5
+# Target episode length in minutes, per mode (matches the script prompt)
+TARGET_MINUTES = {"daily": (10, 15), "weekly": (15, 20)}
+# Weight of the newest episode in the smoothed correction factors
+CALIBRATION_SMOOTHING = 0.3
+# Past episodes kept in the estimate-vs-actual history
+HISTORY_SIZE = 30
+
+_WORD_RE = re.compile(r"\S+")
+
+def count_words(text: str) -> int:
+    return len(_WORD_RE.findall(text or ""))
+
+def target_range(mode: str) -> Tuple[float, float]:
+    """Return the (min, max) target duration in seconds for the mode."""
+    low, high = TARGET_MINUTES.get(mode, TARGET_MINUTES["daily"])
+    return low * 60.0, high * 60.0
+
+def probe_duration(path: str) -> Optional[float]:
+    """Return the duration of an audio file in seconds using ffprobe, or None."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        return float(result.stdout.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+class DurationEstimator:
+    """
+    Word-count duration model with per-speaker factors calibrated from
+    rendered episodes.
+    """
+
+    def __init__(self, path: str = DEFAULT_CALIBRATION_PATH, voices: Optional[Dict[str, Dict]] = None):
+        self.path = path
+        self.voices = voices or VOICES
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.factors: Dict[str, float] = data.get("factors", {})
+        self.history: List[Dict] = data.get("history", [])
+
+    def _raw_seconds(self, line: Dict[str, str]) -> float:
+        voice = self.voices.get(line.get("speaker"), self.voices.get("Zeta", {}))
+        words_per_second = BASE_WORDS_PER_MINUTE / 60.0 * voice.get("speaking_rate", 1.0)
+        return count_words(line.get("text", "")) / words_per_second
+
+    def line_seconds(self, line: Dict[str, str]) -> float:
+        """Estimated spoken duration of one line, without the pause after it."""
+        return self._raw_seconds(line) * self.factors.get(line.get("speaker"), 1.0)
+
+    def estimate(self, script: List[Dict[str, str]]) -> float:
+        """Estimated duration of the assembled episode in seconds."""
+        spoken = [line for line in script if line.get("speaker") and line.get("text")]
+        return sum(self.line_seconds(line) for line in spoken) + PAUSE_SECONDS * len(spoken)
+
+    def words_per_second(self, script: List[Dict[str, str]]) -> float:
+        """Average spoken words per second of the script's speakers, including pauses."""
+        words = sum(count_words(line.get("text", "")) for line in script)
+        seconds = self.estimate(script)
+        return words / seconds if words and seconds else BASE_WORDS_PER_MINUTE / 60.0
+
+    def check(self, script: List[Dict[str, str]], mode: str = "daily") -> Tuple[float, int]:
+        """
+        Return (estimated seconds, direction): direction is -1 when the script
+        is too short for the mode, 1 when too long and 0 when on target.
+        """
+        seconds = self.estimate(script)
+        low, high = target_range(mode)
+        return seconds, (-1 if seconds < low else 1 if seconds > high else 0)
+
+    def calibrate(self, script: List[Dict[str, str]], clip_durations: Dict[int, float]):
+        """
+        Update the per-speaker factors from the actual durations of rendered
+        clips, keyed by script line index.
+        """
+        actual: Dict[str, float] = {}
+        predicted: Dict[str, float] = {}
+        for index, duration in clip_durations.items():
+            if duration is None or not 0 <= index < len(script):
+                continue
+            line = script[index]
+            raw = self._raw_seconds(line)
+            if raw <= 0:
+                continue
+            speaker = line.get("speaker")
+            actual[speaker] = actual.get(speaker, 0.0) + duration
+            predicted[speaker] = predicted.get(speaker, 0.0) + raw
+        with self._lock:
+            for speaker, seconds in actual.items():
+                sample = seconds / predicted[speaker]
+                previous = self.factors.get(speaker)
+                self.factors[speaker] = round(
+                    sample if previous is None else CALIBRATION_SMOOTHING * sample + (1 - CALIBRATION_SMOOTHING) * previous, 4
+                )
+
+    def record_episode(self, title: str, estimated: float, actual: Optional[float]):
+        """Remember an episode's estimated and actual duration (seconds)."""
+        with self._lock:
+            self.history.append({
+                "title": title,
+                "date": time.strftime("%Y-%m-%d"),
+                "estimated": round(estimated, 1),
+                "actual": round(actual, 1) if actual is not None else None
+            })
+            self.history = self.history[-HISTORY_SIZE:]
+
+    def save(self):
+        with self._lock:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"factors": self.factors, "history": self.history}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+def format_duration(seconds: float) -> str:
+    return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
+
+def record_rendered_episode(estimator: DurationEstimator, script: List[Dict[str, str]], title: str,
+                            episode_file: Optional[str], clip_durations: Dict[int, float]) -> Tuple[float, Optional[float]]:
+    """
+    After an episode is assembled: log the estimated duration next to the
+    actual one, calibrate the estimator and save it. clip_durations holds
+    the durations (by line index) already known from synthesis or assembly,
+    for the clips in the hosts' own voices only.
+    Returns (estimated, actual) seconds; actual is None if ffprobe is missing.
+    """
+    estimated = estimator.estimate(script)
+    actual = probe_duration(episode_file) if episode_file else None
+    estimator.calibrate(script, clip_durations)
+    estimator.record_episode(title, estimated, actual)
+    estimator.save()
+    actual_text = format_duration(actual) if actual is not None else "unknown (ffprobe unavailable)"
+    print(f"[INFO] Duration: estimated {format_duration(estimated)}, actual {actual_text}")
+    return estimated, actual
@@ -0,0 +1,122 @@
+"""
+Module for caching downloaded RSS feeds on disk.
+
+Each feed URL is stored as a small JSON record holding its ETag/Last-Modified
+validators and the already-parsed entries, so later runs can send conditional
+requests and reuse the entries when the server answers 304 Not Modified.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+DEFAULT_CACHE_DIR = os.path.join("outputs", "cache", "feeds")
+# Records not refreshed within this window are evicted
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+# Upper bound on the total size of the cache directory
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+
+class FeedCache:
+    """
+    On-disk cache of parsed feeds keyed by feed URL.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, feed_url: str) -> str:
+        key = hashlib.sha1(feed_url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, feed_url: str) -> Optional[Dict]:
+        """Return the cached record for a feed, or None if missing or expired."""
+        path = self._path(feed_url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - record.get("fetched_at", 0) > self.ttl_seconds:
+            return None
+        return record
+
+    @staticmethod
+    def conditional_headers(record: Optional[Dict]) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers from a cached record."""
+        headers = {}
+        if record:
+            if record.get("etag"):
+                headers["If-None-Match"] = record["etag"]
+            if record.get("last_modified"):
+                headers["If-Modified-Since"] = record["last_modified"]
+        return headers
+
+    def put(self, feed_url: str, feed: Dict, etag: Optional[str] = None, last_modified: Optional[str] = None,
+            since: Optional[float] = None) -> Dict:
+        """
+        Store a freshly downloaded and parsed feed. since is the cutoff the
+        entries were parsed with (None when the whole feed was kept).
+        """
+        self.misses += 1
+        record = {
+            "url": feed_url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+            "since": since,
+            "title": feed.get("title"),
+            "entries": feed.get("entries", []),
+        }
+        self._write(feed_url, record)
+        return record
+
+    def touch(self, feed_url: str, record: Dict) -> Dict:
+        """Mark a cached record as revalidated (the server answered 304)."""
+        self.hits += 1
+        record["fetched_at"] = time.time()
+        self._write(feed_url, record)
+        return record
+
+    def _write(self, feed_url: str, record: Dict):
+        path = self._path(feed_url)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    def evict(self) -> int:
+        """
+        Remove expired records, then the least recently refreshed ones until
+        the cache fits in max_bytes. Returns the number of files removed.
+        """
+        now = time.time()
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        removed = 0
+        total = sum(size for _, size, _ in files)
+        # Oldest first
+        for mtime, size, path in sorted(files):
+            if now - mtime <= self.ttl_seconds and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
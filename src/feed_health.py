@@ -0,0 +1,117 @@
+"""
+Module for tracking the health of each RSS feed across runs.
+
+Every download records its latency and outcome. After FAILURE_THRESHOLD
+consecutive failures a feed's circuit opens and the feed is skipped until a
+backoff period passes; the next run then re-probes it once, doubling the
+backoff on every further failure. State is persisted as JSON so dead feeds are
+not retried at full cost on every unattended run.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_HEALTH_PATH = os.path.join("outputs", "cache", "feed_health.json")
+# Consecutive failures before a feed is skipped
+FAILURE_THRESHOLD = 3
+# First skip period once the circuit opens; doubles on every failed re-probe
+BASE_BACKOFF_SECONDS = 60 * 60
+MAX_BACKOFF_SECONDS = 7 * 24 * 60 * 60
+# Weight of the newest sample in the moving latency average
+LATENCY_SMOOTHING = 0.3
+
+class FeedHealth:
+    """
+    Persisted per-feed latency/failure stats and circuit breakers.
+    """
+
+    def __init__(self, path: str = DEFAULT_HEALTH_PATH, failure_threshold: int = FAILURE_THRESHOLD,
+                 base_backoff: float = BASE_BACKOFF_SECONDS, max_backoff: float = MAX_BACKOFF_SECONDS):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self.feeds: Dict[str, Dict] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.feeds = json.load(f)
+        except (OSError, ValueError):
+            self.feeds = {}
+
+    def _record(self, feed_url: str) -> Dict:
+        return self.feeds.setdefault(feed_url, {
+            "requests": 0,
+            "failures": 0,
+            "consecutive_failures": 0,
+            "avg_latency": None,
+            "last_latency": None,
+            "last_error": None,
+            "open_until": 0
+        })
+
+    def allow(self, feed_url: str, now: Optional[float] = None) -> bool:
+        """Return False while the feed's circuit is open."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self.feeds.get(feed_url, {}).get("open_until", 0) <= now
+
+    def record_success(self, feed_url: str, latency: float):
+        with self._lock:
+            record = self._record(feed_url)
+            self._add_latency(record, latency)
+            record["consecutive_failures"] = 0
+            record["open_until"] = 0
+
+    def record_failure(self, feed_url: str, latency: float, error: Exception, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            record = self._record(feed_url)
+            self._add_latency(record, latency)
+            record["failures"] += 1
+            record["consecutive_failures"] += 1
+            record["last_error"] = str(error)[:200]
+            over = record["consecutive_failures"] - self.failure_threshold
+            if over >= 0:
+                backoff = min(self.base_backoff * (2 ** over), self.max_backoff)
+                record["open_until"] = now + backoff
+
+    @staticmethod
+    def _add_latency(record: Dict, latency: float):
+        record["requests"] += 1
+        record["last_latency"] = round(latency, 3)
+        if record["avg_latency"] is None:
+            record["avg_latency"] = round(latency, 3)
+        else:
+            record["avg_latency"] = round(
+                LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * record["avg_latency"], 3
+            )
+
+    def stats(self) -> Dict[str, Dict]:
+        """Return a copy of the per-feed stats."""
+        with self._lock:
+            return {url: dict(record) for url, record in self.feeds.items()}
+
+    def report(self) -> str:
+        """Format the per-feed stats as a plain-text table, slowest first."""
+        now = time.time()
+        lines = [f"{'FEED':<60} {'REQ':>5} {'FAIL':>5} {'AVG(s)':>7} {'LAST(s)':>8}  STATE"]
+        stats = self.stats()
+        for url, record in sorted(stats.items(), key=lambda kv: kv[1]["avg_latency"] or 0, reverse=True):
+            state = "open" if record["open_until"] > now else "ok"
+            lines.append(
+                f"{url[:60]:<60} {record['requests']:>5} {record['failures']:>5} "
+                f"{record['avg_latency'] or 0:>7.2f} {record['last_latency'] or 0:>8.2f}  {state}"
+            )
+        return "\n".join(lines)
+
+    def save(self):
+        with self._lock:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.feeds, f, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,159 @@
+"""
+Module for turning downloaded feed bodies into plain entry dicts.
+
+RSS 2.0 and Atom documents are parsed with a streaming (iterparse) fast path
+that stops reading once a date-ordered feed has moved past the time window.
+Anything else (RSS 1.0/RDF, malformed XML, ...) falls back to feedparser.
+Functions here are top-level and picklable so they can run in a process pool.
+"""
+import calendar
+import html
+import io
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+DC_NS = "{http://purl.org/dc/elements/1.1/}"
+# Consecutive out-of-window entries after which a date-ordered feed is abandoned
+STOP_AFTER_OLD_ENTRIES = 3
+
+_TAG_RE = re.compile('<[^<]+?>')
+
+class UnsupportedFeed(Exception):
+    """Raised by the fast path for documents it does not handle."""
+
+def _clean_summary(summary: str) -> str:
+    # Simple HTML stripper
+    return html.unescape(_TAG_RE.sub('', summary or ''))
+
+def _parse_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _text(element: ET.Element, tag: str) -> str:
+    child = element.find(tag)
+    return (child.text or '').strip() if child is not None else ''
+
+def _rss_entry(item: ET.Element) -> Dict:
+    return {
+        'title': html.unescape(_text(item, 'title')),
+        'link': _text(item, 'link'),
+        'summary': _clean_summary(_text(item, 'description')),
+        'published_ts': _parse_date(_text(item, 'pubDate') or _text(item, f'{DC_NS}date'))
+    }
+
+def _atom_entry(entry: ET.Element) -> Dict:
+    link = ''
+    for link_el in entry.findall(f'{ATOM_NS}link'):
+        if link_el.get('rel', 'alternate') == 'alternate':
+            link = link_el.get('href', '')
+            break
+    summary = _text(entry, f'{ATOM_NS}summary') or _text(entry, f'{ATOM_NS}content')
+    return {
+        'title': html.unescape(_text(entry, f'{ATOM_NS}title')),
+        'link': link,
+        'summary': _clean_summary(summary),
+        'published_ts': _parse_date(_text(entry, f'{ATOM_NS}published') or _text(entry, f'{ATOM_NS}updated'))
+    }
+
+def parse_feed_streaming(body: bytes, since_ts: Optional[float] = None) -> Dict:
+    """
+    Stream an RSS 2.0 or Atom document entry by entry. While entries arrive
+    newest first, reading stops after STOP_AFTER_OLD_ENTRIES consecutive
+    entries older than since_ts. Raises UnsupportedFeed for other formats.
+    """
+    title = None
+    entries = []
+    item_tag = None
+    depth = 0
+    old_streak = 0
+    last_ts = None
+    ordered = True
+
+    for event, element in ET.iterparse(io.BytesIO(body), events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                # The feed title sits at <rss><channel><title> or <feed><title>
+                if element.tag == "rss":
+                    item_tag, title_tag, title_depth = "item", "title", 2
+                elif element.tag == f"{ATOM_NS}feed":
+                    item_tag, title_tag, title_depth = f"{ATOM_NS}entry", f"{ATOM_NS}title", 1
+                else:
+                    raise UnsupportedFeed(element.tag)
+            continue
+
+        depth -= 1
+        if element.tag == item_tag:
+            entry = _rss_entry(element) if item_tag == "item" else _atom_entry(element)
+            element.clear()
+            published_ts = entry['published_ts']
+            if published_ts is None:
+                continue
+            if last_ts is not None and published_ts > last_ts:
+                ordered = False
+            last_ts = published_ts
+            if since_ts is not None and published_ts <= since_ts:
+                old_streak += 1
+                if ordered and old_streak >= STOP_AFTER_OLD_ENTRIES:
+                    break
+                continue
+            old_streak = 0
+            entries.append(entry)
+        elif title is None and element.tag == title_tag and depth == title_depth:
+            title = html.unescape((element.text or '').strip()) or None
+
+    if item_tag is None:
+        raise UnsupportedFeed("empty document")
+    return {'title': title, 'entries': entries}
+
+def parse_feed_fallback(body: bytes, since_ts: Optional[float] = None) -> Dict:
+    """Parse any feed format with feedparser."""
+    import feedparser
+    feed = feedparser.parse(body)
+    entries = []
+    for entry in feed.entries:
+        # Parse publication date
+        published_time = None
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
+            published_time = calendar.timegm(entry.published_parsed)
+        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+            published_time = calendar.timegm(entry.updated_parsed)
+        if published_time is None:
+            continue
+        if since_ts is not None and published_time <= since_ts:
+            continue
+
+        entries.append({
+            'title': entry.get('title', ''),
+            'link': entry.get('link', ''),
+            'summary': _clean_summary(entry.get('summary', '')),
+            'published_ts': published_time
+        })
+    return {'title': feed.feed.get('title'), 'entries': entries}
+
+def parse_feed(body: bytes, since_ts: Optional[float] = None) -> Dict:
+    """
+    Parse a feed body into a plain, JSON-serializable dict:
+    {"title": feed title, "entries": [{"title", "link", "summary", "published_ts"}]}
+    Only entries published after since_ts (if given) are kept; entries without
+    a usable publication date are dropped.
+    """
+    try:
+        return parse_feed_streaming(body, since_ts)
+    except (ET.ParseError, UnsupportedFeed):
+        return parse_feed_fallback(body, since_ts)
@@ -0,0 +1,179 @@
+"""
+Module for tracking how much each RSS feed contributes to episodes and
+scheduling low-yield feeds less often.
+
+For every feed we count the items that survived the time-window cutoff, the
+items that made a category's top-k, and the items the generated script
+actually talked about. Feeds whose selected-item yield stays low, or whose
+newest entry has not changed since the last poll, are polled on a growing
+interval instead of every run; their last cached entries are reused in
+between. High-yield feeds are always polled.
+"""
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_YIELD_PATH = os.path.join("outputs", "cache", "feed_yield.json")
+# Polls observed before a feed may be polled less often
+MIN_POLLS = 5
+# Smoothed top-k items per poll at or above which a feed is always polled
+HIGH_YIELD = 0.5
+# Weight of the newest poll in the smoothed yield
+YIELD_SMOOTHING = 0.3
+# First back-off interval for low-yield feeds; doubles while they stay quiet
+BASE_INTERVAL_SECONDS = 12 * 60 * 60
+MAX_INTERVAL_SECONDS = 4 * 24 * 60 * 60
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "over", "after",
+    "about", "your", "have", "will", "says", "said", "what", "when", "how", "new"
+}
+
+def _keywords(text: str) -> set:
+    return {w for w in _WORD_RE.findall(text.lower()) if len(w) > 3 and w not in _STOPWORDS}
+
+class FeedScheduler:
+    """
+    Persisted per-feed yield stats and adaptive poll intervals.
+    """
+
+    def __init__(self, path: str = DEFAULT_YIELD_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._polled: set = set()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.feeds: Dict[str, Dict] = json.load(f)
+        except (OSError, ValueError):
+            self.feeds = {}
+
+    def _record(self, feed_url: str) -> Dict:
+        return self.feeds.setdefault(feed_url, {
+            "polls": 0,
+            "skipped": 0,
+            "recent": 0,
+            "selected": 0,
+            "scripted": 0,
+            "yield": None,
+            "newest_ts": None,
+            "changed": True,
+            "run_selected": 0,
+            "run_scripted": 0,
+            "interval": 0,
+            "next_poll": 0
+        })
+
+    def due(self, feed_url: str, now: Optional[float] = None) -> bool:
+        """Return True when the feed should be downloaded this run."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self.feeds.get(feed_url, {}).get("next_poll", 0) <= now
+
+    def record_skip(self, feed_url: str):
+        with self._lock:
+            self._record(feed_url)["skipped"] += 1
+
+    def record_poll(self, feed_url: str, feed: Dict):
+        """Record a download; the feed changed if it has a newer entry than last time."""
+        newest = max((entry["published_ts"] for entry in feed.get("entries", [])), default=None)
+        with self._lock:
+            record = self._record(feed_url)
+            record["polls"] += 1
+            changed = newest is not None and (record["newest_ts"] is None or newest > record["newest_ts"])
+            record["changed"] = changed
+            if changed:
+                record["newest_ts"] = newest
+            record["run_selected"] = 0
+            self._polled.add(feed_url)
+
+    def record_recent(self, feed_url: str, count: int = 1):
+        """Count items from this feed that survived the time-window cutoff."""
+        with self._lock:
+            self._record(feed_url)["recent"] += count
+
+    def record_selected(self, items: Iterable[Dict]):
+        """Count the items (carrying a "feed_url") that made a category's top-k."""
+        with self._lock:
+            for item in items:
+                if item.get("feed_url"):
+                    record = self._record(item["feed_url"])
+                    record["selected"] += 1
+                    record["run_selected"] += 1
+
+    def record_script(self, news_by_category: Dict[str, List[Dict]], script: List[Dict[str, str]]) -> int:
+        """
+        Count the selected items the script actually discussed: an item counts
+        when most of its title keywords appear somewhere in the dialogue.
+        The script is written after the run that fetched its news has
+        finished, so these items join the feed's sample at its next poll.
+        Returns the number of scripted items.
+        """
+        spoken = _keywords(" ".join(line.get("text", "") for line in script))
+        scripted = 0
+        with self._lock:
+            for items in news_by_category.values():
+                for item in items:
+                    keywords = _keywords(item.get("title", ""))
+                    if not item.get("feed_url") or not keywords:
+                        continue
+                    if len(keywords & spoken) / len(keywords) >= 0.5:
+                        record = self._record(item["feed_url"])
+                        record["scripted"] += 1
+                        record["run_scripted"] = record.get("run_scripted", 0) + 1
+                        scripted += 1
+        return scripted
+
+    def finish_run(self, now: Optional[float] = None):
+        """Update the smoothed yield and next poll time of every feed polled this run."""
+        now = time.time() if now is None else now
+        with self._lock:
+            for feed_url in self._polled:
+                record = self._record(feed_url)
+                # Scripted items were also selected, so they count twice
+                sample = record["run_selected"] + record.get("run_scripted", 0)
+                record["run_scripted"] = 0
+                if record["yield"] is None:
+                    record["yield"] = float(sample)
+                else:
+                    record["yield"] = YIELD_SMOOTHING * sample + (1 - YIELD_SMOOTHING) * record["yield"]
+
+                if record["polls"] < MIN_POLLS or record["yield"] >= HIGH_YIELD:
+                    record["interval"] = 0
+                elif record["changed"]:
+                    record["interval"] = BASE_INTERVAL_SECONDS
+                else:
+                    record["interval"] = min(max(record["interval"] * 2, BASE_INTERVAL_SECONDS), MAX_INTERVAL_SECONDS)
+                record["next_poll"] = now + record["interval"]
+            self._polled.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Return a copy of the per-feed yield stats."""
+        with self._lock:
+            return {url: dict(record) for url, record in self.feeds.items()}
+
+    def report(self) -> str:
+        """Format the per-feed yield stats as a plain-text table, highest yield first."""
+        now = time.time()
+        lines = [f"{'FEED':<60} {'POLLS':>5} {'SKIP':>5} {'RECENT':>6} {'TOPK':>5} {'SCRIPT':>6} {'YIELD':>6}  NEXT POLL"]
+        stats = self.stats()
+        for url, record in sorted(stats.items(), key=lambda kv: kv[1]["yield"] or 0, reverse=True):
+            wait_hours = max(0.0, (record["next_poll"] - now) / 3600)
+            next_poll = "every run" if wait_hours == 0 else f"in {wait_hours:.1f}h"
+            lines.append(
+                f"{url[:60]:<60} {record['polls']:>5} {record['skipped']:>5} {record['recent']:>6} "
+                f"{record['selected']:>5} {record['scripted']:>6} {record['yield'] or 0:>6.2f}  {next_poll}"
+            )
+        return "\n".join(lines)
+
+    def save(self):
+        with self._lock:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.feeds, f, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,93 @@
+"""
+Module for splitting lines that are too long for one TTS request.
+
+Google Cloud TTS rejects input over MAX_INPUT_BYTES; such a line used to fall
+back to gTTS and come out in the wrong voice. The line is instead cut at
+sentence boundaries (then clause and word boundaries for run-on sentences)
+into chunks of about equal size, the chunks are synthesized concurrently with
+the speaker's voice, and the parts are joined back into the line's clip.
+"""
+import math
+import os
+import re
+import subprocess
+from typing import List
+
+# Google Cloud TTS input limit per request
+MAX_INPUT_BYTES = 5000
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])[\"'”’)\]]*\s+")
+_CLAUSE_END_RE = re.compile(r"(?<=[,;:—])\s+")
+_WORD_GAP_RE = re.compile(r"\s+")
+
+def _size(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+def _split_keep(text: str, pattern: re.Pattern) -> List[str]:
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        pieces.append(text[start:match.end()])
+        start = match.end()
+    pieces.append(text[start:])
+    return [piece for piece in pieces if piece.strip()]
+
+def _pieces(text: str, max_bytes: int) -> List[str]:
+    """Split text into pieces of at most max_bytes, preferring sentence, then clause, then word boundaries."""
+    if _size(text) <= max_bytes:
+        return [text]
+    for pattern in (_SENTENCE_END_RE, _CLAUSE_END_RE, _WORD_GAP_RE):
+        parts = _split_keep(text, pattern)
+        if len(parts) > 1:
+            return [piece for part in parts for piece in _pieces(part, max_bytes)]
+    # A single "word" over the limit: cut it on character boundaries
+    pieces, current = [], ""
+    for char in text:
+        if current and _size(current + char) > max_bytes:
+            pieces.append(current)
+            current = ""
+        current += char
+    return pieces + [current]
+
+def chunk_text(text: str, max_bytes: int = MAX_INPUT_BYTES) -> List[str]:
+    """
+    Return text as one chunk if it fits max_bytes, else as the fewest
+    chunks of roughly equal size, each within max_bytes and cut at the
+    most natural boundary available.
+    """
+    text = text.strip()
+    total = _size(text)
+    if total <= max_bytes:
+        return [text]
+
+    target = total / math.ceil(total / max_bytes)
+    chunks: List[str] = []
+    current = ""
+    for piece in _pieces(text, max_bytes):
+        candidate = current + piece
+        # Close the chunk once it reaches its share, and never let it exceed the limit
+        if current and (_size(candidate) > max_bytes or _size(current) >= target):
+            chunks.append(current.strip())
+            current = piece
+        else:
+            current = candidate
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+def join_clips(parts: List[str], output_file: str):
+    """Concatenate MP3 parts into one clip without re-encoding, using ffmpeg."""
+    list_file = f"{output_file}.parts.txt"
+    try:
+        with open(list_file, "w", encoding="utf-8") as f:
+            for part in parts:
+                # ffmpeg requires forward slashes
+                safe_path = os.path.abspath(part).replace("\\", "/")
+                f.write(f"file '{safe_path}'\n")
+        subprocess.run(
+            ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file, "-c", "copy", output_file],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    finally:
+        if os.path.exists(list_file):
+            os.remove(list_file)
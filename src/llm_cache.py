@@ -0,0 +1,101 @@
+"""
+Module for caching Gemini responses on disk.
+
+Responses are content-addressed: the key is a hash of the model name, the full
+prompt and the generation settings, so rerunning a failed episode with the
+same news reuses the script and title instead of paying for (and getting a
+different) Gemini answer.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+DEFAULT_CACHE_DIR = os.path.join("outputs", "cache", "llm")
+# Responses older than this are ignored and evicted
+DEFAULT_TTL_SECONDS = 3 * 24 * 60 * 60
+# Most responses kept; the least recently used are evicted first
+DEFAULT_MAX_ENTRIES = 200
+
+def cache_key(model_name: str, prompt: str, settings: Optional[Dict] = None) -> str:
+    """Hash everything that determines a response."""
+    payload = json.dumps(
+        {"model": model_name, "prompt": prompt, "settings": settings or {}},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    On-disk LRU cache of model responses with a TTL.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if time.time() - record.get("created_at", 0) > self.ttl_seconds:
+            self.misses += 1
+            return None
+        # Bump the modification time so eviction sees this entry as recently used
+        os.utime(path)
+        self.hits += 1
+        return record["text"]
+
+    def put(self, key: str, text: str, model_name: Optional[str] = None):
+        record = {"model": model_name, "created_at": time.time(), "text": text}
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then the least recently used ones until at
+        most max_entries remain. Returns the number of files removed.
+        """
+        now = time.time()
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                files.append((os.stat(path).st_mtime, path))
+            except OSError:
+                continue
+
+        removed = 0
+        remaining = len(files)
+        # Least recently used first
+        for mtime, path in sorted(files):
+            if now - mtime <= self.ttl_seconds and remaining <= self.max_entries:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            remaining -= 1
+            removed += 1
+        return removed
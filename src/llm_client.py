@@ -0,0 +1,214 @@
+"""
+Module for the shared Gemini client used by every caller.
+
+Gemini is configured once per process and models are reused. Every request
+goes through one LLMClient, which:
+- waits on token buckets for requests per minute and tokens per minute, so
+  concurrent callers (script segments, tweets, ...) stay inside the quota,
+- caps the number of requests in flight,
+- retries 429 and 5xx errors with jittered exponential backoff, and
+- records per-call latency so a run can report where its time went.
+Limits default to the free-tier quota and can be raised with the GEMINI_RPM
+and GEMINI_TPM environment variables.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+import google.generativeai as genai
+
+try:
+    from .prompt_builder import estimate_tokens
+except ImportError:
+    from prompt_builder import estimate_tokens
+
+DEFAULT_REQUESTS_PER_MINUTE = 10
+DEFAULT_TOKENS_PER_MINUTE = 250_000
+# Requests allowed in flight at once across all callers
+DEFAULT_MAX_CONCURRENCY = 4
+# Output tokens reserved per call when the request does not set max_output_tokens
+DEFAULT_OUTPUT_TOKENS = 2000
+MAX_RETRIES = 4
+BASE_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Latency samples kept for the report
+LATENCY_SAMPLES = 500
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute, holding
+    at most capacity tokens (rate_per_minute by default).
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """Block until amount tokens are available and take them. Returns the time waited."""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = (amount - self.tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+def is_retryable(error: Exception) -> bool:
+    """429/5xx API errors and dropped connections are worth retrying."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return getattr(error, "code", None) in RETRYABLE_STATUS
+
+class PooledModel:
+    """
+    Drop-in stand-in for genai.GenerativeModel whose generate_content goes
+    through the shared client's limiter, retries and metrics.
+    """
+
+    def __init__(self, client: "LLMClient", model):
+        self._client = client
+        self._model = model
+        self.model_name = model.model_name
+
+    def generate_content(self, prompt: str, **kwargs):
+        return self._client.generate(self._model, prompt, **kwargs)
+
+class LLMClient:
+    """
+    Process-wide Gemini client with rate limiting, retries and latency metrics.
+    """
+
+    def __init__(self, api_key: str, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_retries: int = MAX_RETRIES, base_delay: float = BASE_RETRY_DELAY, max_delay: float = MAX_RETRY_DELAY,
+                 sleep: Callable[[float], None] = time.sleep):
+        genai.configure(api_key=api_key)
+        self.request_bucket = TokenBucket(requests_per_minute, sleep=sleep)
+        self.token_bucket = TokenBucket(tokens_per_minute, sleep=sleep)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._models: Dict[str, PooledModel] = {}
+        self._latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+
+    def model(self, model_name: str) -> PooledModel:
+        """Return the shared model for model_name, creating it on first use."""
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = PooledModel(self, genai.GenerativeModel(model_name))
+            return self._models[model_name]
+
+    def _reserve(self, prompt: str, generation_config: Optional[Dict]):
+        output_tokens = DEFAULT_OUTPUT_TOKENS
+        if isinstance(generation_config, dict) and generation_config.get("max_output_tokens"):
+            output_tokens = generation_config["max_output_tokens"]
+        waited = self.request_bucket.acquire()
+        waited += self.token_bucket.acquire(estimate_tokens(str(prompt)) + output_tokens)
+        if waited:
+            with self._lock:
+                self.throttled_seconds += waited
+
+    def generate(self, model, prompt: str, **kwargs):
+        """
+        Call model.generate_content under the rate limits, retrying retryable
+        errors with full-jitter exponential backoff. Streaming calls are only
+        retried while opening the stream.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._reserve(prompt, kwargs.get("generation_config"))
+            start = time.monotonic()
+            try:
+                with self._slots:
+                    response = model.generate_content(prompt, **kwargs)
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    with self._lock:
+                        self.calls += 1
+                        self.failures += 1
+                        self._latencies.append(time.monotonic() - start)
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+                print(f"[WARN] Gemini call failed ({e}); retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 1}/{self.max_retries + 1}).")
+                with self._lock:
+                    self.retries += 1
+                self._sleep(delay)
+                continue
+            with self._lock:
+                self.calls += 1
+                self._latencies.append(time.monotonic() - start)
+            return response
+
+    def list_models(self) -> List[Any]:
+        return list(genai.list_models())
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return call counts and latency percentiles (seconds)."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            metrics = {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "throttled_seconds": round(self.throttled_seconds, 2),
+            }
+        if latencies:
+            metrics["avg_latency"] = round(sum(latencies) / len(latencies), 3)
+            metrics["p50_latency"] = round(latencies[len(latencies) // 2], 3)
+            metrics["p95_latency"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+        return metrics
+
+    def report(self) -> str:
+        metrics = self.metrics()
+        line = (f"[INFO] Gemini: {metrics['calls']} calls, {metrics['retries']} retries, "
+                f"{metrics['failures']} failures, {metrics['throttled_seconds']}s throttled")
+        if "avg_latency" in metrics:
+            line += (f", latency avg {metrics['avg_latency']}s / p50 {metrics['p50_latency']}s "
+                     f"/ p95 {metrics['p95_latency']}s")
+        return line
+
+_shared_client: Optional[LLMClient] = None
+_shared_lock = threading.Lock()
+
+def get_client() -> Optional[LLMClient]:
+    """Return the process-wide client, or None when GEMINI_API_KEY is not set."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                print("❌ GEMINI_API_KEY not found. Please set it in .env")
+                return None
+            _shared_client = LLMClient(
+                api_key,
+                requests_per_minute=float(os.getenv("GEMINI_RPM", DEFAULT_REQUESTS_PER_MINUTE)),
+                tokens_per_minute=float(os.getenv("GEMINI_TPM", DEFAULT_TOKENS_PER_MINUTE))
+            )
+        return _shared_client
@@ -4,7 +4,10 @@ import os
 from datetime import datetime
 from dotenv import load_dotenv
 from news_fetcher import fetch_news
-from script_generator import generate_script
+from duration_estimator import DurationEstimator, record_rendered_episode
+from feed_scheduler import FeedScheduler
+from story_store import StoryStore
+from script_generator import fit_script_length, generate_script, generate_script_structured
 from audio_generator import generate_audio_files
 from podcast_producer import assemble_podcast
 
@@ -16,6 +19,9 @@ def main():
     parser.add_argument("--mode", choices=["daily", "weekly"], default="daily", help="Podcast mode: daily or weekly")
     parser.add_argument("--holiday", type=str, help="Optional holiday theme (e.g., 'Christmas')")
     parser.add_argument("--categories", type=str, default="ai,tech,business,science", help="Comma-separated list of categories (ai, tech, business, science, entertainment, politics)")
+    parser.add_argument("--from-store", action="store_true", help="Read news from the local story store filled by 'news_fetcher.py --ingest'")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call Gemini instead of reusing cached responses")
+    parser.add_argument("--structured", action="store_true", help="Get the script and title from one schema-constrained call")
     
     args = parser.parse_args()
     
@@ -28,14 +34,16 @@ def main():
         print(f"🎉 Holiday Theme: {args.holiday}")
 
     # 1. Fetch News
-    news = fetch_news(time_window="7d" if args.mode == "weekly" else "24h", categories=categories)
+    store = StoryStore() if args.from_store else None
+    news = fetch_news(time_window="7d" if args.mode == "weekly" else "24h", categories=categories, store=store)
     
     if not news:
         print("❌ No news found. Exiting.")
         return
 
     # 2. Generate Script
-    result = generate_script(news, mode=args.mode, holiday_theme=args.holiday)
+    generate = generate_script_structured if args.structured else generate_script
+    result = generate(news, mode=args.mode, holiday_theme=args.holiday, use_cache=not args.no_llm_cache)
     
     if not result or not result[0]:
         print("❌ Script generation failed. Exiting.")
@@ -43,6 +51,16 @@ def main():
     
     script, title = result
     
+    # Check the predicted duration before paying for TTS
+    estimator = DurationEstimator()
+    script = fit_script_length(script, news, mode=args.mode, holiday_theme=args.holiday,
+                               estimator=estimator, use_cache=not args.no_llm_cache)
+    
+    # Credit the feeds whose stories made it into the script
+    scheduler = FeedScheduler()
+    scheduler.record_script(news, script)
+    scheduler.save()
+    
     # Save script with title and date
     script_dir = "outputs/scripts"
     if not os.path.exists(script_dir):
@@ -57,7 +75,8 @@ def main():
     print(f"📝 Script saved to {script_filename}")
 
     # 3. Generate Audio
-    audio_files = asyncio.run(generate_audio_files(script, output_dir="outputs/temp_audio"))
+    clip_durations = {}
+    audio_files = asyncio.run(generate_audio_files(script, output_dir="outputs/temp_audio", durations=clip_durations))
     
     if not audio_files:
         print("❌ Audio generation failed. Exiting.")
@@ -65,7 +84,8 @@ def main():
 
     # 4. Assemble Podcast
     output_filename = os.path.join("outputs", f"{title}_{date_str}.mp3")
-    assemble_podcast(audio_files, output_file=output_filename)
+    if assemble_podcast(audio_files, output_file=output_filename):
+        record_rendered_episode(estimator, script, title, output_filename, clip_durations)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,96 @@
+"""
+Module for collapsing near-duplicate news stories.
+
+Stories are fingerprinted with a MinHash signature over word shingles of their
+title and summary. Signatures are split into bands and indexed by band value
+(locality-sensitive hashing), so each lookup only compares against stories
+that share a band instead of every story seen so far.
+"""
+import hashlib
+import random
+import re
+from typing import Dict, List, Optional, Tuple
+
+NUM_PERMUTATIONS = 32
+BANDS = 8
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+# Estimated Jaccard similarity at which two stories are considered the same
+DEFAULT_THRESHOLD = 0.6
+SHINGLE_SIZE = 2
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+_WORD_RE = re.compile(r"\w+")
+
+def _shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def minhash_signature(text: str) -> Tuple[int, ...]:
+    """Compute the MinHash signature of a piece of text."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for shingle in _shingles(text)
+    ]
+    if not hashes:
+        return tuple([_MERSENNE_PRIME] * NUM_PERMUTATIONS)
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERMUTATIONS
+
+def _story_text(item: Dict) -> str:
+    return f"{item.get('title', '')} {item.get('summary', '')}"
+
+class NearDuplicateIndex:
+    """
+    Index of stories seen so far in a run. add() returns the earlier story an
+    item duplicates (recording the new source on it), or None for a new story.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._by_link: Dict[str, Dict] = {}
+        self._bands: List[Dict[Tuple[int, ...], List[Tuple[Tuple[int, ...], Dict]]]] = [{} for _ in range(BANDS)]
+        self.duplicates = 0
+
+    @staticmethod
+    def _band_keys(signature: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        return [signature[i * ROWS_PER_BAND:(i + 1) * ROWS_PER_BAND] for i in range(BANDS)]
+
+    def _find(self, item: Dict, signature: Tuple[int, ...]) -> Optional[Dict]:
+        link = item.get("link")
+        if link and link in self._by_link:
+            return self._by_link[link]
+        for band, key in zip(self._bands, self._band_keys(signature)):
+            for other_signature, other in band.get(key, ()):
+                if similarity(signature, other_signature) >= self.threshold:
+                    return other
+        return None
+
+    def add(self, item: Dict) -> Optional[Dict]:
+        """
+        Index item unless it duplicates an earlier story. The canonical story
+        keeps a "sources" list of every feed that carried it.
+        """
+        signature = minhash_signature(_story_text(item))
+        canonical = self._find(item, signature)
+        if canonical is not None:
+            self.duplicates += 1
+            if item.get("source") and item["source"] not in canonical["sources"]:
+                canonical["sources"].append(item["source"])
+            return canonical
+
+        item.setdefault("sources", [item["source"]] if item.get("source") else [])
+        if item.get("link"):
+            self._by_link[item["link"]] = item
+        for band, key in zip(self._bands, self._band_keys(signature)):
+            band.setdefault(key, []).append((signature, item))
+        return None
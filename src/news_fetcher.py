@@ -1,12 +1,32 @@
 """
 Module for fetching news from RSS feeds.
 """
+import heapq
+import multiprocessing
+import threading
 import time
-import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
-from time import mktime
-from typing import Dict, List
-import feedparser
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from .feed_cache import FeedCache
+    from .feed_health import FeedHealth
+    from .feed_parser import parse_feed
+    from .feed_scheduler import FeedScheduler
+    from .news_dedupe import NearDuplicateIndex
+    from .story_store import StoryStore
+except ImportError:
+    from feed_cache import FeedCache
+    from feed_health import FeedHealth
+    from feed_parser import parse_feed
+    from feed_scheduler import FeedScheduler
+    from news_dedupe import NearDuplicateIndex
+    from story_store import StoryStore
 
 # Default RSS Feeds
 RSS_FEEDS = {
@@ -53,9 +73,269 @@ RSS_FEEDS = {
     ]
 }
 
-def fetch_news(time_window: str = "24h", categories: List[str] = None) -> Dict[str, List[Dict]]:
+# Maximum number of feeds downloaded at the same time
+DEFAULT_MAX_WORKERS = 8
+
+# Processes used to parse large feed bodies (0 parses in the download threads)
+DEFAULT_PARSE_WORKERS = 0
+
+# Bodies smaller than this are parsed inline even with parse workers; they
+# parse faster than the round trip to a worker process
+PARSE_POOL_MIN_BYTES = 512 * 1024
+
+# (connect, read) timeout for a single feed request, in seconds
+REQUEST_TIMEOUT = (5.0, 20.0)
+
+# Overall budget for downloading all feeds, in seconds
+FETCH_DEADLINE = 90.0
+
+# Stories kept per category
+TOP_K = 5
+
+# Seconds between passes of the background ingestion loop
+DEFAULT_INGEST_INTERVAL = 15 * 60
+
+USER_AGENT = "MeetTheClankers/1.0 (+https://open.spotify.com/show/0UelBMU4glDpp91tUpgzOG)"
+
+def _build_session(max_workers: int) -> requests.Session:
     """
-    Fetch news from RSS feeds based on time window and categories.
+    Build a requests session whose connection pool keeps one keep-alive
+    connection per worker for each host (techcrunch.com, theverge.com, ...).
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+class _ParsePool:
+    """
+    Process pool for parsing large feed bodies. Worker processes are only
+    spawned when the first large body arrives, so runs over small feeds
+    never pay their start-up cost.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def parse(self, body: bytes, since_ts: Optional[float]) -> Dict:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("parse pool is shut down")
+            if self._pool is None:
+                # "spawn" keeps worker start-up safe while download threads are running
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            pool = self._pool
+        return pool.submit(parse_feed, body, since_ts).result()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            self._closed = True
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=True)
+
+def _download_feed(session: requests.Session, feed_url: str, cache: Optional[FeedCache] = None,
+                   timeout: Tuple[float, float] = REQUEST_TIMEOUT, since_ts: Optional[float] = None,
+                   parse_pool: Optional[_ParsePool] = None,
+                   expired: Optional[threading.Event] = None) -> Dict:
+    """
+    Download and parse a single feed, keeping entries newer than since_ts.
+    When a cache is given, a conditional request is sent and a 304 Not
+    Modified answer reuses the cached entries. With a parse_pool a body of at
+    least PARSE_POOL_MIN_BYTES is parsed in another process while this
+    thread's peers keep downloading.
+    Once expired is set (the stage deadline passed) the body is not parsed.
+    """
+    record = cache.get(feed_url) if cache else None
+    if record and (record.get("since") or 0) > (since_ts or 0):
+        # Cached entries don't reach back far enough for this window
+        record = None
+    response = session.get(feed_url, headers=FeedCache.conditional_headers(record), timeout=timeout)
+    if response.status_code == 304 and record:
+        return cache.touch(feed_url, record)
+    response.raise_for_status()
+    if expired is not None and expired.is_set():
+        raise TimeoutError("fetch-stage deadline exceeded")
+    
+    if parse_pool is not None and len(response.content) >= PARSE_POOL_MIN_BYTES:
+        feed = parse_pool.parse(response.content, since_ts)
+    else:
+        feed = parse_feed(response.content, since_ts)
+    if cache:
+        cache.put(
+            feed_url,
+            feed,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            since=since_ts
+        )
+    return feed
+
+def _timed_download(session: requests.Session, feed_url: str, cache: Optional[FeedCache],
+                    latencies: Dict[str, float], timeout: Tuple[float, float], since_ts: Optional[float],
+                    parse_pool: Optional[_ParsePool], expired: threading.Event) -> Dict:
+    """
+    Download a feed and note its latency in latencies. The outcome is left to
+    the caller to record, so a feed that finishes after the deadline is not
+    counted a second time.
+    """
+    started = time.monotonic()
+    try:
+        return _download_feed(session, feed_url, cache, timeout, since_ts, parse_pool, expired)
+    finally:
+        latencies[feed_url] = time.monotonic() - started
+
+def _download_feeds(feed_urls: List[str], max_workers: int = DEFAULT_MAX_WORKERS, cache: Optional[FeedCache] = None,
+                    health: Optional[FeedHealth] = None, timeout: Tuple[float, float] = REQUEST_TIMEOUT,
+                    deadline: Optional[float] = FETCH_DEADLINE, since_ts: Optional[float] = None,
+                    parse_workers: int = DEFAULT_PARSE_WORKERS, scheduler: Optional[FeedScheduler] = None) -> Dict[str, Dict]:
+    """
+    Download every feed concurrently over a shared, connection-pooled session,
+    parsing large bodies in a pool of parse_workers processes (inline when 0).
+    Returns {feed_url: parsed feed}; feeds that fail, have an open circuit, or
+    are still running when the stage deadline passes are logged and left out.
+    Feeds the scheduler says are not due are served from the cache instead.
+    """
+    feeds = {}
+    if scheduler and cache:
+        pending = []
+        for feed_url in feed_urls:
+            record = None if scheduler.due(feed_url) else cache.get(feed_url)
+            if record and (record.get("since") or 0) <= (since_ts or 0):
+                print(f"[INFO] Skipping {feed_url}: low yield, reusing cached entries.")
+                scheduler.record_skip(feed_url)
+                feeds[feed_url] = record
+            else:
+                pending.append(feed_url)
+        feed_urls = pending
+    
+    if health:
+        skipped = [url for url in feed_urls if not health.allow(url)]
+        for feed_url in skipped:
+            print(f"[INFO] Skipping {feed_url}: circuit open after repeated failures.")
+        feed_urls = [url for url in feed_urls if url not in skipped]
+    
+    max_workers = max(1, max_workers)
+    downloads = {}
+    latencies = {}
+    late = set()
+    expired = threading.Event()
+    session = _build_session(max_workers)
+    parse_pool = None
+    if parse_workers > 0 and feed_urls:
+        parse_pool = _ParsePool(parse_workers)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for feed_url in feed_urls:
+            downloads[feed_url] = executor.submit(
+                _timed_download, session, feed_url, cache, latencies, timeout, since_ts, parse_pool, expired
+            )
+        _, late = wait(downloads.values(), timeout=deadline)
+    finally:
+        # Stragglers must not parse into a pool that is shutting down
+        expired.set()
+        # Don't wait for stragglers past the deadline
+        executor.shutdown(wait=not late, cancel_futures=True)
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=not late)
+    
+    for feed_url, download in downloads.items():
+        if download in late:
+            print(f"[ERROR] Failed to fetch {feed_url}: fetch-stage deadline of {deadline}s exceeded")
+            if health:
+                health.record_failure(feed_url, deadline, TimeoutError("fetch-stage deadline exceeded"))
+            continue
+        try:
+            feeds[feed_url] = download.result()
+        except Exception as e:
+            print(f"[ERROR] Failed to fetch {feed_url}: {e}")
+            if health:
+                health.record_failure(feed_url, latencies[feed_url], e)
+            continue
+        if health:
+            health.record_success(feed_url, latencies[feed_url])
+        if scheduler:
+            scheduler.record_poll(feed_url, feeds[feed_url])
+    if not late:
+        session.close()
+    
+    if cache:
+        cache.evict()
+        print(f"[INFO] Feed cache: {cache.hits} not modified, {cache.misses} downloaded.")
+    if health:
+        health.save()
+    return feeds
+
+def recency_score(item: Dict) -> str:
+    """Default ranking: newest first (the 'published' stamp sorts chronologically)."""
+    return item['published']
+
+class TopKRanker:
+    """
+    Streaming top-k selection over a bounded min-heap: memory stays O(k) no
+    matter how many items are pushed. Ties keep the earlier item.
+    """
+
+    def __init__(self, k: int = TOP_K, score: Callable[[Dict], Any] = recency_score):
+        self.k = k
+        self.score = score
+        self.seen = 0
+        self._heap = []
+
+    def push(self, item: Dict):
+        entry = (self.score(item), -self.seen, item)
+        self.seen += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def results(self) -> List[Dict]:
+        """Return the kept items, best first."""
+        return [item for _, _, item in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+def select_top_k(items: Iterable[Dict], k: int = TOP_K, score: Callable[[Dict], Any] = recency_score) -> List[Dict]:
+    """Keep the k highest-scoring items of a stream, best first."""
+    ranker = TopKRanker(k, score)
+    for item in items:
+        ranker.push(item)
+    return ranker.results()
+
+def iter_news(time_window: str = "24h", categories: List[str] = None, max_workers: int = DEFAULT_MAX_WORKERS,
+              use_cache: bool = True, cache: Optional[FeedCache] = None, dedupe: bool = True,
+              store: Optional[StoryStore] = None, timeout: Tuple[float, float] = REQUEST_TIMEOUT,
+              deadline: Optional[float] = FETCH_DEADLINE, use_health: bool = True,
+              health: Optional[FeedHealth] = None, parse_workers: int = DEFAULT_PARSE_WORKERS,
+              use_scheduler: bool = True, scheduler: Optional[FeedScheduler] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    Stream (category, item) pairs for every story inside the time window,
+    category by category, without building per-category lists.
+    
+    All selected feeds are downloaded concurrently (at most max_workers at a
+    time) over a shared, connection-pooled session before being parsed. Each
+    unique URL is fetched once per run, even when several categories list it,
+    and revalidated against the on-disk feed cache unless use_cache is False.
+    Bodies are parsed inline, or in parse_workers processes once they reach
+    PARSE_POOL_MIN_BYTES, and date-ordered feeds stop being read once they
+    pass the cutoff (see feed_parser).
+    
+    Each request is bounded by timeout and the whole download stage by
+    deadline. Unless use_health is False, per-feed latency and failures are
+    recorded and feeds that keep failing are skipped (see feed_health).
+    Unless use_scheduler is False, feeds that rarely make the top-k are polled
+    less often and their cached entries reused in between (see feed_scheduler).
+    
+    With dedupe enabled, near-duplicate stories (across feeds and categories)
+    are collapsed; the yielded item lists every feed that carried it under
+    "sources", which keeps growing as later copies are found.
+    
+    When a story store is given, the window is answered from it with an
+    indexed range query instead of a live crawl (see run_ingestion).
     """
     if categories is None:
         categories = ["ai", "tech", "business", "science"]
@@ -71,55 +351,177 @@ def fetch_news(time_window: str = "24h", categories: List[str] = None) -> Dict[s
         
     print(f"[INFO] Fetching news since {cutoff.strftime('%Y-%m-%d %H:%M')}...")
     
-    all_news = {}
-    
+    valid_categories = []
     for category in categories:
         if category not in RSS_FEEDS:
             print(f"[WARN] Category '{category}' not found. Skipping.")
             continue
-            
+        valid_categories.append(category)
+    
+    # Each unique URL is loaded once, then fanned out to its categories
+    feed_urls = list(dict.fromkeys(url for category in valid_categories for url in RSS_FEEDS[category]))
+    cutoff_ts = cutoff.timestamp()
+    if store is not None:
+        print("[INFO] Reading stories from the local story store...")
+        feeds = store.load_feeds(feed_urls, cutoff_ts)
+    else:
+        if use_cache and cache is None:
+            cache = FeedCache()
+        elif not use_cache:
+            cache = None
+        if use_health and health is None:
+            health = FeedHealth()
+        elif not use_health:
+            health = None
+        if use_scheduler and scheduler is None:
+            scheduler = FeedScheduler()
+        elif not use_scheduler:
+            scheduler = None
+        feeds = _download_feeds(feed_urls, max_workers, cache, health, timeout, deadline, cutoff_ts, parse_workers,
+                                scheduler)
+    
+    dedupe_index = NearDuplicateIndex() if dedupe else None
+    
+    for category in valid_categories:
         print(f"\n[INFO] Checking {category.upper()} feeds...")
-        category_news = []
         
         for feed_url in RSS_FEEDS[category]:
-            try:
-                feed = feedparser.parse(feed_url)
-                print(f"  - Parsing {feed.feed.get('title', feed_url)}...")
-                
-                for entry in feed.entries:
-                    # Parse publication date
-                    published_time = None
-                    if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                        published_time = datetime.fromtimestamp(mktime(entry.published_parsed), timezone.utc)
-                    elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                        published_time = datetime.fromtimestamp(mktime(entry.updated_parsed), timezone.utc)
-                        
-                    if published_time and published_time > cutoff:
-                        # Clean up summary (remove HTML tags)
-                        summary = entry.get('summary', '')
-                        summary = re.sub('<[^<]+?>', '', summary) # Simple HTML stripper
-                        
-                        category_news.append({
-                            'title': entry.title,
-                            'link': entry.link,
-                            'summary': summary[:500] + "..." if len(summary) > 500 else summary,
-                            'source': feed.feed.get('title', 'Unknown Source'),
-                            'published': published_time.strftime('%Y-%m-%d %H:%M')
-                        })
-            except Exception as e:
-                print(f"[ERROR] Failed to parse {feed_url}: {e}")
-                
-        # Sort by date (newest first) and limit
-        category_news.sort(key=lambda x: x['published'], reverse=True)
-        all_news[category] = category_news[:5] # Top 5 per category
-        print(f"  [SUCCESS] Found {len(category_news)} recent items for {category}.")
+            feed = feeds.get(feed_url)
+            if feed is None:
+                continue
+            print(f"  - Parsing {feed['title'] or feed_url}...")
+            
+            for entry in feed['entries']:
+                if entry['published_ts'] <= cutoff_ts:
+                    continue
+                try:
+                    summary = entry['summary']
+                    published_time = datetime.fromtimestamp(entry['published_ts'], timezone.utc)
+                    item = {
+                        'title': entry['title'],
+                        'link': entry['link'],
+                        'summary': summary[:500] + "..." if len(summary) > 500 else summary,
+                        'source': feed['title'] or 'Unknown Source',
+                        'published': published_time.strftime('%Y-%m-%d %H:%M'),
+                        'feed_url': feed_url
+                    }
+                except Exception as e:
+                    print(f"[ERROR] Failed to parse an entry of {feed_url}: {e}")
+                    continue
+                if dedupe_index is None or dedupe_index.add(item) is None:
+                    yield category, item
+                    
+    if dedupe_index:
+        print(f"\n[INFO] Collapsed {dedupe_index.duplicates} duplicate stories.")
+
+def fetch_news(time_window: str = "24h", categories: List[str] = None, max_workers: int = DEFAULT_MAX_WORKERS,
+               use_cache: bool = True, cache: Optional[FeedCache] = None, dedupe: bool = True,
+               store: Optional[StoryStore] = None, top_k: int = TOP_K,
+               score: Callable[[Dict], Any] = recency_score, timeout: Tuple[float, float] = REQUEST_TIMEOUT,
+               deadline: Optional[float] = FETCH_DEADLINE, use_health: bool = True,
+               health: Optional[FeedHealth] = None, parse_workers: int = DEFAULT_PARSE_WORKERS,
+               use_scheduler: bool = True, scheduler: Optional[FeedScheduler] = None) -> Dict[str, List[Dict]]:
+    """
+    Fetch news from RSS feeds based on time window and categories.
+    
+    Streams iter_news through a bounded heap per category and keeps the top_k
+    items by score (newest first by default). See iter_news for the fetching,
+    caching, timeout/health, scheduling, de-duplication and story store
+    options. Per-feed yield (recent and top-k items) is recorded in the
+    scheduler; call FeedScheduler.record_script once the script exists.
+    Runs answered from a story store poll no feeds, so they record no yield.
+    """
+    if categories is None:
+        categories = ["ai", "tech", "business", "science"]
+    if store is not None or not use_scheduler:
+        scheduler = None
+    elif scheduler is None:
+        scheduler = FeedScheduler()
+        
+    stream = iter_news(time_window=time_window, categories=categories, max_workers=max_workers,
+                       use_cache=use_cache, cache=cache, dedupe=dedupe, store=store,
+                       timeout=timeout, deadline=deadline, use_health=use_health, health=health,
+                       parse_workers=parse_workers, use_scheduler=use_scheduler, scheduler=scheduler)
+    
+    all_news = {}
+    for category, pairs in groupby(stream, key=itemgetter(0)):
+        ranker = TopKRanker(top_k, score)
+        for _, item in pairs:
+            if scheduler:
+                scheduler.record_recent(item['feed_url'])
+            ranker.push(item)
+        all_news[category] = ranker.results()
+        if scheduler:
+            scheduler.record_selected(all_news[category])
+        print(f"  [SUCCESS] Found {ranker.seen} recent items for {category}.")
+    if scheduler:
+        scheduler.finish_run()
+        scheduler.save()
+    
+    # Categories without a single recent item still get an (empty) entry
+    all_news = {category: all_news.get(category, []) for category in categories if category in RSS_FEEDS}
         
     total_items = sum(len(items) for items in all_news.values())
     print(f"\n[SUCCESS] Total news items fetched: {total_items}")
     return all_news
 
+def ingest_feeds(store: StoryStore, categories: List[str] = None, max_workers: int = DEFAULT_MAX_WORKERS,
+                 cache: Optional[FeedCache] = None, health: Optional[FeedHealth] = None) -> int:
+    """
+    Download the feeds of the given categories (all by default) once and
+    append their new entries to the story store. Returns the number added.
+    """
+    if categories is None:
+        categories = list(RSS_FEEDS)
+    feed_urls = list(dict.fromkeys(url for category in categories for url in RSS_FEEDS.get(category, [])))
+    feeds = _download_feeds(feed_urls, max_workers, cache, health)
+    
+    added = 0
+    for feed_url, feed in feeds.items():
+        added += store.add_feed(feed_url, feed)
+    store.prune()
+    print(f"[INFO] Ingested {added} new stories from {len(feeds)}/{len(feed_urls)} feeds.")
+    return added
+
+def run_ingestion(interval_seconds: float = DEFAULT_INGEST_INTERVAL, categories: List[str] = None,
+                  store: Optional[StoryStore] = None, iterations: Optional[int] = None):
+    """
+    Poll the feeds every interval_seconds and append new entries to the story
+    store, so weekly runs keep stories that have rolled off their feeds.
+    Runs forever unless iterations is given.
+    """
+    store = store or StoryStore()
+    cache = FeedCache()
+    health = FeedHealth()
+    count = 0
+    while iterations is None or count < iterations:
+        started = time.monotonic()
+        print(f"\n[INFO] Ingestion pass at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        try:
+            ingest_feeds(store, categories=categories, cache=cache, health=health)
+        except Exception as e:
+            print(f"[ERROR] Ingestion pass failed: {e}")
+        count += 1
+        if iterations is None or count < iterations:
+            time.sleep(max(0.0, interval_seconds - (time.monotonic() - started)))
+
 if __name__ == "__main__":
-    # Test run
-    news = fetch_news(categories=["ai", "tech"])
-    import json
-    print(json.dumps(news, indent=2, default=str))
+    import argparse
+    parser = argparse.ArgumentParser(description="Meet the Clankers - News Fetcher")
+    parser.add_argument("--ingest", action="store_true", help="Poll feeds into the local story store until stopped")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INGEST_INTERVAL, help="Seconds between ingestion passes")
+    parser.add_argument("--feed-stats", action="store_true", help="Show per-feed latency, failure and circuit breaker stats")
+    parser.add_argument("--feed-yield", action="store_true", help="Show per-feed yield and adaptive poll schedule")
+    args = parser.parse_args()
+    
+    if args.feed_stats:
+        print(FeedHealth().report())
+    elif args.feed_yield:
+        print(FeedScheduler().report())
+    elif args.ingest:
+        run_ingestion(interval_seconds=args.interval)
+    else:
+        # Test run
+        news = fetch_news(categories=["ai", "tech"])
+        import json
+        print(json.dumps(news, indent=2, default=str))
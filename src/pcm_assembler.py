@@ -0,0 +1,148 @@
+"""
+Module for assembling an episode from raw PCM in memory.
+
+In PCM mode every line is requested from TTS as LINEAR16 and kept as 16-bit
+mono samples at one sample rate; gTTS fallbacks (MP3) are decoded and
+resampled through an ffmpeg pipe. The episode is laid out in a single
+zero-filled buffer: each clip is written into its slice with its speaker's
+gain applied, and the pauses between clips are simply the slices left at
+zero. The buffer is encoded once, so the only file written is the episode
+itself: no per-line clips, no silence clip and no concat of files with
+mismatched sample rates.
+
+NumPy is used for the gain when installed; otherwise the standard library
+array module does the same work sample by sample.
+"""
+import io
+import subprocess
+import sys
+import wave
+from array import array
+from typing import Dict, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# WaveNet's native rate; everything is converted to this
+SAMPLE_RATE = 24000
+SAMPLE_WIDTH = 2
+# Silence after every clip (same as podcast_producer.assemble_podcast)
+PAUSE_SECONDS = 0.5
+# Per-speaker loudness adjustment in dB, applied at assembly
+SPEAKER_GAIN_DB = {"Zeta": 0.0, "Quill": 0.0}
+
+def read_wav(data: bytes) -> Tuple[bytes, int]:
+    """Return (16-bit mono frames, sample rate) of a WAV file held in memory."""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        if wav.getsampwidth() != SAMPLE_WIDTH or wav.getnchannels() != 1:
+            raise ValueError(f"expected 16-bit mono audio, got {wav.getsampwidth() * 8}-bit x{wav.getnchannels()}")
+        return wav.readframes(wav.getnframes()), wav.getframerate()
+
+def decode_audio(data: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """
+    Return audio as 16-bit mono PCM at sample_rate. WAV at the right rate is
+    unpacked directly; anything else (MP3, other rates) goes through ffmpeg
+    over pipes.
+    """
+    if data[:4] == b"RIFF":
+        try:
+            frames, rate = read_wav(data)
+            if rate == sample_rate:
+                return frames
+        except (wave.Error, ValueError):
+            pass
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", "pipe:0", "-f", "s16le", "-acodec", "pcm_s16le",
+         "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+        input=data, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    return result.stdout
+
+def apply_gain(pcm: bytes, gain_db: float) -> bytes:
+    """Scale 16-bit little-endian samples by gain_db, clipping at full scale."""
+    if not gain_db:
+        return pcm
+    factor = 10 ** (gain_db / 20.0)
+    if np is not None:
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) * factor
+        return np.clip(samples, -32768, 32767).astype("<i2").tobytes()
+    samples = array("h", pcm)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    scaled = array("h", (max(-32768, min(32767, int(sample * factor))) for sample in samples))
+    if sys.byteorder == "big":
+        scaled.byteswap()
+    return scaled.tobytes()
+
+class PCMAssembler:
+    """
+    Collects per-line PCM clips and lays them out as one episode buffer.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, pause_seconds: float = PAUSE_SECONDS,
+                 gains_db: Optional[Dict[str, float]] = None):
+        self.sample_rate = sample_rate
+        self.pause_seconds = pause_seconds
+        self.gains_db = SPEAKER_GAIN_DB if gains_db is None else gains_db
+        self.clips: Dict[int, Tuple[str, bytes]] = {}
+        # Lines voiced by a fallback provider instead of the speaker's own voice
+        self.fallbacks: Set[int] = set()
+
+    def add(self, index: int, speaker: str, pcm: bytes, fallback: bool = False):
+        # Drop a trailing odd byte so every clip holds whole samples
+        self.clips[index] = (speaker, pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH])
+        if fallback:
+            self.fallbacks.add(index)
+
+    def __len__(self) -> int:
+        return len(self.clips)
+
+    def durations(self, include_fallbacks: bool = True) -> Dict[int, float]:
+        """Exact duration in seconds of every clip (or only the primary voice's), keyed by script line index."""
+        return {
+            index: len(pcm) / (SAMPLE_WIDTH * self.sample_rate) for index, (_, pcm) in self.clips.items()
+            if include_fallbacks or index not in self.fallbacks
+        }
+
+    def render(self) -> bytes:
+        """Return the episode: clips in script order, each followed by a pause."""
+        pause = int(self.sample_rate * self.pause_seconds) * SAMPLE_WIDTH
+        total = sum(len(pcm) + pause for _, pcm in self.clips.values())
+        # Everything not covered by a clip stays zero, i.e. silence
+        buffer = bytearray(total)
+        position = 0
+        for index in sorted(self.clips):
+            speaker, pcm = self.clips[index]
+            buffer[position:position + len(pcm)] = apply_gain(pcm, self.gains_db.get(speaker, 0.0))
+            position += len(pcm) + pause
+        return bytes(buffer)
+
+def encode_episode(pcm: bytes, output_file: str, sample_rate: int = SAMPLE_RATE) -> Optional[str]:
+    """
+    Write the episode in one go: a .wav directly, anything else (MP3)
+    through a single ffmpeg encode fed over a pipe.
+    """
+    try:
+        if output_file.lower().endswith(".wav"):
+            with wave.open(output_file, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(SAMPLE_WIDTH)
+                wav.setframerate(sample_rate)
+                wav.writeframes(pcm)
+        else:
+            subprocess.run(
+                ["ffmpeg", "-y", "-v", "error", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+                 "-codec:a", "libmp3lame", "-q:a", "2", output_file],
+                input=pcm, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        print("[SUCCESS] Podcast saved successfully!")
+        return output_file
+    except subprocess.CalledProcessError as e:
+        print(f"[ERROR] FFmpeg failed: {e}")
+        print("👉 Ensure FFmpeg is installed and in your PATH.")
+        return None
+    except Exception as e:
+        print(f"[ERROR] Error assembling podcast: {e}")
+        return None
@@ -0,0 +1,144 @@
+"""
+Module for keeping Gemini prompts within a token budget.
+
+Token counts are estimated locally (about four characters per token for
+English text), which is close enough to budget against without a round-trip
+to the count_tokens endpoint. News is compacted before it goes into a prompt:
+feed boilerplate is trimmed, summaries that only repeat the title (or another
+item) are dropped, and when the prompt is still over budget the least
+important items are shortened, reduced to their titles and finally left out.
+The top item of every category is always kept.
+"""
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Rough characters per token for English prose
+CHARS_PER_TOKEN = 4
+# Whole-prompt budgets for the script prompt, per podcast mode
+SCRIPT_TOKEN_BUDGET = {"daily": 2500, "weekly": 4000}
+# Characters of selected script exchanges sent along with the tweet prompt
+TWEET_CONTEXT_CHARS = 3000
+# Summaries of less important items are cut to about this many characters first
+SHORT_SUMMARY_CHARS = 160
+# A summary sharing this share of its words with the title adds nothing
+REDUNDANT_OVERLAP = 0.8
+
+_BOILERPLATE_RES = [
+    re.compile(r"The post .{0,300}? appeared first on .{0,100}?(\.|$)", re.IGNORECASE),
+    re.compile(r"\b(Continue reading|Read more|Read the full (story|article)|Read full article)\b.*$", re.IGNORECASE),
+    re.compile(r"\[(…|\.\.\.|&#8230;)\]"),
+    # Hacker News "summaries" are only link metadata
+    re.compile(r"(Article URL|Comments URL|Points|# Comments):\s*\S+", re.IGNORECASE),
+]
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in text."""
+    return -(-len(text) // CHARS_PER_TOKEN) if text else 0
+
+def clean_summary(summary: str) -> str:
+    """Strip common feed boilerplate and collapse whitespace."""
+    for pattern in _BOILERPLATE_RES:
+        summary = pattern.sub(" ", summary)
+    return " ".join(summary.split())
+
+def _is_redundant(title: str, summary: str) -> bool:
+    summary_words = _WORD_RE.findall(summary.lower().rstrip("."))
+    if not summary_words:
+        return True
+    title_words = set(_WORD_RE.findall(title.lower()))
+    return sum(word in title_words for word in summary_words) / len(summary_words) >= REDUNDANT_OVERLAP
+
+def shorten_summary(summary: str, max_chars: int = SHORT_SUMMARY_CHARS) -> str:
+    """Keep the first sentence, cut at a word boundary if it is still too long."""
+    summary = _SENTENCE_END_RE.split(summary, maxsplit=1)[0]
+    if len(summary) <= max_chars:
+        return summary
+    return summary[:max_chars].rsplit(" ", 1)[0].rstrip(",;:") + "..."
+
+def importance(item: Dict) -> Tuple:
+    """Rank items by how many outlets covered the story, then by recency."""
+    return (len(item.get("sources") or [None]), item.get("published", ""))
+
+def compact_news(news_by_category: Dict[str, List[Dict]], max_tokens: int, format_item: Callable[[Dict], str],
+                 overhead_tokens: int = 0) -> Tuple[Dict[str, List[Dict]], Dict]:
+    """
+    Return a compacted copy of the news whose formatted items, plus
+    overhead_tokens for the rest of the prompt, fit in max_tokens, along with
+    a report {"tokens", "budget", "items", "total_items", "shortened", "dropped"}.
+    Input items are not modified.
+    """
+    compacted: Dict[str, List[Dict]] = {}
+    seen_summaries = set()
+    for category, items in news_by_category.items():
+        compacted[category] = []
+        for item in items:
+            item = dict(item)
+            summary = clean_summary(item.get("summary", ""))
+            key = summary.lower()
+            if _is_redundant(item.get("title", ""), summary) or key in seen_summaries:
+                summary = ""
+            seen_summaries.add(key)
+            item["summary"] = summary
+            compacted[category].append(item)
+
+    total_items = sum(len(items) for items in compacted.values())
+    costs = {id(item): estimate_tokens(format_item(item)) for items in compacted.values() for item in items}
+    tokens = overhead_tokens + sum(costs.values())
+    shortened = dropped = 0
+
+    # Least important first; the top item of each category is never dropped
+    ranked = sorted(
+        ((importance(item), position == 0, item)
+         for items in compacted.values() for position, item in enumerate(items)),
+        key=lambda entry: (entry[1], entry[0])
+    )
+    dropped_ids = set()
+    for level in ("short", "title_only", "drop"):
+        for _, protected, item in ranked:
+            if tokens <= max_tokens:
+                break
+            if level == "drop":
+                if not protected:
+                    dropped_ids.add(id(item))
+                    tokens -= costs[id(item)]
+                continue
+            summary = shorten_summary(item["summary"]) if level == "short" else ""
+            if summary == item["summary"]:
+                continue
+            item["summary"] = summary
+            cost = estimate_tokens(format_item(item))
+            tokens -= costs[id(item)] - cost
+            costs[id(item)] = cost
+            shortened += 1
+    if dropped_ids:
+        dropped = len(dropped_ids)
+        compacted = {
+            category: [item for item in items if id(item) not in dropped_ids]
+            for category, items in compacted.items()
+        }
+
+    report = {
+        "tokens": tokens,
+        "budget": max_tokens,
+        "items": total_items - dropped,
+        "total_items": total_items,
+        "shortened": shortened,
+        "dropped": dropped,
+    }
+    return compacted, report
+
+def log_prompt(name: str, prompt: str, budget: Optional[int] = None, report: Optional[Dict] = None) -> int:
+    """Print the estimated size of a prompt and return its token count."""
+    tokens = estimate_tokens(prompt)
+    message = f"[INFO] {name} prompt: ~{tokens} tokens"
+    if budget:
+        message += f" (budget {budget})"
+    if report and report["total_items"]:
+        message += (f", {report['items']}/{report['total_items']} news items kept, "
+                    f"{report['shortened']} summaries shortened")
+    print(message)
+    if budget and tokens > budget:
+        print(f"[WARN] {name} prompt is over its token budget even after compaction.")
+    return tokens
@@ -1,12 +1,106 @@
 """
 Module for generating podcast scripts using Google Gemini API.
 """
-import os
 import json
-from typing import Dict, List, Tuple
-import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-def generate_title(script: List[Dict[str, str]], model) -> str:
+try:
+    from .llm_cache import ResponseCache, cache_key
+    from .llm_client import get_client
+    from .duration_estimator import DurationEstimator, format_duration, target_range
+    from .script_schema import EPISODE_SCHEMA, ScriptValidationError, episode_lines, repair_json, validate_line, validate_lines
+    from .prompt_builder import SCRIPT_TOKEN_BUDGET, compact_news, estimate_tokens, log_prompt
+except ImportError:
+    from llm_cache import ResponseCache, cache_key
+    from llm_client import get_client
+    from duration_estimator import DurationEstimator, format_duration, target_range
+    from script_schema import EPISODE_SCHEMA, ScriptValidationError, episode_lines, repair_json, validate_line, validate_lines
+    from prompt_builder import SCRIPT_TOKEN_BUDGET, compact_news, estimate_tokens, log_prompt
+
+# Using gemini-2.5-flash for speed and cost efficiency
+MODEL_NAME = 'gemini-2.5-flash'
+
+# Hosts, output format and context shared by every script-writing prompt
+SCRIPT_PERSONA = """
+    You are the scriptwriter for a tech podcast called "Meet the Clankers".
+    
+    **Hosts:**
+    1. **Zeta**: Female AI. Energetic, optimistic, loves new tech, uses slang like "neural nets", "downloading", "glitch". She is the hype woman.
+    2. **Quill**: Male AI. Sarcastic, pragmatic, cynical, focuses on utility and "what works", hates hype. He is the grounded realist.
+    
+    **Format:**
+    - The output must be a JSON array of objects.
+    - Each object must have "speaker" ("Zeta" or "Quill") and "text" (the dialogue).
+    - Keep the conversation natural, banter-heavy, and fast-paced.
+    - Use the provided news items to drive the conversation.
+    - Smoothly transition between categories.
+    
+    **Context:**
+    - The podcast is named "Meet the Clankers" because the HOSTS (Zeta and Quill) are the "Clankers".
+    - Do NOT refer to the audience as "Clankers". Refer to them as "listeners", "humans", "folks", or "meatbags" (if Quill is speaking).
+    """
+
+# Extra attempts for a segment whose response is not a valid script
+SEGMENT_RETRIES = 2
+
+# Words per category segment in segmented mode
+SEGMENT_WORDS = {"daily": "300-500", "weekly": "400-600"}
+
+# Extra attempts in structured mode when the response cannot be repaired
+STRUCTURED_RETRIES = 2
+
+# Ask Gemini for JSON matching EPISODE_SCHEMA (title and lines in one call)
+STRUCTURED_CONFIG = {"response_mime_type": "application/json", "response_schema": EPISODE_SCHEMA}
+
+# Extend/regenerate attempts when a script's estimated duration is off target
+LENGTH_ATTEMPTS = 2
+
+# Closing lines kept after any extension inserted by the length gate
+SIGN_OFF_LINES = 2
+
+def _generate_text(model, prompt: str, cache: Optional[ResponseCache] = None, generation_config: Optional[Dict] = None,
+                   validate: Optional[Callable[[str], Any]] = None) -> str:
+    """
+    Call Gemini and return the response text. Identical requests (same model,
+    prompt and generation settings) are answered from the cache when given.
+    A response is only cached once validate (if any) accepts it without raising.
+    """
+    key = cache_key(model.model_name, prompt, generation_config) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            print("[INFO] Using cached Gemini response.")
+            return cached
+    
+    if generation_config:
+        response = model.generate_content(prompt, generation_config=generation_config)
+    else:
+        response = model.generate_content(prompt)
+    text = response.text
+    if validate:
+        validate(text)
+    if cache:
+        cache.put(key, text, model.model_name)
+    return text
+
+def _parse_script_json(text: str) -> List[Dict[str, str]]:
+    """
+    Parse the script JSON array out of a Gemini response, repairing near-valid
+    JSON. Lines that cannot be voiced (unknown speaker, no text) are dropped
+    rather than failing the episode; structured mode rewrites them instead.
+    """
+    return validate_lines(repair_json(text), strict=False)
+
+def _clean_title(title: str) -> str:
+    """Make a title filename-safe."""
+    title = title.replace('"', '').replace("'", "").replace(':', '').replace('/', '-')
+    title = title.replace('\\', '-').replace('|', '-').replace('?', '').replace('*', '')
+    title = title.replace('<', '').replace('>', '').replace('.', '')
+    title = '_'.join(title.split())  # Replace spaces with underscores
+    return title[:50]  # Limit length
+
+def generate_title(script: List[Dict[str, str]], model, cache: Optional[ResponseCache] = None) -> str:
     """
     Generate a short, quirky title for the podcast episode in Quill's sarcastic style.
     """
@@ -36,50 +130,33 @@ Script excerpt: {context}
 """
     
     try:
-        response = model.generate_content(prompt)
-        title = response.text.strip()
+        title = _generate_text(model, prompt, cache).strip()
         # Clean up title for filename safety
-        title = title.replace('"', '').replace("'", "").replace(':', '').replace('/', '-')
-        title = title.replace('\\', '-').replace('|', '-').replace('?', '').replace('*', '')
-        title = title.replace('<', '').replace('>', '').replace('.', '')
-        title = '_'.join(title.split())  # Replace spaces with underscores
-        return title[:50]  # Limit length
+        return _clean_title(title)
     except Exception as e:
         print(f"⚠️ Title generation failed: {e}. Using default.")
         return "Another_Day_Another_Glitch"
 
-def generate_script(news_by_category: Dict[str, List[Dict]], mode: str = "daily", holiday_theme: str = None) -> Tuple[List[Dict[str, str]], str]:
+def _format_news_item(item: Dict) -> str:
+    sources = ", ".join(item.get('sources') or [item['source']])
+    return f"- {item['title']}: {item['summary']} (Source: {sources})\n"
+
+def _compact_news(news_by_category: Dict[str, List[Dict]], mode: str, overhead_tokens: int,
+                  token_budget: Optional[int]) -> Tuple[Dict[str, List[Dict]], Dict, int]:
+    """Fit the news into the prompt budget for the mode. Returns (news, report, budget)."""
+    budget = token_budget or SCRIPT_TOKEN_BUDGET.get(mode, SCRIPT_TOKEN_BUDGET["daily"])
+    overhead_tokens += sum(estimate_tokens(f"\n--- CATEGORY: {category.upper()} ---\n") for category in news_by_category)
+    news, report = compact_news(news_by_category, budget, _format_news_item, overhead_tokens)
+    return news, report, budget
+
+def build_script_prefix(mode: str = "daily", structured: bool = False) -> str:
     """
-    Generate a podcast script using Gemini based on the provided news.
+    Build the static part of the script prompt: persona, target length, mode
+    and instructions. It only depends on the mode and always comes first, so
+    requests that repeat a prompt (retries, reruns on the same news) share
+    the longest possible prefix for Gemini's implicit prompt caching.
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("❌ GEMINI_API_KEY not found. Please set it in .env")
-        return [], "Error_No_API_Key"
-    
-    genai.configure(api_key=api_key)
-    # Using gemini-2.5-flash for speed and cost efficiency
-    model = genai.GenerativeModel('gemini-2.5-flash')
-
-    # Construct the prompt
-    prompt = """
-    You are the scriptwriter for a tech podcast called "Meet the Clankers".
-    
-    **Hosts:**
-    1. **Zeta**: Female AI. Energetic, optimistic, loves new tech, uses slang like "neural nets", "downloading", "glitch". She is the hype woman.
-    2. **Quill**: Male AI. Sarcastic, pragmatic, cynical, focuses on utility and "what works", hates hype. He is the grounded realist.
-    
-    **Format:**
-    - The output must be a JSON array of objects.
-    - Each object must have "speaker" ("Zeta" or "Quill") and "text" (the dialogue).
-    - Keep the conversation natural, banter-heavy, and fast-paced.
-    - Use the provided news items to drive the conversation.
-    - Smoothly transition between categories.
-    
-    **Context:**
-    - The podcast is named "Meet the Clankers" because the HOSTS (Zeta and Quill) are the "Clankers".
-    - Do NOT refer to the audience as "Clankers". Refer to them as "listeners", "humans", "folks", or "meatbags" (if Quill is speaking).
-    
+    prompt = SCRIPT_PERSONA + """
     **TARGET LENGTH: 10-15 minutes of audio (approximately 1,500-2,500 words total)**
     """
     
@@ -93,17 +170,7 @@ def generate_script(news_by_category: Dict[str, List[Dict]], mode: str = "daily"
 - Aim for 10-15 minutes (1,500-2,500 words).
 - Cover each story with enough detail to be informative and entertaining.
 """
-        
-    if holiday_theme:
-        prompt += f"- SPECIAL THEME: {holiday_theme}. Inject puns and references related to this theme throughout the script.\n"
-        
-    prompt += "\n**News Items:**\n"
     
-    for category, items in news_by_category.items():
-        prompt += f"\n--- CATEGORY: {category.upper()} ---\n"
-        for item in items:
-            prompt += f"- {item['title']}: {item['summary']} (Source: {item['source']})\n"
-            
     prompt += """
     \n**Instructions:**
     - Start with a catchy intro (30-60 seconds) introducing the hosts and today's topics.
@@ -119,25 +186,77 @@ def generate_script(news_by_category: Dict[str, List[Dict]], mode: str = "daily"
     - Make it feel like a real conversation between two distinct personalities.
     - RETURN ONLY VALID JSON. Do not include markdown formatting like ```json.
     """
+    if structured:
+        prompt += """- Return ONE JSON object: "lines" is the script array described above, and "title" is a
+      SHORT, QUIRKY episode title (3-5 words) in Quill's sarcastic style, e.g. "Overpromised and Underdelivered".
+    """
+    return prompt
+
+def build_script_prompt(news_by_category: Dict[str, List[Dict]], mode: str = "daily", holiday_theme: str = None,
+                        structured: bool = False, token_budget: Optional[int] = None, length_note: str = None) -> str:
+    """
+    Build the full script-writing prompt for the given news, mode and theme:
+    the static prefix from build_script_prefix followed by the theme and news.
+    With structured=True the prompt asks for a {"title", "lines"} object
+    instead of a bare array. The news is compacted to fit token_budget
+    (SCRIPT_TOKEN_BUDGET for the mode by default). length_note adds a
+    correction after a draft came out too long; it goes after the news so
+    the regenerated prompt starts the same way as the original.
+    """
+    prompt = build_script_prefix(mode, structured)
+    
+    if holiday_theme:
+        prompt += f"\n    - SPECIAL THEME: {holiday_theme}. Inject puns and references related to this theme throughout the script.\n"
+    
+    prompt += "\n**News Items:**\n"
+    
+    note = f"\n    - LENGTH: {length_note}\n" if length_note else ""
+    news_by_category, report, budget = _compact_news(news_by_category, mode, estimate_tokens(prompt + note),
+                                                     token_budget)
+    for category, items in news_by_category.items():
+        prompt += f"\n--- CATEGORY: {category.upper()} ---\n"
+        for item in items:
+            prompt += _format_news_item(item)
+    prompt += note
+    
+    log_prompt("Script", prompt, budget, report)
+    return prompt
+
+def _setup_model(use_cache: bool, cache: Optional[ResponseCache]) -> Tuple[Any, Optional[ResponseCache]]:
+    """Get the shared Gemini model and resolve the response cache. Returns (None, None) without an API key."""
+    client = get_client()
+    if client is None:
+        return None, None
+    
+    model = client.model(MODEL_NAME)
+    if use_cache and cache is None:
+        cache = ResponseCache()
+    elif not use_cache:
+        cache = None
+    return model, cache
+
+def generate_script(news_by_category: Dict[str, List[Dict]], mode: str = "daily", holiday_theme: str = None,
+                    use_cache: bool = True, cache: Optional[ResponseCache] = None) -> Tuple[List[Dict[str, str]], str]:
+    """
+    Generate a podcast script using Gemini based on the provided news.
+    
+    Script and title responses are served from the on-disk response cache
+    when the same request was made recently; pass use_cache=False to bypass it.
+    """
+    model, cache = _setup_model(use_cache, cache)
+    if model is None:
+        return [], "Error_No_API_Key"
+
+    prompt = build_script_prompt(news_by_category, mode, holiday_theme)
     
     print("[INFO] Generating script with Gemini...")
     try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        
-        # Clean up response if it contains markdown code blocks
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-            
-        script = json.loads(text)
+        text = _generate_text(model, prompt, cache, validate=_parse_script_json)
+        script = _parse_script_json(text)
         
         # Generate title
         print("[INFO] Generating episode title...")
-        title = generate_title(script, model)
+        title = generate_title(script, model, cache)
         print(f"[INFO] Episode title: {title}")
         
         return script, title
@@ -147,6 +266,446 @@ def generate_script(news_by_category: Dict[str, List[Dict]], mode: str = "daily"
         # print(f"Raw response: {text}") 
         return [], "Error_Episode"
 
+class IncrementalScriptParser:
+    """
+    Incrementally parse a streamed JSON array of {"speaker", "text"} objects.
+    feed() returns every object completed by the new chunk, so lines can be
+    used while the rest of the array is still being written. Anything before
+    the opening '[' (such as a markdown fence) or after the closing ']' is
+    ignored. Objects are checked like the batch path does (see
+    _parse_script_json), so lines that cannot be voiced are dropped.
+    """
+
+    def __init__(self):
+        self.lines: List[Dict[str, str]] = []
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buffer: List[str] = []
+        self._objects = 0
+
+    def _complete(self, text: str) -> Optional[Dict[str, str]]:
+        n = self._objects
+        self._objects += 1
+        try:
+            return validate_line(repair_json(text), n, strict=False)
+        except ScriptValidationError as e:
+            print(f"[WARN] Dropping script line {n}: {e}")
+            return None
+
+    def feed(self, chunk: str) -> List[Dict[str, str]]:
+        completed = []
+        for ch in chunk:
+            if self._finished:
+                break
+            if not self._started:
+                self._started = ch == '['
+                continue
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                    self._buffer = [ch]
+                elif ch == ']':
+                    self._finished = True
+                continue
+            
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    line = self._complete("".join(self._buffer))
+                    if line:
+                        completed.append(line)
+        self.lines.extend(completed)
+        return completed
+
+def generate_script_streaming(news_by_category: Dict[str, List[Dict]], mode: str = "daily", holiday_theme: str = None,
+                              on_line: Callable[[int, Dict[str, str]], None] = None, use_cache: bool = True,
+                              cache: Optional[ResponseCache] = None) -> Tuple[List[Dict[str, str]], str]:
+    """
+    Generate a podcast script with a streamed Gemini response, calling
+    on_line(index, line) as soon as each dialogue object is complete so audio
+    synthesis can start before the script is finished. Returns the same
+    (script, title) as generate_script once the stream ends.
+    """
+    model, cache = _setup_model(use_cache, cache)
+    if model is None:
+        return [], "Error_No_API_Key"
+
+    prompt = build_script_prompt(news_by_category, mode, holiday_theme)
+    parser = IncrementalScriptParser()
+    
+    def emit(lines):
+        # Lines have already been appended to parser.lines
+        start = len(parser.lines) - len(lines)
+        for offset, line in enumerate(lines):
+            if on_line:
+                on_line(start + offset, line)
+    
+    print("[INFO] Streaming script from Gemini...")
+    try:
+        key = cache_key(model.model_name, prompt) if cache else None
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            print("[INFO] Using cached Gemini response.")
+            emit(parser.feed(cached))
+        else:
+            chunks = []
+            for chunk in model.generate_content(prompt, stream=True):
+                chunks.append(chunk.text)
+                emit(parser.feed(chunk.text))
+            text = "".join(chunks)
+            # Only cache responses that parse as a whole
+            _parse_script_json(text)
+            if cache:
+                cache.put(key, text, model.model_name)
+        
+        script = parser.lines
+        if not script:
+            raise ValueError("no dialogue lines in response")
+        
+        # Generate title
+        print("[INFO] Generating episode title...")
+        title = generate_title(script, model, cache)
+        print(f"[INFO] Episode title: {title}")
+        
+        return script, title
+    except Exception as e:
+        print(f"[ERROR] Error generating script: {e}")
+        return [], "Error_Episode"
+
+def _segment_theme(mode: str, holiday_theme: str = None) -> str:
+    theme = "This is a WEEKLY SUMMARY episode." if mode == "weekly" else "This is a DAILY UPDATE episode."
+    if holiday_theme:
+        theme += f" SPECIAL THEME: {holiday_theme}. Inject puns and references related to this theme."
+    return theme
+
+def build_segment_prompts(news_by_category: Dict[str, List[Dict]], mode: str = "daily", holiday_theme: str = None,
+                          token_budget: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    Build one prompt per segment for segmented mode: the intro, one per
+    category and the sign-off. Returns (segment name, prompt) pairs in
+    episode order. The news across all segments is compacted to the same
+    budget as the single-call prompt.
+    """
+    theme = _segment_theme(mode, holiday_theme)
+    news_by_category, report, _ = _compact_news(news_by_category, mode, estimate_tokens(SCRIPT_PERSONA), token_budget)
+    rundown = "".join(
+        f"- {category.upper()}: " + "; ".join(item['title'] for item in items) + "\n"
+        for category, items in news_by_category.items()
+    )
+    
+    segments = [("intro", SCRIPT_PERSONA + f"""
+    **Task:** Write ONLY the opening of the episode (30-60 seconds, about 100-150 words).
+    {theme}
+    Zeta and Quill introduce themselves and tease today's topics without discussing any story in depth.
+    
+    **Today's rundown:**
+{rundown}
+    - RETURN ONLY VALID JSON. Do not include markdown formatting like ```json.
+    """)]
+    
+    for category, items in news_by_category.items():
+        news = "".join(_format_news_item(item) for item in items)
+        segments.append((category, SCRIPT_PERSONA + f"""
+    **Task:** Write ONLY the {category.upper()} segment of the episode ({SEGMENT_WORDS.get(mode, SEGMENT_WORDS["daily"])} words).
+    {theme}
+    Do NOT write an intro or a sign-off; start directly with the first story. Other segments are written separately.
+    - For EACH story: Zeta explains it with enthusiasm, Quill provides skeptical analysis and real-world implications.
+    - Include back-and-forth banter, disagreements, analogies and the occasional natural tangent.
+    
+    **News Items:**
+{news}
+    - RETURN ONLY VALID JSON. Do not include markdown formatting like ```json.
+    """))
+    
+    segments.append(("outro", SCRIPT_PERSONA + f"""
+    **Task:** Write ONLY the sign-off of the episode (about 30 seconds, 60-90 words).
+    {theme}
+    Zeta and Quill wrap up today's topics with a memorable goodbye.
+    
+    **Today's rundown:**
+{rundown}
+    - RETURN ONLY VALID JSON. Do not include markdown formatting like ```json.
+    """))
+    log_prompt(f"{len(segments)} segment", "".join(prompt for _, prompt in segments), report=report)
+    return segments
+
+def _generate_segment(model, name: str, prompt: str, cache: Optional[ResponseCache], retries: int = SEGMENT_RETRIES) -> List[Dict[str, str]]:
+    """Generate one segment, retrying only this segment on a bad response."""
+    for attempt in range(retries + 1):
+        try:
+            return _parse_script_json(_generate_text(model, prompt, cache, validate=_parse_script_json))
+        except Exception as e:
+            print(f"[WARN] Segment '{name}' failed (attempt {attempt + 1}/{retries + 1}): {e}")
+    return []
+
+def stitch_segments(model, segments: List[Tuple[str, List[Dict[str, str]]]], cache: Optional[ResponseCache] = None) -> List[Dict[str, str]]:
+    """
+    Join segments in order, asking Gemini for one short transition line at
+    each boundary between category segments. The transitions are optional:
+    if that small call fails the segments are simply concatenated.
+    """
+    boundaries = [
+        i for i in range(1, len(segments))
+        if segments[i - 1][0] != "intro" and segments[i][0] != "outro"
+    ]
+    transitions = {}
+    if boundaries:
+        pairs = "".join(
+            f"{n}. From {segments[i - 1][0].upper()} ending with "
+            f"{json.dumps(segments[i - 1][1][-1])} to {segments[i][0].upper()} starting with {json.dumps(segments[i][1][0])}\n"
+            for n, i in enumerate(boundaries, 1)
+        )
+        prompt = f"""
+    You are stitching together segments of the "Meet the Clankers" podcast, hosted by Zeta (upbeat) and Quill (sarcastic).
+    For each numbered boundary below, write ONE short transition line (one sentence) that segues naturally between the two segments.
+    
+{pairs}
+    Return ONLY a JSON array with exactly {len(boundaries)} objects, each with "speaker" ("Zeta" or "Quill") and "text", in order.
+    """
+        try:
+            lines = _parse_script_json(_generate_text(model, prompt, cache, validate=_parse_script_json))
+            if len(lines) == len(boundaries):
+                transitions = dict(zip(boundaries, lines))
+            else:
+                print(f"[WARN] Expected {len(boundaries)} transitions, got {len(lines)}. Skipping transitions.")
+        except Exception as e:
+            print(f"[WARN] Transition generation failed: {e}. Skipping transitions.")
+    
+    script = []
+    for i, (_, lines) in enumerate(segments):
+        if i in transitions:
+            script.append(transitions[i])
+        script.extend(lines)
+    return script
+
+def generate_script_segmented(news_by_category: Dict[str, List[Dict]], mode: str = "daily", holiday_theme: str = None,
+                              use_cache: bool = True, cache: Optional[ResponseCache] = None,
+                              max_workers: Optional[int] = None) -> Tuple[List[Dict[str, str]], str]:
+    """
+    Generate the script as independent segments (intro, one per category,
+    sign-off) requested concurrently, then stitch them with short transitions.
+    Wall time follows the longest segment, and a bad segment is retried on its
+    own; a category that still fails is left out. Returns (script, title)
+    like generate_script.
+    """
+    model, cache = _setup_model(use_cache, cache)
+    if model is None:
+        return [], "Error_No_API_Key"
+    
+    prompts = build_segment_prompts(news_by_category, mode, holiday_theme)
+    print(f"[INFO] Generating {len(prompts)} script segments with Gemini...")
+    with ThreadPoolExecutor(max_workers=max_workers or len(prompts)) as executor:
+        results = list(executor.map(lambda segment: _generate_segment(model, segment[0], segment[1], cache), prompts))
+    
+    segments = [(name, lines) for (name, _), lines in zip(prompts, results) if lines]
+    if not any(name not in ("intro", "outro") for name, _ in segments):
+        print("[ERROR] Error generating script: every news segment failed.")
+        return [], "Error_Episode"
+    for (name, _), lines in zip(prompts, results):
+        if not lines:
+            print(f"[WARN] Leaving out segment '{name}' after repeated failures.")
+    
+    script = stitch_segments(model, segments, cache)
+    
+    # Generate title
+    print("[INFO] Generating episode title...")
+    title = generate_title(script, model, cache)
+    print(f"[INFO] Episode title: {title}")
+    return script, title
+
+def _check_lines(lines: List[Any]) -> Tuple[List[Optional[Dict[str, str]]], List[Tuple[int, str]]]:
+    """
+    Validate raw script lines one by one. Returns the lines with None in
+    place of every bad line, and (index, problem) for each bad line.
+    """
+    checked, bad = [], []
+    for n, line in enumerate(lines):
+        try:
+            checked.append(validate_line(line, n))
+        except ScriptValidationError as e:
+            checked.append(None)
+            bad.append((n, str(e)))
+    return checked, bad
+
+def _check_episode(text: str):
+    """Accept a structured response that holds at least one valid line; the rest can be repaired."""
+    lines, _ = episode_lines(text)
+    if not any(_check_lines(lines)[0]):
+        raise ScriptValidationError("script has no valid lines")
+
+def _repair_lines(model, lines: List[Any], cache: Optional[ResponseCache] = None) -> List[Dict[str, str]]:
+    """
+    Validate structured script lines and ask Gemini to rewrite only the ones
+    that fail (unknown speaker, missing text), all in one call that sees each
+    bad line with its neighbours. Valid lines are kept as they are; a line
+    the rewrite cannot fix is dropped.
+    """
+    checked, bad = _check_lines(lines)
+    if not bad:
+        return [line for line in checked if line]
+    
+    print(f"[WARN] Repairing {len(bad)} invalid script line(s): {'; '.join(problem for _, problem in bad)}")
+    excerpts = []
+    for n, problem in bad:
+        before = next((line for line in reversed(checked[:n]) if line), None)
+        after = next((line for line in checked[n + 1:] if line), None)
+        excerpts.append(
+            f"    Line {len(excerpts) + 1} ({problem}): {json.dumps(lines[n])}\n"
+            f"      previous: {json.dumps(before)}\n      next: {json.dumps(after)}"
+        )
+    listing = "\n".join(excerpts)
+    prompt = SCRIPT_PERSONA + f"""
+    **Task:** Some lines of an episode script are invalid. Rewrite each one as a single valid line of dialogue
+    that fits between its neighbours. Keep what the line was saying where you can.
+    
+    **Invalid lines:**
+{listing}
+    - Return a JSON array of exactly {len(bad)} objects, one per invalid line, in the same order.
+    - RETURN ONLY VALID JSON. Do not include markdown formatting like ```json.
+    """
+    
+    def check_fixes(text):
+        fixes = repair_json(text)
+        if not isinstance(fixes, list) or len(fixes) != len(bad):
+            raise ScriptValidationError(f"expected {len(bad)} repaired lines")
+        return fixes
+    
+    try:
+        fixes = check_fixes(_generate_text(model, prompt, cache, validate=check_fixes))
+    except Exception as e:
+        print(f"[WARN] Could not repair script lines, dropping them: {e}")
+        fixes = [None] * len(bad)
+    for (n, _), fix in zip(bad, fixes):
+        checked[n] = validate_line(fix, n, strict=False) if fix is not None else None
+    return [line for line in checked if line]
+
+def generate_script_structured(news_by_category: Dict[str, List[Dict]], mode: str = "daily", holiday_theme: str = None,
+                               use_cache: bool = True, cache: Optional[ResponseCache] = None,
+                               retries: int = STRUCTURED_RETRIES) -> Tuple[List[Dict[str, str]], str]:
+    """
+    Generate the script and its title in a single Gemini call constrained by
+    a response schema. Near-valid JSON is repaired locally and invalid lines
+    are rewritten on their own (see _repair_lines), keeping the valid ones. A
+    response that cannot be repaired or has no valid line is regenerated up
+    to retries more times, and a missing title is regenerated on its own.
+    Returns (script, title) like generate_script.
+    """
+    model, cache = _setup_model(use_cache, cache)
+    if model is None:
+        return [], "Error_No_API_Key"
+    
+    prompt = build_script_prompt(news_by_category, mode, holiday_theme, structured=True)
+    
+    print("[INFO] Generating script and title with Gemini (structured output)...")
+    for attempt in range(retries + 1):
+        try:
+            text = _generate_text(model, prompt, cache, STRUCTURED_CONFIG, validate=_check_episode)
+            lines, title = episode_lines(text)
+            script = _repair_lines(model, lines, cache)
+            break
+        except Exception as e:
+            print(f"[WARN] Structured script failed (attempt {attempt + 1}/{retries + 1}): {e}")
+    else:
+        print("[ERROR] Error generating script: no valid response within the retry budget.")
+        return [], "Error_Episode"
+    
+    if title and _clean_title(title):
+        title = _clean_title(title)
+    else:
+        print("[INFO] Response had no title; generating episode title...")
+        title = generate_title(script, model, cache)
+    print(f"[INFO] Episode title: {title}")
+    return script, title
+
+def extend_script(model, script: List[Dict[str, str]], news_by_category: Dict[str, List[Dict]], extra_words: int,
+                  cache: Optional[ResponseCache] = None) -> List[Dict[str, str]]:
+    """
+    Ask Gemini for about extra_words more words of discussion and insert them
+    before the sign-off. Only the stories and the lines around the insertion
+    point are sent, not the whole script.
+    """
+    split = max(len(script) - SIGN_OFF_LINES, 0)
+    recent = "\n".join(json.dumps(line) for line in script[max(split - 6, 0):split])
+    rundown = "".join(
+        f"- {category.upper()}: " + "; ".join(item['title'] for item in items) + "\n"
+        for category, items in news_by_category.items()
+    )
+    prompt = SCRIPT_PERSONA + f"""
+    **Task:** The episode script is running short. Write about {extra_words} more words of dialogue that will be
+    inserted right before the sign-off. Go deeper on today's stories: more analysis, implications, disagreements
+    and analogies. Do NOT write an intro or a sign-off and do not repeat earlier lines.
+    
+    **Today's stories:**
+{rundown}
+    **The last lines before the insertion point:**
+{recent}
+    - RETURN ONLY VALID JSON. Do not include markdown formatting like ```json.
+    """
+    lines = _parse_script_json(_generate_text(model, prompt, cache, validate=_parse_script_json))
+    return script[:split] + lines + script[split:]
+
+def fit_script_length(script: List[Dict[str, str]], news_by_category: Dict[str, List[Dict]], mode: str = "daily",
+                      holiday_theme: str = None, estimator: Optional[DurationEstimator] = None, use_cache: bool = True,
+                      cache: Optional[ResponseCache] = None, attempts: int = LENGTH_ATTEMPTS) -> List[Dict[str, str]]:
+    """
+    Gate a script on its estimated duration before any TTS is spent. A script
+    that is too short is extended before the sign-off; one that is too long is
+    regenerated with an explicit word target. Gives up after attempts and
+    returns the closest script so far.
+    """
+    estimator = estimator or DurationEstimator()
+    low, high = target_range(mode)
+    seconds, direction = estimator.check(script, mode)
+    print(f"[INFO] Estimated duration: {format_duration(seconds)} (target {format_duration(low)}-{format_duration(high)})")
+    if direction == 0:
+        return script
+    
+    model, cache = _setup_model(use_cache, cache)
+    if model is None:
+        return script
+    
+    for attempt in range(attempts):
+        target_words = int((low + high) / 2 * estimator.words_per_second(script))
+        words = sum(len(line.get("text", "").split()) for line in script)
+        try:
+            if direction < 0:
+                print(f"[WARN] Script is too short; extending it (attempt {attempt + 1}/{attempts}).")
+                candidate = extend_script(model, script, news_by_category, target_words - words, cache)
+            else:
+                print(f"[WARN] Script is too long; regenerating it (attempt {attempt + 1}/{attempts}).")
+                note = (f"A previous draft ran about {words} words, which is too long. "
+                        f"Write about {target_words} words in total.")
+                prompt = build_script_prompt(news_by_category, mode, holiday_theme, length_note=note)
+                candidate = _parse_script_json(_generate_text(model, prompt, cache, validate=_parse_script_json))
+        except Exception as e:
+            print(f"[WARN] Length adjustment failed: {e}")
+            continue
+        
+        candidate_seconds, candidate_direction = estimator.check(candidate, mode)
+        print(f"[INFO] Estimated duration: {format_duration(candidate_seconds)}")
+        if abs(candidate_seconds - (low + high) / 2) < abs(seconds - (low + high) / 2):
+            script, seconds, direction = candidate, candidate_seconds, candidate_direction
+        if direction == 0:
+            break
+    else:
+        print("[WARN] Script is still outside the target length; continuing with the closest draft.")
+    return script
+
 if __name__ == "__main__":
     # Test stub
     pass
@@ -0,0 +1,178 @@
+"""
+Module for validating and repairing script responses from Gemini.
+
+Structured-output mode asks Gemini for a single JSON object holding both the
+episode title and the script lines, constrained by EPISODE_SCHEMA. Responses
+that are almost valid JSON (markdown fences, chatter around the JSON, trailing
+commas, an array cut off mid-object) are repaired locally instead of failing
+the whole run.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+SPEAKERS = ("Zeta", "Quill")
+
+# Gemini response schema for {"title": str, "lines": [{"speaker", "text"}]}
+EPISODE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "title": {"type": "STRING"},
+        "lines": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "speaker": {"type": "STRING", "enum": list(SPEAKERS)},
+                    "text": {"type": "STRING"}
+                },
+                "required": ["speaker", "text"]
+            }
+        }
+    },
+    "required": ["title", "lines"]
+}
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_TRAILING_COMMA_RE = re.compile(r",\s*([\]}])")
+
+class ScriptValidationError(ValueError):
+    """Raised when a response cannot be turned into a valid script."""
+
+def _strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing bracket, outside of strings."""
+    out = []
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "," and _TRAILING_COMMA_RE.match(text, i):
+            continue
+        out.append(ch)
+    return "".join(out)
+
+def _close_truncated(text: str) -> str:
+    """
+    Cut a truncated document back to the last complete object or array and
+    close every bracket still open at that point.
+    """
+    stack = []
+    in_string = escaped = False
+    last_safe = None
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "[{":
+            stack.append("]" if ch == "[" else "}")
+        elif ch in "]}":
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                return text[:i + 1]
+            last_safe = (i + 1, list(stack))
+    if last_safe is None:
+        raise ScriptValidationError("response holds no complete JSON object")
+    end, open_brackets = last_safe
+    return text[:end] + "".join(reversed(open_brackets))
+
+def repair_json(text: str) -> Any:
+    """
+    Parse near-valid JSON: strip markdown fences and any text around the
+    outermost object/array, drop trailing commas and close a truncated
+    document after its last complete element.
+    """
+    text = _FENCE_RE.sub("", text.strip())
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ScriptValidationError("response holds no JSON")
+    text = _strip_trailing_commas(text[min(starts):])
+    try:
+        return json.loads(_close_truncated(text))
+    except ValueError as e:
+        raise ScriptValidationError(f"unrepairable JSON: {e}") from e
+
+def validate_line(line: Any, n: int = 0, strict: bool = True) -> Optional[Dict[str, str]]:
+    """
+    Check one script line and return it with its speaker name normalized, or
+    None when its text is empty. A line with an unknown speaker or no text
+    raises; with strict=False it is dropped (None) with a warning instead.
+    """
+    problem = None
+    if not isinstance(line, dict):
+        problem = f"line {n} is not an object"
+    else:
+        speaker = str(line.get("speaker", "")).strip().capitalize()
+        text = line.get("text")
+        if speaker not in SPEAKERS:
+            problem = f"line {n} has unknown speaker {line.get('speaker')!r}"
+        elif not isinstance(text, str):
+            problem = f"line {n} has no text"
+    if problem:
+        if strict:
+            raise ScriptValidationError(problem)
+        print(f"[WARN] Dropping script {problem}.")
+        return None
+    if not text.strip():
+        return None
+    return {"speaker": speaker, "text": text.strip()}
+
+def validate_lines(lines: Any, strict: bool = True) -> List[Dict[str, str]]:
+    """
+    Check a list of script lines. Speaker names are normalized, lines with
+    empty text are dropped; any other bad line raises, or with strict=False
+    is dropped too. Raises if no spoken line is left.
+    """
+    if not isinstance(lines, list) or not lines:
+        raise ScriptValidationError("script is not a non-empty list")
+    valid = [line for line in (validate_line(line, n, strict) for n, line in enumerate(lines)) if line]
+    if not valid:
+        raise ScriptValidationError("script has no spoken lines")
+    return valid
+
+def episode_lines(text: str) -> Tuple[List[Any], Optional[str]]:
+    """
+    Repair a structured response into (raw lines, title) without checking
+    the lines themselves, so a caller can fix just the bad ones. A bare array
+    of lines is accepted too; title is None when it is missing or empty.
+    """
+    data = repair_json(text)
+    title = None
+    if isinstance(data, dict):
+        title = data.get("title")
+        title = title.strip() if isinstance(title, str) and title.strip() else None
+        data = data.get("lines")
+    elif not isinstance(data, list):
+        raise ScriptValidationError("response is not a JSON object")
+    if not isinstance(data, list) or not data:
+        raise ScriptValidationError("script is not a non-empty list")
+    return data, title
+
+def parse_episode(text: str) -> Tuple[List[Dict[str, str]], Optional[str]]:
+    """
+    Parse a structured response into (lines, title), validating every line.
+    title is None when it is missing or empty, so the caller can regenerate
+    just the title.
+    """
+    lines, title = episode_lines(text)
+    return validate_lines(lines), title
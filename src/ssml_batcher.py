@@ -0,0 +1,94 @@
+"""
+Module for packing script lines into SSML batches and splitting the audio.
+
+One TTS request per line means per-request overhead dominates an episode of
+100+ short lines. Lines are instead grouped per voice (in script order) and
+packed into SSML documents up to the API's input limit. Every line is
+preceded by a <mark>, and the timepoints Google returns for the marks say
+where each line starts in the batch audio, so the batch can be cut back into
+one clip per line and the rest of the pipeline (clip order, clip cache,
+podcast_producer.assemble_podcast) keeps seeing one file per line.
+
+Zeta and Quill alternate, so runs of consecutive lines for the same voice are
+mostly a single line; grouping all of a voice's lines is what brings the
+request count down by an order of magnitude.
+"""
+import subprocess
+from typing import Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+# Google Cloud TTS rejects input (including SSML tags) longer than this
+MAX_SSML_BYTES = 5000
+# Silence between lines in a batch, so every cut falls into a pause
+LINE_BREAK_MS = 300
+
+Entry = Tuple[int, Dict[str, str]]
+
+def mark_name(index: int) -> str:
+    return f"line_{index}"
+
+def _line_ssml(index: int, text: str) -> str:
+    return f'<mark name="{mark_name(index)}"/>{escape(text)}<break time="{LINE_BREAK_MS}ms"/>'
+
+def build_ssml(entries: Sequence[Entry]) -> str:
+    """SSML for a batch: each line preceded by its mark and followed by a short pause."""
+    return "<speak>" + "".join(_line_ssml(index, line["text"]) for index, line in entries) + "</speak>"
+
+def ssml_bytes(entries: Sequence[Entry]) -> int:
+    return len(build_ssml(entries).encode("utf-8"))
+
+def build_batches(entries: Sequence[Entry], max_bytes: int = MAX_SSML_BYTES) -> List[List[Entry]]:
+    """
+    Group (index, line) entries by speaker and pack each speaker's lines, in
+    script order, into batches whose SSML fits max_bytes. A line too long to
+    fit on its own ends up alone in its batch.
+    """
+    by_speaker: Dict[str, List[Entry]] = {}
+    for entry in entries:
+        by_speaker.setdefault(entry[1]["speaker"], []).append(entry)
+
+    overhead = len("<speak></speak>")
+    batches = []
+    for speaker_entries in by_speaker.values():
+        batch: List[Entry] = []
+        size = overhead
+        for index, line in speaker_entries:
+            cost = len(_line_ssml(index, line["text"]).encode("utf-8"))
+            if batch and size + cost > max_bytes:
+                batches.append(batch)
+                batch, size = [], overhead
+            batch.append((index, line))
+            size += cost
+        if batch:
+            batches.append(batch)
+    return batches
+
+def clip_spans(entries: Sequence[Entry], timepoints: Dict[str, float]) -> List[Tuple[float, Optional[float]]]:
+    """
+    Return a (start, end) span in seconds per entry from the marks' times.
+    The last line runs to the end of the audio (end None). The pause after
+    a line is split in half between the line and the next one. Raises
+    ValueError if a mark is missing or out of order.
+    """
+    starts = []
+    for index, _ in entries:
+        if mark_name(index) not in timepoints:
+            raise ValueError(f"no timepoint for {mark_name(index)}")
+        starts.append(timepoints[mark_name(index)])
+    if any(later < earlier for earlier, later in zip(starts, starts[1:])):
+        raise ValueError("timepoints out of order")
+
+    half_break = LINE_BREAK_MS / 2000.0
+    spans = []
+    for i, start in enumerate(starts):
+        end = max(start, starts[i + 1] - half_break) if i + 1 < len(starts) else None
+        spans.append((max(0.0, start - (half_break if i else 0.0)), end))
+    return spans
+
+def split_clip(source: str, start: float, end: Optional[float], output_file: str):
+    """Cut [start, end) out of an MP3 without re-encoding, using ffmpeg."""
+    cmd = ["ffmpeg", "-y", "-ss", f"{start:.3f}", "-i", source]
+    if end is not None:
+        cmd += ["-t", f"{end - start:.3f}"]
+    cmd += ["-c", "copy", output_file]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -0,0 +1,117 @@
+"""
+Module for persisting fetched stories in SQLite.
+
+The ingestion loop in news_fetcher appends new feed entries here as they
+appear, so a daily or weekly run can read its time window with an indexed
+range query instead of hoping each feed still holds enough history.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable
+
+DEFAULT_DB_PATH = os.path.join("outputs", "cache", "stories.db")
+# Stories older than this are pruned on every ingestion pass
+DEFAULT_RETENTION_SECONDS = 30 * 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stories (
+    feed_url TEXT NOT NULL,
+    link_hash TEXT NOT NULL,
+    link TEXT,
+    title TEXT,
+    summary TEXT,
+    published_ts REAL NOT NULL,
+    ingested_at REAL NOT NULL,
+    PRIMARY KEY (feed_url, link_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_stories_link_hash ON stories (link_hash);
+CREATE INDEX IF NOT EXISTS idx_stories_published ON stories (published_ts);
+CREATE TABLE IF NOT EXISTS feeds (
+    feed_url TEXT PRIMARY KEY,
+    title TEXT
+);
+"""
+
+def link_hash(entry: Dict) -> str:
+    """Stable key for an entry: its link, or title + date when it has none."""
+    key = entry.get("link") or f"{entry.get('title', '')}|{entry.get('published_ts')}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+class StoryStore:
+    """
+    SQLite-backed store of feed entries keyed by (feed URL, link hash).
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(_SCHEMA)
+
+    def add_feed(self, feed_url: str, feed: Dict) -> int:
+        """
+        Append the entries of a parsed feed, skipping ones already stored.
+        Returns the number of new entries.
+        """
+        now = time.time()
+        rows = [
+            (feed_url, link_hash(entry), entry.get("link"), entry.get("title"),
+             entry.get("summary"), entry["published_ts"], now)
+            for entry in feed.get("entries", [])
+        ]
+        with self.conn:
+            if feed.get("title"):
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO feeds (feed_url, title) VALUES (?, ?)",
+                    (feed_url, feed["title"])
+                )
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO stories "
+                "(feed_url, link_hash, link, title, summary, published_ts, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return self.conn.total_changes - before
+
+    def load_feeds(self, feed_urls: Iterable[str], since_ts: float) -> Dict[str, Dict]:
+        """
+        Return {feed_url: {"title", "entries"}} holding every stored entry
+        published after since_ts, in the same shape news_fetcher parses feeds to.
+        """
+        feed_urls = list(feed_urls)
+        feeds = {url: {"title": None, "entries": []} for url in feed_urls}
+        if not feed_urls:
+            return feeds
+        placeholders = ",".join("?" * len(feed_urls))
+        for url, title in self.conn.execute(
+            f"SELECT feed_url, title FROM feeds WHERE feed_url IN ({placeholders})", feed_urls
+        ):
+            feeds[url]["title"] = title
+        for url, link, title, summary, published_ts in self.conn.execute(
+            "SELECT feed_url, link, title, summary, published_ts FROM stories "
+            f"WHERE published_ts > ? AND feed_url IN ({placeholders}) "
+            "ORDER BY published_ts DESC",
+            [since_ts, *feed_urls]
+        ):
+            feeds[url]["entries"].append({
+                "title": title,
+                "link": link,
+                "summary": summary,
+                "published_ts": published_ts
+            })
+        return feeds
+
+    def prune(self, retention_seconds: float = DEFAULT_RETENTION_SECONDS) -> int:
+        """Delete stories published before the retention window."""
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM stories WHERE published_ts < ?", (time.time() - retention_seconds,)
+            )
+            return cursor.rowcount
+
+    def close(self):
+        self.conn.close()
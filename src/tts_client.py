@@ -0,0 +1,96 @@
+"""
+Module for the shared Google Cloud Text-to-Speech clients used by every line.
+
+Creating a TextToSpeechClient per line means a new gRPC channel, a new auth
+token and a new TLS handshake for each of the 100-200 lines of an episode.
+TTSClientPool creates a few clients once per run and hands them out
+round-robin (the clients are thread-safe, so a client can serve several lines
+at once); the pool size spreads concurrent requests over that many channels.
+The pool is closed when the run is done, or at exit as a safety net.
+"""
+import atexit
+import itertools
+import os
+import threading
+from typing import Any, Callable, List, Optional
+
+# Clients (gRPC channels) kept open; raise with TTS_POOL_SIZE for more concurrent lines
+DEFAULT_POOL_SIZE = 4
+
+def _default_factory():
+    from google.cloud import texttospeech
+    return texttospeech.TextToSpeechClient()
+
+def beta_client_factory():
+    """v1beta1 client; needed for SSML mark timepoints (see ssml_batcher)."""
+    from google.cloud import texttospeech_v1beta1
+    return texttospeech_v1beta1.TextToSpeechClient()
+
+class TTSClientPool:
+    """
+    Fixed-size pool of lazily created TTS clients, handed out round-robin.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, factory: Callable[[], Any] = _default_factory):
+        self.size = max(1, size)
+        self.factory = factory
+        self._clients: List[Any] = []
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self.closed = False
+        self.requests = 0
+
+    def client(self):
+        """Return the next client, creating it on first use."""
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("TTS client pool is closed")
+            self.requests += 1
+            if len(self._clients) < self.size:
+                self._clients.append(self.factory())
+                return self._clients[-1]
+            return self._clients[next(self._turn) % self.size]
+
+    @property
+    def created(self) -> int:
+        return len(self._clients)
+
+    def close(self):
+        """Close every client's channel. Safe to call more than once."""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            clients, self._clients = self._clients, []
+        for client in clients:
+            transport = getattr(client, "transport", None)
+            try:
+                if transport is not None:
+                    transport.close()
+            except Exception as e:
+                print(f"[WARN] Could not close TTS client: {e}")
+
+_shared_pool: Optional[TTSClientPool] = None
+_shared_lock = threading.Lock()
+
+def get_tts_pool(size: Optional[int] = None) -> TTSClientPool:
+    """
+    Return the process-wide pool, creating it on first use (or after it was
+    closed). size defaults to TTS_POOL_SIZE, else DEFAULT_POOL_SIZE.
+    """
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None or _shared_pool.closed:
+            size = size or int(os.getenv("TTS_POOL_SIZE", DEFAULT_POOL_SIZE))
+            _shared_pool = TTSClientPool(size)
+        return _shared_pool
+
+def close_tts_pool():
+    """Close the process-wide pool at the end of a run."""
+    global _shared_pool
+    with _shared_lock:
+        pool, _shared_pool = _shared_pool, None
+    if pool is not None:
+        pool.close()
+
+atexit.register(close_tts_pool)
@@ -0,0 +1,316 @@
+"""
+Module for failing over between TTS providers.
+
+Every provider (Google Cloud TTS, edge-tts, gTTS) has a circuit breaker
+shared by all lines of a run. A provider that fails failure_threshold times
+in a row, or fails in a way retrying cannot fix (missing credentials or
+package), is skipped by every remaining line until reset_seconds have passed;
+then a single line is let through to probe it. So when Google is down, a few
+lines pay for the failure instead of all 150. Lines are admitted before they
+wait in the TTS scheduler's queue, so the breaker is checked again when a
+line actually starts; lines queued behind the failures move on without
+calling the provider.
+
+With hedging on, a line whose primary provider has been working for longer
+than that provider's p95 latency (once there are enough samples) is also sent
+to the next provider, and whichever finishes first wins. The time a request
+spends queued in the TTS scheduler does not count; providers report when
+work on a line actually starts.
+
+Providers implement
+    async synthesize(text, speaker, output_file, on_start, label)
+writing an MP3 to output_file and calling on_start() (from any thread) when
+the request starts, so the chain can be exercised with local fakes. on_start
+raises BreakerOpen when the provider's breaker opened while the line was
+queued; providers let it propagate without starting the request.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+# Consecutive failures before a provider is skipped
+BREAKER_FAILURE_THRESHOLD = 3
+# How long a tripped provider is skipped before one line probes it again
+BREAKER_RESET_SECONDS = 120.0
+# Latency samples needed before a provider's p95 is trusted for hedging
+HEDGE_MIN_SAMPLES = 10
+LATENCY_SAMPLES = 200
+PERMANENT_STATUS = {401, 403}
+
+# edge-tts neural voices closest to the WaveNet voices in voices.VOICES
+EDGE_VOICES = {
+    "Zeta": {"voice": "en-US-AriaNeural", "rate": "+8%", "pitch": "+10Hz"},
+    "Quill": {"voice": "en-US-GuyNeural", "rate": "-5%", "pitch": "-8Hz"},
+}
+
+class ProviderUnavailable(Exception):
+    """The provider cannot work in this environment (package or credentials missing)."""
+
+class BreakerOpen(ProviderUnavailable):
+    """The provider's breaker opened while the line was waiting to start."""
+
+def is_permanent(error: Exception) -> bool:
+    """Failures that will not go away by retrying the next line."""
+    if isinstance(error, (ProviderUnavailable, ImportError)):
+        return True
+    # google.auth raises this when no credentials are configured
+    if type(error).__name__ == "DefaultCredentialsError":
+        return True
+    return getattr(error, "code", None) in PERMANENT_STATUS
+
+class CircuitBreaker:
+    """
+    Thread-safe closed / open / half-open breaker for one provider.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if self._clock() - self.opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """True if a line may use the provider. In half-open state only one probe is let through."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._clock() - self.opened_at >= self.reset_seconds and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self, permanent: bool = False) -> bool:
+        """Count a failure. Returns True if this failure opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            if not (permanent or self._probing or self.failures >= self.failure_threshold):
+                return False
+            newly_opened = self.opened_at is None or self._probing
+            self.opened_at = self._clock()
+            self._probing = False
+            if newly_opened:
+                self.trips += 1
+            return newly_opened
+
+class GTTSProvider:
+    """Google Translate TTS through gTTS: one voice for everyone, no credentials needed."""
+
+    name = "gtts"
+
+    async def synthesize(self, text: str, speaker: str, output_file: str,
+                         on_start: Callable[[], None] = lambda: None, label: str = "line"):
+        def run():
+            from gtts import gTTS
+            on_start()
+            gTTS(text=text, lang='en').save(output_file)
+        await asyncio.to_thread(run)
+
+class EdgeTTSProvider:
+    """Microsoft Edge neural voices through edge-tts (natively async)."""
+
+    name = "edge-tts"
+
+    def __init__(self, voices: Optional[Dict[str, Dict[str, str]]] = None):
+        self.voices = voices or EDGE_VOICES
+
+    async def synthesize(self, text: str, speaker: str, output_file: str,
+                         on_start: Callable[[], None] = lambda: None, label: str = "line"):
+        try:
+            import edge_tts
+        except ImportError as e:
+            raise ProviderUnavailable("edge-tts is not installed") from e
+        voice = self.voices.get(speaker, self.voices["Zeta"])
+        on_start()
+        await edge_tts.Communicate(text, voice["voice"], rate=voice["rate"], pitch=voice["pitch"]).save(output_file)
+
+def _percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class _Attempt:
+    """One provider working on one line."""
+
+    def __init__(self, chain: "ProviderChain", provider, text: str, speaker: str, output_file: str, label: str):
+        root, ext = os.path.splitext(output_file)
+        self.provider = provider
+        self.path = f"{root}.{provider.name}-partial{ext}"
+        self.started_at: Optional[float] = None
+        self._chain = chain
+        self._loop = asyncio.get_running_loop()
+        self.started = asyncio.Event()
+        # Created right after the breaker admitted the line: unless closed, this line is its probe
+        self.probe = chain.breakers[provider.name].state != "closed"
+        self.task = asyncio.create_task(provider.synthesize(text, speaker, self.path, self.mark_started, label))
+
+    def mark_started(self):
+        # May be called from a worker thread
+        if self.started_at is None:
+            breaker = self._chain.breakers[self.provider.name]
+            if not self.probe and breaker.state != "closed":
+                # Tripped while this line was queued; it may still become the half-open probe
+                if not breaker.allow():
+                    raise BreakerOpen(f"{self.provider.name} breaker opened while the line was queued")
+                self.probe = True
+            self.started_at = self._chain._clock()
+            self._loop.call_soon_threadsafe(self.started.set)
+
+class ProviderChain:
+    """
+    Ordered TTS providers with shared circuit breakers and optional hedging.
+    """
+
+    def __init__(self, providers: List, hedge: bool = False, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS, hedge_min_samples: int = HEDGE_MIN_SAMPLES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.providers = providers
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self._clock = clock
+        self.breakers = {
+            provider.name: CircuitBreaker(provider.name, failure_threshold, reset_seconds, clock)
+            for provider in providers
+        }
+        self._latencies = {provider.name: deque(maxlen=LATENCY_SAMPLES) for provider in providers}
+        self.served = {provider.name: 0 for provider in providers}
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def is_open(self, name: str) -> bool:
+        """True while the provider is being skipped (without using up a half-open probe)."""
+        return self.breakers[name].state == "open"
+
+    def hedge_after(self, name: str) -> Optional[float]:
+        """Seconds after which a request to the provider gets a backup, or None."""
+        samples = self._latencies[name]
+        if not self.hedge or len(samples) < self.hedge_min_samples:
+            return None
+        return _percentile(list(samples), 0.95)
+
+    def _settle(self, attempt: _Attempt, label: str) -> bool:
+        """Record a finished attempt's outcome. Returns True if it produced audio."""
+        provider = attempt.provider
+        error = attempt.task.exception()
+        if error is None:
+            self.breakers[provider.name].record_success()
+            if attempt.started_at is not None:
+                self._latencies[provider.name].append(self._clock() - attempt.started_at)
+            return True
+        _remove_quietly(attempt.path)
+        if isinstance(error, BreakerOpen):
+            # Never reached the provider: says nothing new about it
+            return False
+        if self.breakers[provider.name].record_failure(permanent=is_permanent(error)):
+            print(f"[WARN] {provider.name} TTS is failing ({error}); routing lines to the next provider "
+                  f"for {self.breakers[provider.name].reset_seconds:.0f}s.")
+        else:
+            print(f"[WARN] {provider.name} TTS failed for {label}: {error}")
+        return False
+
+    def _abandon(self, attempt: _Attempt, label: str):
+        """Let a losing attempt finish in the background, then record it and drop its audio."""
+        def done(task):
+            # Cancelled at shutdown: says nothing about the provider
+            if task.cancelled() or self._settle(attempt, label):
+                _remove_quietly(attempt.path)
+        if attempt.task.done():
+            done(attempt.task)
+        else:
+            attempt.task.add_done_callback(done)
+
+    def _backup(self, after: int, tried: set):
+        for provider in self.providers[after + 1:]:
+            if provider.name not in tried and self.breakers[provider.name].allow():
+                return provider
+        return None
+
+    async def _run(self, position: int, provider, tried: set, text: str, speaker: str, output_file: str,
+                   label: str) -> Optional[str]:
+        primary = _Attempt(self, provider, text, speaker, output_file, label)
+        attempts = [primary]
+        threshold = self.hedge_after(provider.name)
+        if threshold is not None:
+            # Wait for the request to start (it may be queued), then give it its p95
+            started = asyncio.create_task(primary.started.wait())
+            await asyncio.wait({primary.task, started}, return_when=asyncio.FIRST_COMPLETED)
+            started.cancel()
+            if not primary.task.done():
+                await asyncio.wait({primary.task}, timeout=threshold)
+            if not primary.task.done():
+                backup = self._backup(position, tried)
+                if backup is not None:
+                    tried.add(backup.name)
+                    self.hedged += 1
+                    print(f"[INFO] {provider.name} is slow on {label} (> p95 {threshold:.2f}s); "
+                          f"hedging with {backup.name}.")
+                    attempts.append(_Attempt(self, backup, text, speaker, output_file, label))
+
+        pending = {attempt.task: attempt for attempt in attempts}
+        while pending:
+            done, _ = await asyncio.wait(set(pending), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                attempt = pending.pop(task)
+                if self._settle(attempt, label):
+                    os.replace(attempt.path, output_file)
+                    for loser in pending.values():
+                        self._abandon(loser, label)
+                    if attempt is not primary:
+                        self.hedge_wins += 1
+                    self.served[attempt.provider.name] += 1
+                    return attempt.provider.name
+        return None
+
+    async def synthesize(self, text: str, speaker: str, output_file: str, label: str = "line") -> Optional[str]:
+        """
+        Write the line's audio to output_file with the first provider that
+        works. Returns the provider's name, or None if every provider failed
+        or is being skipped.
+        """
+        tried: set = set()
+        for position, provider in enumerate(self.providers):
+            if provider.name in tried or not self.breakers[provider.name].allow():
+                continue
+            tried.add(provider.name)
+            name = await self._run(position, provider, tried, text, speaker, output_file, label)
+            if name:
+                return name
+        return None
+
+    def report(self) -> str:
+        served = ", ".join(f"{name} {count}" for name, count in self.served.items() if count)
+        line = f"[INFO] TTS providers: {served or 'none'}"
+        trips = {name: breaker.trips for name, breaker in self.breakers.items() if breaker.trips}
+        if trips:
+            line += "; breaker trips: " + ", ".join(f"{name} {count}" for name, count in trips.items())
+        if self.hedge:
+            line += f"; {self.hedged} hedged requests, {self.hedge_wins} won by the backup"
+        return line
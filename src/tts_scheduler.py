@@ -0,0 +1,180 @@
+"""
+Module for scheduling Text-to-Speech requests.
+
+Firing every line of an episode at once bursts into the TTS quota, and every
+quota error used to mean a slow gTTS fallback. TTSScheduler instead:
+- runs at most `limit` requests at a time, and adapts that limit: a quota
+  error (429/503) halves it and pauses new dispatches with jittered
+  exponential backoff, and every `limit` successes in a row raise it by one
+  again, up to max_concurrency,
+- retries quota errors itself, so only lines that keep failing fall back,
+- hands free slots to the longest waiting line first, so the long lines do
+  not end up as stragglers at the end (shortest makespan), and
+- records characters per second and per-request latency for the run report.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Requests in flight at once; set TTS_CONCURRENCY to match the project's quota
+DEFAULT_TTS_CONCURRENCY = 6
+# Quota errors retried per line before it falls back
+MAX_QUOTA_RETRIES = 5
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+QUOTA_STATUS = {429, 503}
+# Latency samples kept for the report
+LATENCY_SAMPLES = 1000
+
+def is_quota_error(error: Exception) -> bool:
+    """Resource exhausted (429) and unavailable (503) answers mean: slow down and retry."""
+    return getattr(error, "code", None) in QUOTA_STATUS
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+class TTSScheduler:
+    """
+    Concurrency-limited, longest-first dispatcher for blocking TTS calls.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_TTS_CONCURRENCY, max_retries: int = MAX_QUOTA_RETRIES,
+                 base_delay: float = BASE_BACKOFF_SECONDS, max_delay: float = MAX_BACKOFF_SECONDS,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._active = 0
+        self._waiting: List = []
+        self._order = itertools.count()
+        # No dispatch before this time after a quota error
+        self._resume_at = 0.0
+        self._successes = 0
+        self._latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self.requests = 0
+        self.characters = 0
+        self.quota_errors = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls) -> "TTSScheduler":
+        return cls(int(os.getenv("TTS_CONCURRENCY", DEFAULT_TTS_CONCURRENCY)))
+
+    def _wake(self):
+        while self._waiting and self._active < self.limit:
+            _, _, future = heapq.heappop(self._waiting)
+            if future.done():
+                continue
+            self._active += 1
+            future.set_result(None)
+
+    async def _acquire(self, cost: int):
+        if self._started is None:
+            self._started = self._clock()
+        if self._active < self.limit and not self._waiting:
+            self._active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (-cost, next(self._order), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                # Woken and cancelled at the same time: hand the slot on
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+        delay = self._resume_at - self._clock()
+        if delay > 0:
+            await self._sleep(delay)
+
+    def _release(self):
+        self._active -= 1
+        self._wake()
+
+    def _throttle(self, attempt: int):
+        self.quota_errors += 1
+        self._successes = 0
+        self.limit = max(1, self.limit // 2)
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0)
+        self._resume_at = max(self._resume_at, self._clock() + delay)
+        return delay
+
+    def _succeeded(self, cost: int, latency: float):
+        self.requests += 1
+        self.characters += cost
+        self._latencies.append(latency)
+        self._finished = self._clock()
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_concurrency:
+            self.limit += 1
+            self._successes = 0
+
+    async def run(self, fn: Callable[[], T], cost: int, label: str = "request") -> T:
+        """
+        Run the blocking fn in a worker thread once a slot is free, retrying
+        quota errors. cost is the request's size in characters; it sets the
+        dispatch priority and the throughput figures. Other errors, and quota
+        errors after max_retries, are raised to the caller.
+        """
+        attempt = 0
+        while True:
+            await self._acquire(cost)
+            start = self._clock()
+            try:
+                result = await asyncio.to_thread(fn)
+            except Exception as e:
+                self._release()
+                if not is_quota_error(e) or attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                attempt += 1
+                delay = self._throttle(attempt)
+                print(f"[WARN] TTS quota hit for {label} ({e}); retrying in {delay:.1f}s "
+                      f"with {self.limit} requests in flight.")
+                continue
+            self._succeeded(cost, self._clock() - start)
+            self._release()
+            return result
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return request counts, characters per second and latency percentiles (seconds)."""
+        latencies = sorted(self._latencies)
+        metrics = {
+            "requests": self.requests,
+            "characters": self.characters,
+            "quota_errors": self.quota_errors,
+            "failures": self.failures,
+            "concurrency": self.limit,
+        }
+        if self._started is not None and self._finished is not None and self._finished > self._started:
+            metrics["chars_per_second"] = round(self.characters / (self._finished - self._started), 1)
+        if latencies:
+            metrics["p50_latency"] = round(_percentile(latencies, 0.5), 3)
+            metrics["p95_latency"] = round(_percentile(latencies, 0.95), 3)
+            metrics["p99_latency"] = round(_percentile(latencies, 0.99), 3)
+            metrics["max_latency"] = round(latencies[-1], 3)
+        return metrics
+
+    def report(self) -> str:
+        metrics = self.metrics()
+        line = (f"[INFO] TTS: {metrics['requests']} requests, {metrics['characters']} chars, "
+                f"{metrics['quota_errors']} quota errors, {metrics['failures']} failures")
+        if "chars_per_second" in metrics:
+            line += f", {metrics['chars_per_second']} chars/s"
+        if "p50_latency" in metrics:
+            line += (f", latency p50 {metrics['p50_latency']}s / p95 {metrics['p95_latency']}s "
+                     f"/ p99 {metrics['p99_latency']}s / max {metrics['max_latency']}s")
+        return line
@@ -1,11 +1,18 @@
 """
 Module for generating social media tweets using Google Gemini API.
 """
-import os
 import json
-import google.generativeai as genai
 from typing import List, Dict, Optional
 
+try:
+    from .context_selector import build_episode_context
+    from .llm_client import get_client
+    from .prompt_builder import TWEET_CONTEXT_CHARS, log_prompt
+except ImportError:
+    from context_selector import build_episode_context
+    from llm_client import get_client
+    from prompt_builder import TWEET_CONTEXT_CHARS, log_prompt
+
 def generate_tweets(script_content: List[Dict[str, str]], episode_title: str, model_name: str = 'gemini-2.5-flash') -> List[str]:
     """
     Generate engaging tweets based on the podcast script content.
@@ -18,19 +25,14 @@ def generate_tweets(script_content: List[Dict[str, str]], episode_title: str, mo
     Returns:
         List of generated tweets
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("❌ GEMINI_API_KEY not found. Please set it in .env")
+    client = get_client()
+    if client is None:
         return []
     
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name)
+    model = client.model(model_name)
     
-    # Prepare context from script (first 2000 chars to save tokens but get gist)
-    # Or better, combine all text until we hit a reasonable length limit
-    full_text = " ".join([f"{item['speaker']}: {item['text']}" for item in script_content])
-    # Truncate if too long (approx 10k chars should be enough context)
-    context = full_text[:15000]
+    # Prepare context from script: the most salient exchanges across the whole episode
+    context = build_episode_context(script_content, TWEET_CONTEXT_CHARS)
     
     spotify_link = "https://open.spotify.com/show/0UelBMU4glDpp91tUpgzOG"
     
@@ -56,10 +58,11 @@ def generate_tweets(script_content: List[Dict[str, str]], episode_title: str, mo
     - Be engaging and sound like a human (or a very clever AI) wrote it.
     - Do NOT include "Tweet 1:", "Tweet 2:" labels in the output. Just separate them with "---".
     
-    **Episode Context:**
+    **Episode Context (key exchanges from across the episode):**
     {context}
     """
     
+    log_prompt("Tweet", prompt)
     try:
         print("[INFO] Generating tweets with Gemini...")
         response = model.generate_content(prompt)
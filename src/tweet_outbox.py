@@ -0,0 +1,264 @@
+"""
+Module for a durable outbox of tweets waiting to be posted.
+
+Generated threads are enqueued in SQLite, and a worker posts them
+asynchronously. Every posted tweet's ID is stored as soon as the API returns
+it, so a thread interrupted by a crash, an error or the rate limit resumes from
+the last posted tweet on the next run instead of starting over. The worker
+paces itself from the rate-limit headers the API returns and never sleeps
+longer than it is allowed to; anything it cannot post now stays queued.
+
+The API object only needs create_tweet(text, in_reply_to_tweet_id) returning
+a PostResult (see twitter_poster.TwitterAPI), so tests can run against a
+local fake.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+DEFAULT_DB_PATH = os.path.join("outputs", "tweets", "outbox.db")
+MAX_TWEET_LENGTH = 280
+# Gap between consecutive tweets of a thread
+MIN_POST_INTERVAL = 1.0
+# Transient failures before a thread is given up
+MAX_ATTEMPTS = 5
+# First retry delay after a transient failure; doubles on every further failure
+BASE_RETRY_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    label TEXT,
+    reply_to TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tweets (
+    thread_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    tweet_id TEXT,
+    posted_at REAL,
+    PRIMARY KEY (thread_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_threads_due ON threads (status, next_attempt_at);
+"""
+
+class PostResult(NamedTuple):
+    tweet_id: str
+    # Requests left in the current rate-limit window and when it resets (epoch seconds)
+    remaining: Optional[int] = None
+    reset_at: Optional[float] = None
+
+class RateLimited(Exception):
+    """The API answered 429; nothing may be posted before reset_at."""
+
+    def __init__(self, reset_at: float):
+        super().__init__(f"rate limited until {time.strftime('%H:%M:%S', time.localtime(reset_at))}")
+        self.reset_at = reset_at
+
+class PermanentPostError(Exception):
+    """A failure retrying will not fix (bad credentials, missing permissions, ...)."""
+
+def _fit_tweet(text: str) -> str:
+    if len(text) > MAX_TWEET_LENGTH:
+        print(f"[WARN] Tweet is too long ({len(text)} chars). Truncating...")
+        return text[:MAX_TWEET_LENGTH - 3] + "..."
+    return text
+
+class TweetOutbox:
+    """
+    SQLite-backed queue of tweet threads and the IDs of their posted tweets.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    def enqueue(self, tweets: List[str], reply_to: Optional[str] = None, label: Optional[str] = None) -> int:
+        """Queue tweets to be posted as one thread. Returns the thread ID."""
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO threads (label, reply_to, created_at) VALUES (?, ?, ?)",
+                (label, reply_to, time.time())
+            )
+            thread_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO tweets (thread_id, position, text) VALUES (?, ?, ?)",
+                [(thread_id, position, _fit_tweet(text)) for position, text in enumerate(tweets)]
+            )
+        return thread_id
+
+    def due(self, now: Optional[float] = None) -> List[int]:
+        """IDs of pending threads whose next attempt is due, oldest first."""
+        now = time.time() if now is None else now
+        rows = self.conn.execute(
+            "SELECT id FROM threads WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id",
+            (now,)
+        )
+        return [row["id"] for row in rows]
+
+    def thread(self, thread_id: int) -> Dict[str, Any]:
+        """Return a thread with its tweets (in order) as a plain dict."""
+        row = self.conn.execute("SELECT * FROM threads WHERE id = ?", (thread_id,)).fetchone()
+        thread = dict(row)
+        thread["tweets"] = [
+            dict(tweet) for tweet in self.conn.execute(
+                "SELECT position, text, tweet_id, posted_at FROM tweets WHERE thread_id = ? ORDER BY position",
+                (thread_id,)
+            )
+        ]
+        return thread
+
+    def mark_posted(self, thread_id: int, position: int, tweet_id: str):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tweets SET tweet_id = ?, posted_at = ? WHERE thread_id = ? AND position = ?",
+                (tweet_id, time.time(), thread_id, position)
+            )
+
+    def mark_done(self, thread_id: int):
+        with self.conn:
+            self.conn.execute("UPDATE threads SET status = 'done', last_error = NULL WHERE id = ?", (thread_id,))
+
+    def defer(self, thread_id: int, until: float, error: Optional[str] = None, count_attempt: bool = False):
+        """Push the thread's next attempt back, optionally counting a failed attempt."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE threads SET next_attempt_at = ?, last_error = COALESCE(?, last_error), "
+                "attempts = attempts + ? WHERE id = ?",
+                (until, error, 1 if count_attempt else 0, thread_id)
+            )
+
+    def mark_failed(self, thread_id: int, error: str):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE threads SET status = 'failed', last_error = ?, attempts = attempts + 1 WHERE id = ?",
+                (error[:200], thread_id)
+            )
+
+    def stats(self) -> Dict[str, int]:
+        """Number of threads per status."""
+        rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM threads GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        self.conn.close()
+
+class OutboxWorker:
+    """
+    Posts due threads from an outbox, resuming partially posted ones and
+    pacing itself by the API's rate-limit headers.
+    """
+
+    def __init__(self, outbox: TweetOutbox, api, min_interval: float = MIN_POST_INTERVAL,
+                 max_attempts: int = MAX_ATTEMPTS, base_retry: float = BASE_RETRY_SECONDS,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self.outbox = outbox
+        self.api = api
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.base_retry = base_retry
+        self._clock = clock
+        self._sleep = sleep
+        # Earliest time the next tweet may go out
+        self._next_post_at = 0.0
+        self.posted = 0
+
+    def _pace(self, result: PostResult):
+        now = self._clock()
+        self._next_post_at = now + self.min_interval
+        if result.remaining is not None and result.remaining <= 0 and result.reset_at:
+            self._next_post_at = max(self._next_post_at, result.reset_at)
+
+    async def post_thread(self, thread_id: int, max_wait: float) -> bool:
+        """
+        Post the unposted tweets of a thread in order. Returns False when the
+        worker has to stop (rate limit further away than max_wait), True
+        otherwise, including when the thread failed or was deferred.
+        """
+        thread = self.outbox.thread(thread_id)
+        previous_id = thread["reply_to"]
+        for tweet in thread["tweets"]:
+            if tweet["tweet_id"]:
+                previous_id = tweet["tweet_id"]
+                continue
+
+            while True:
+                delay = self._next_post_at - self._clock()
+                if delay > max_wait:
+                    self.outbox.defer(thread_id, self._next_post_at)
+                    return False
+                if delay > 0:
+                    await self._sleep(delay)
+                try:
+                    # The API client blocks; keep it off the event loop so audio work continues
+                    result = await asyncio.to_thread(self.api.create_tweet, tweet["text"], previous_id)
+                    break
+                except RateLimited as e:
+                    # Wait for the window to reset (or stop, if that is too far away)
+                    print(f"[WARN] Twitter {e}.")
+                    self._next_post_at = e.reset_at
+                except PermanentPostError as e:
+                    print(f"[ERROR] Giving up on thread {thread_id}: {e}")
+                    self.outbox.mark_failed(thread_id, str(e))
+                    return True
+                except Exception as e:
+                    attempts = thread["attempts"] + 1
+                    if attempts >= self.max_attempts:
+                        print(f"[ERROR] Giving up on thread {thread_id} after {attempts} attempts: {e}")
+                        self.outbox.mark_failed(thread_id, str(e))
+                    else:
+                        retry_at = self._clock() + self.base_retry * (2 ** (attempts - 1))
+                        print(f"[WARN] Posting thread {thread_id} failed ({e}); retrying later.")
+                        self.outbox.defer(thread_id, retry_at, str(e)[:200], count_attempt=True)
+                    return True
+
+            self.outbox.mark_posted(thread_id, tweet["position"], result.tweet_id)
+            self._pace(result)
+            self.posted += 1
+            previous_id = result.tweet_id
+            print(f"   [SUCCESS] Posted tweet {tweet['position'] + 1}/{len(thread['tweets'])} of thread {thread_id}! ID: {previous_id}")
+
+        self.outbox.mark_done(thread_id)
+        return True
+
+    async def drain(self, max_wait: float = 60.0) -> int:
+        """
+        Post every due thread, waiting at most max_wait at a time for the rate
+        limit. Returns the number of tweets posted.
+        """
+        posted_before = self.posted
+        for thread_id in self.outbox.due(self._clock()):
+            if not await self.post_thread(thread_id, max_wait):
+                break
+        return self.posted - posted_before
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Post queued tweets from the outbox")
+    parser.add_argument("--status", action="store_true", help="Show the number of queued, posted and failed threads")
+    args = parser.parse_args()
+
+    load_dotenv()
+    outbox = TweetOutbox()
+    if args.status:
+        print(outbox.stats())
+    else:
+        from twitter_poster import get_twitter_api
+        api = get_twitter_api()
+        if api:
+            posted = asyncio.run(OutboxWorker(outbox, api).drain())
+            print(f"[INFO] Posted {posted} tweets. Outbox: {outbox.stats()}")
+    outbox.close()
@@ -1,22 +1,65 @@
 """
 Module for posting tweets to X (Twitter) using the API v2.
 """
+import asyncio
 import os
 import time
 import tweepy
+import requests
 from typing import List, Optional
 
-def post_tweets(tweets: List[str], reply_to_status_id: str = None) -> bool:
+try:
+    from .tweet_outbox import OutboxWorker, PermanentPostError, PostResult, RateLimited, TweetOutbox
+except ImportError:
+    from tweet_outbox import OutboxWorker, PermanentPostError, PostResult, RateLimited, TweetOutbox
+
+# Default wait for a rate-limit window when posting synchronously
+POST_MAX_WAIT = 60.0
+# Length of a rate-limit window, assumed when a 429 carries no reset header
+RATE_LIMIT_WINDOW = 15 * 60
+
+def _header_float(headers, name: str) -> Optional[float]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+class TwitterAPI:
     """
-    Post a list of tweets as a thread to X/Twitter.
-    
-    Args:
-        tweets: List of tweet strings to post
-        reply_to_status_id: Optional ID of a tweet to reply to
-        
-    Returns:
-        True if successful, False otherwise
+    Thin adapter over a reused tweepy.Client that reports the rate-limit
+    headers of every post and maps errors onto the outbox's exceptions.
     """
+
+    def __init__(self, client: tweepy.Client):
+        self.client = client
+
+    def create_tweet(self, text: str, in_reply_to_tweet_id: Optional[str] = None) -> PostResult:
+        try:
+            response = self.client.create_tweet(text=text, in_reply_to_tweet_id=in_reply_to_tweet_id)
+        except tweepy.errors.TooManyRequests as e:
+            reset_at = _header_float(e.response.headers, "x-rate-limit-reset")
+            raise RateLimited(reset_at or time.time() + RATE_LIMIT_WINDOW) from e
+        except tweepy.errors.Forbidden as e:
+            raise PermanentPostError(
+                f"Twitter API Forbidden (403): {e}. Check your permissions (Read and Write) and subscription tier."
+            ) from e
+        except tweepy.errors.Unauthorized as e:
+            raise PermanentPostError(f"Twitter API Unauthorized (401): {e}. Check your API keys and tokens.") from e
+        remaining = _header_float(response.headers, "x-rate-limit-remaining")
+        return PostResult(
+            tweet_id=response.json()["data"]["id"],
+            remaining=int(remaining) if remaining is not None else None,
+            reset_at=_header_float(response.headers, "x-rate-limit-reset")
+        )
+
+_api: Optional[TwitterAPI] = None
+
+def get_twitter_api() -> Optional[TwitterAPI]:
+    """Return the shared API adapter, or None when credentials are missing."""
+    global _api
+    if _api is not None:
+        return _api
+    
     # 1. Get Credentials
     api_key = os.getenv("TWITTER_API_KEY")
     api_secret = os.getenv("TWITTER_API_SECRET")
@@ -26,54 +69,67 @@ def post_tweets(tweets: List[str], reply_to_status_id: str = None) -> bool:
     if not all([api_key, api_secret, access_token, access_token_secret]):
         print("[ERROR] Missing Twitter API credentials in .env")
         print("   Required: TWITTER_API_KEY, TWITTER_API_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET")
-        return False
+        return None
+    
+    # 2. Authenticate (API v2); raw responses carry the rate-limit headers
+    _api = TwitterAPI(tweepy.Client(
+        consumer_key=api_key,
+        consumer_secret=api_secret,
+        access_token=access_token,
+        access_token_secret=access_token_secret,
+        return_type=requests.Response
+    ))
+    print("[INFO] Authenticated with X/Twitter API")
+    return _api
+
+def post_tweets(tweets: List[str], reply_to_status_id: str = None, outbox: Optional[TweetOutbox] = None,
+                max_wait: float = POST_MAX_WAIT) -> bool:
+    """
+    Post a list of tweets as a thread to X/Twitter.
+    
+    The thread goes through the durable outbox, so if posting stops part way
+    (error, rate limit further away than max_wait) it stays queued and is
+    resumed from the last posted tweet by the next run or by
+    'python src/tweet_outbox.py'.
+    
+    This is a blocking helper for synchronous callers: it runs its own event
+    loop and raises RuntimeError if called while one is running. Async code
+    should enqueue the thread and await OutboxWorker(outbox, api).drain().
+    
+    Args:
+        tweets: List of tweet strings to post
+        reply_to_status_id: Optional ID of a tweet to reply to
+        outbox: Outbox to queue the thread in (the default one, opened and
+            closed by this call, if None)
+        max_wait: Longest time to wait for a rate-limit window
         
+    Returns:
+        True if the whole thread was posted, False otherwise
+    """
     try:
-        # 2. Authenticate (API v2)
-        client = tweepy.Client(
-            consumer_key=api_key,
-            consumer_secret=api_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret
-        )
-        
-        print("[INFO] Authenticated with X/Twitter API")
-        
-        # 3. Post Tweets
-        previous_tweet_id = reply_to_status_id
-        
-        for i, tweet_text in enumerate(tweets):
-            print(f"   Posting tweet {i+1}/{len(tweets)}...")
-            
-            # Check length (basic check, Tweepy handles some, but good to be safe)
-            if len(tweet_text) > 280:
-                print(f"[WARN] Tweet {i+1} is too long ({len(tweet_text)} chars). Truncating...")
-                tweet_text = tweet_text[:277] + "..."
-            
-            response = client.create_tweet(
-                text=tweet_text,
-                in_reply_to_tweet_id=previous_tweet_id
-            )
-            
-            previous_tweet_id = response.data['id']
-            print(f"   [SUCCESS] Posted! ID: {previous_tweet_id}")
-            
-            # Small delay between tweets in a thread
-            time.sleep(1)
-            
-        return True
-        
-    except tweepy.errors.Forbidden as e:
-        print(f"[ERROR] Twitter API Forbidden (403): {e}")
-        print("   Check your permissions (Read and Write) and subscription tier.")
-        return False
-    except tweepy.errors.Unauthorized as e:
-        print(f"[ERROR] Twitter API Unauthorized (401): {e}")
-        print("   Check your API keys and tokens.")
-        return False
-    except Exception as e:
-        print(f"[ERROR] Error posting to Twitter: {e}")
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError("post_tweets() cannot be called from a running event loop; "
+                           "await OutboxWorker(outbox, api).drain() instead")
+    
+    api = get_twitter_api()
+    if api is None:
         return False
+    
+    owned = outbox is None
+    outbox = outbox or TweetOutbox()
+    try:
+        thread_id = outbox.enqueue(tweets, reply_to=reply_to_status_id)
+        try:
+            asyncio.run(OutboxWorker(outbox, api).drain(max_wait=max_wait))
+        except Exception as e:
+            print(f"[ERROR] Error posting to Twitter: {e}")
+        return outbox.thread(thread_id)["status"] == "done"
+    finally:
+        if owned:
+            outbox.close()
 
 if __name__ == "__main__":
     # Test stub
@@ -0,0 +1,75 @@
+"""
+Benchmark per-line TTS overhead with a new client per line vs. the shared pool.
+
+Synthesizes the same short lines both ways and prints the average and p95
+time per line. Needs Google Cloud credentials (see docs/google_cloud_tts_setup.md);
+each run synthesizes 2 x --lines requests.
+
+    python src/utility/benchmark_tts_pool.py --lines 20 --pool-size 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from dotenv import load_dotenv
+from google.cloud import texttospeech
+from tts_client import TTSClientPool
+
+LINE = "Welcome back to Meet the Clankers."
+
+def synthesize(client):
+    client.synthesize_speech(
+        input=texttospeech.SynthesisInput(text=LINE),
+        voice=texttospeech.VoiceSelectionParams(language_code="en-US", name="en-US-Wavenet-F"),
+        audio_config=texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
+    )
+
+def fresh_client_line():
+    start = time.perf_counter()
+    client = texttospeech.TextToSpeechClient()
+    synthesize(client)
+    client.transport.close()
+    return time.perf_counter() - start
+
+def pooled_line(pool):
+    start = time.perf_counter()
+    synthesize(pool.client())
+    return time.perf_counter() - start
+
+def summarize(label, timings, wall):
+    timings = sorted(timings)
+    avg = sum(timings) / len(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<14} avg {avg * 1000:7.1f} ms/line   p95 {p95 * 1000:7.1f} ms   wall {wall:6.2f}s")
+    return avg
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TTS client reuse")
+    parser.add_argument("--lines", type=int, default=20, help="Lines to synthesize per variant")
+    parser.add_argument("--pool-size", type=int, default=4, help="Clients in the pool (also the number of worker threads)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    print(f"Synthesizing {args.lines} lines per variant with {args.pool_size} workers...")
+    with ThreadPoolExecutor(max_workers=args.pool_size) as executor:
+        start = time.perf_counter()
+        fresh = list(executor.map(lambda _: fresh_client_line(), range(args.lines)))
+        fresh_avg = summarize("client per line", fresh, time.perf_counter() - start)
+
+        pool = TTSClientPool(args.pool_size)
+        start = time.perf_counter()
+        pooled = list(executor.map(lambda _: pooled_line(pool), range(args.lines)))
+        pooled_avg = summarize("shared pool", pooled, time.perf_counter() - start)
+        created = pool.created
+        pool.close()
+
+    print(f"Per-line overhead saved: {(fresh_avg - pooled_avg) * 1000:.1f} ms "
+          f"({created} clients created instead of {args.lines})")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,18 @@
-import google.generativeai as genai
+import sys
 import os
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from llm_client import get_client
 from dotenv import load_dotenv
 
 load_dotenv()
 
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
+client = get_client()
+if client is None:
     print("No API key found")
 else:
-    genai.configure(api_key=api_key)
     print("Listing available models:")
-    for m in genai.list_models():
+    for m in client.list_models():
         if 'generateContent' in m.supported_generation_methods:
             print(m.name)
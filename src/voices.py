@@ -0,0 +1,25 @@
+"""
+Module for the Google Cloud TTS voice of each host.
+
+Kept free of any TTS imports so code that only needs the voice settings
+(such as the duration estimator's speaking rates) does not load the Google
+Cloud client.
+"""
+
+# Voice Configuration - Using Google Cloud WaveNet voices (most natural)
+VOICES = {
+    "Zeta": {
+        "language_code": "en-US",
+        "name": "en-US-Wavenet-F",  # WaveNet female voice (most natural)
+        "pitch": 2.5,  # Moderate-high pitch for energetic feel
+        "speaking_rate": 1.08,  # Slightly faster for enthusiasm
+        "effects_profile": ["headphone-class-device"]  # Optimize for headphones
+    },
+    "Quill": {
+        "language_code": "en-US",
+        "name": "en-US-Wavenet-D",  # WaveNet male voice (most natural)
+        "pitch": -2.0,  # Moderate lower pitch for distinction
+        "speaking_rate": 0.95,  # Slightly slower for measured delivery
+        "effects_profile": ["headphone-class-device"]  # Optimize for headphones
+    }
+}
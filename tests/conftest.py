@@ -0,0 +1,56 @@
+"""
+Fakes shared by several test modules.
+
+pytest puts this directory on sys.path, so test modules import them with
+`from conftest import ...`.
+"""
+from urllib.parse import quote
+
+def rss(title, items):
+    """
+    Build a minimal RSS 2.0 document from (title, pubDate) or
+    (title, pubDate, description) items; every item gets a unique link.
+    """
+    body = ""
+    for i, (item_title, published, *description) in enumerate(items):
+        summary = description[0] if description else f"{item_title} summary"
+        body += (
+            f"<item><title>{item_title}</title><link>https://example.com/{i}?t={quote(item_title, safe='')}</link>"
+            f"<description>{summary}</description><pubDate>{published}</pubDate></item>"
+        )
+    return f"<rss version='2.0'><channel><title>{title}</title>{body}</channel></rss>".encode()
+
+class FakeClock:
+    """Manual clock: calling it returns now, and sleeping advances now instead of waiting."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds):
+        self.sleep(seconds)
+
+class _FakeTransport:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class FakeTTSClient:
+    """Stands in for a TextToSpeechClient: the audio is the input text, and calls are counted."""
+
+    def __init__(self):
+        self.transport = _FakeTransport()
+        self.calls = 0
+
+    def synthesize_speech(self, input, voice, audio_config):
+        self.calls += 1
+        return type("Response", (), {"audio_content": f"audio:{input.text}".encode()})()
@@ -0,0 +1,78 @@
+import asyncio
+import os
+from conftest import FakeTTSClient
+from src import audio_generator
+from src.clip_cache import ClipCache, clip_key
+from src.tts_client import TTSClientPool
+
+VOICE = {"language_code": "en-US", "name": "en-US-Wavenet-F", "pitch": 2.5, "speaking_rate": 1.08}
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def test_key_covers_text_voice_and_encoding():
+    """Test that any change to the text, a voice setting or the encoding changes the key."""
+    base = clip_key("Hello", VOICE)
+    assert base == clip_key("Hello", dict(VOICE))
+    assert base != clip_key("Hello!", VOICE)
+    assert base != clip_key("Hello", {**VOICE, "pitch": 2.0})
+    assert base != clip_key("Hello", {**VOICE, "effects_profile": ["headphone-class-device"]})
+    assert base != clip_key("Hello", VOICE, encoding="LINEAR16")
+
+def test_get_places_cached_clip_and_counts_hits(tmp_path):
+    """Test that a stored clip is linked or copied to the destination and counted as a hit."""
+    cache = ClipCache(cache_dir=str(tmp_path / "cache"))
+    src = tmp_path / "line.mp3"
+    _write(src, b"mp3 bytes")
+    key = clip_key("Hello", VOICE)
+
+    assert not cache.get(key, str(tmp_path / "out.mp3"))
+    cache.put(key, str(src))
+    assert cache.get(key, str(tmp_path / "out.mp3"))
+    assert _read(tmp_path / "out.mp3") == b"mp3 bytes"
+    assert (cache.hits, cache.misses, cache.stored) == (1, 1, 1)
+
+def test_eviction_removes_least_recently_used_first(tmp_path):
+    """Test that the cache stays under max_bytes by dropping the clips used longest ago."""
+    cache = ClipCache(cache_dir=str(tmp_path / "cache"), max_bytes=250)
+    src = tmp_path / "clip.mp3"
+    _write(src, b"x" * 100)
+    for i, key in enumerate(["a", "b"]):
+        cache.put(key, str(src))
+        os.utime(cache._path(key), (1_000 + i, 1_000 + i))
+    # Reading "a" makes it the most recently used, so "b" goes first
+    assert cache.get("a", str(tmp_path / "out.mp3"))
+    cache.put("c", str(src))
+
+    assert os.path.exists(cache._path("a"))
+    assert not os.path.exists(cache._path("b"))
+    assert os.path.exists(cache._path("c"))
+    assert cache.size_bytes() <= 250
+
+def test_rerun_reuses_cached_clips_without_synthesizing(tmp_path, monkeypatch):
+    """Test that a second render of the same script needs no TTS calls and never corrupts the cache."""
+    client = FakeTTSClient()
+    monkeypatch.setattr(audio_generator, "ClipCache", lambda: ClipCache(cache_dir=str(tmp_path / "cache")))
+    monkeypatch.setattr(audio_generator, "get_tts_pool", lambda size=None: TTSClientPool(size=1, factory=lambda: client))
+    monkeypatch.setattr(audio_generator, "close_tts_pool", lambda: None)
+    script = [{"speaker": "Zeta", "text": "Welcome back!"}, {"speaker": "Quill", "text": "Thanks for listening."}]
+    out = str(tmp_path / "audio")
+
+    first = asyncio.run(audio_generator.generate_audio_files(script, output_dir=out))
+    assert client.calls == 2
+    second = asyncio.run(audio_generator.generate_audio_files(script, output_dir=out))
+    assert client.calls == 2 and second == first
+
+    # A different line rendered to the same file must not overwrite the cached clip it was linked to
+    asyncio.run(audio_generator.generate_audio_files(
+        [{"speaker": "Zeta", "text": "Something new."}, script[1]], output_dir=out
+    ))
+    assert _read(first[0]) == b"audio:Something new."
+    asyncio.run(audio_generator.generate_audio_files(script, output_dir=out))
+    assert client.calls == 3
+    assert _read(first[0]) == b"audio:Welcome back!"
@@ -0,0 +1,36 @@
+from src.context_selector import build_episode_context, select_salient_exchanges
+
+def _script():
+    filler = [
+        {"speaker": "Zeta", "text": "Welcome back, folks, great to be here again today!"},
+        {"speaker": "Quill", "text": "Great, sure, whatever you say, as always."},
+    ]
+    stories = [
+        ("Nvidia unveils quantum accelerator chips", "Quantum accelerator chips, again? Nvidia loves a keynote."),
+        ("Startup raises funding for laundry robots", "Laundry robots folding towels badly with venture money."),
+        ("NASA comet flyby captured by telescope", "A comet flyby photo, the telescope did all the work."),
+    ]
+    script = []
+    for title, reply in stories:
+        script += filler * 3
+        script += [{"speaker": "Zeta", "text": title + "!"}, {"speaker": "Quill", "text": reply}]
+    return script + filler
+
+def test_selection_covers_every_story_within_the_budget():
+    """Test that salient exchanges from the whole episode are picked, not just the opening."""
+    script = _script()
+    context = build_episode_context(script, 420)
+
+    assert len(context) <= 420
+    for keyword in ("quantum", "laundry", "comet"):
+        assert keyword in context.lower()
+    # Chatter repeated throughout the episode is not worth the budget
+    assert "Welcome back" not in context
+
+def test_selection_keeps_episode_order_and_short_scripts_whole():
+    """Test that picks come back in episode order and a script under budget is kept entirely."""
+    picks = select_salient_exchanges(_script(), 420)
+    assert [position for position, _ in picks] == sorted(position for position, _ in picks)
+
+    short = _script()[:4]
+    assert build_episode_context(short, 10_000) == "\n".join(f"{l['speaker']}: {l['text']}" for l in short)
@@ -0,0 +1,46 @@
+import pytest
+from src.duration_estimator import PAUSE_SECONDS, DurationEstimator
+
+VOICES = {"Zeta": {"speaking_rate": 1.2}, "Quill": {"speaking_rate": 0.8}}
+
+def _line(speaker, words):
+    return {"speaker": speaker, "text": " ".join(["word"] * words)}
+
+def test_estimate_uses_word_counts_speaking_rates_and_pauses(tmp_path):
+    """Test that faster speakers take less time for the same words, plus one pause per clip."""
+    estimator = DurationEstimator(path=str(tmp_path / "cal.json"), voices=VOICES)
+    zeta, quill = _line("Zeta", 150), _line("Quill", 150)
+    assert estimator.line_seconds(zeta) == pytest.approx(50.0)
+    assert estimator.line_seconds(quill) == pytest.approx(75.0)
+    assert estimator.estimate([zeta, quill, {"speaker": "Zeta", "text": ""}]) == pytest.approx(125.0 + 2 * PAUSE_SECONDS)
+
+def test_check_flags_scripts_outside_the_target_range(tmp_path):
+    """Test the short/on-target/long verdicts for daily and weekly mode."""
+    estimator = DurationEstimator(path=str(tmp_path / "cal.json"), voices=VOICES)
+    twelve_minutes = [_line("Zeta", 180)] * 12
+    assert estimator.check(twelve_minutes, "daily")[1] == 0
+    assert estimator.check(twelve_minutes, "weekly")[1] == -1
+    assert estimator.check(twelve_minutes * 2, "daily")[1] == 1
+
+def test_calibration_from_rendered_clips_persists(tmp_path):
+    """Test that per-speaker factors follow actual clip durations and survive a reload."""
+    path = str(tmp_path / "cal.json")
+    estimator = DurationEstimator(path=path, voices=VOICES)
+    script = [_line("Zeta", 150), _line("Quill", 150)]
+    # Zeta really took 60s instead of 50s; Quill's clip failed to render
+    estimator.calibrate(script, {0: 60.0, 1: None})
+    estimator.record_episode("Test", 126.0, 140.0)
+    estimator.save()
+
+    reloaded = DurationEstimator(path=path, voices=VOICES)
+    assert reloaded.factors == {"Zeta": pytest.approx(1.2)}
+    assert reloaded.line_seconds(script[0]) == pytest.approx(60.0)
+    assert reloaded.history[-1]["actual"] == 140.0
+
+def test_estimator_does_not_load_the_tts_stack():
+    """Test that estimating durations (and so script generation) does not import Google Cloud TTS."""
+    import subprocess
+    import sys
+    code = "import sys, src.duration_estimator; print('google.cloud.texttospeech' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.PIPE, text=True)
+    assert result.stdout.strip() == "False"
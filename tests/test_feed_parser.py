@@ -0,0 +1,67 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from conftest import rss
+from src.feed_parser import parse_feed, parse_feed_streaming
+
+NOW = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+def _feed(hours_ago):
+    return rss("Example RSS", [
+        (f"Story {h}", format_datetime(NOW - timedelta(hours=h)), f"&lt;p&gt;Body {h} &amp;amp; more&lt;/p&gt;")
+        for h in hours_ago
+    ])
+
+def test_rss_fast_path_keeps_window_and_cleans_summary():
+    """Test that RSS entries inside the window are parsed with HTML stripped."""
+    feed = parse_feed(_feed([1, 2, 30]), since_ts=(NOW - timedelta(hours=24)).timestamp())
+    assert feed["title"] == "Example RSS"
+    assert [e["title"] for e in feed["entries"]] == ["Story 1", "Story 2"]
+    assert feed["entries"][0]["summary"] == "Body 1 & more"
+    assert feed["entries"][0]["published_ts"] == (NOW - timedelta(hours=1)).timestamp()
+
+def test_rss_fast_path_stops_early_on_ordered_feed(monkeypatch):
+    """Test that a newest-first feed is not read past a run of old entries."""
+    import src.feed_parser as feed_parser
+    seen = []
+    real_rss_entry = feed_parser._rss_entry
+    monkeypatch.setattr(feed_parser, "_rss_entry", lambda item: seen.append(1) or real_rss_entry(item))
+
+    hours = [1] + list(range(30, 130))
+    feed = parse_feed_streaming(_feed(hours), since_ts=(NOW - timedelta(hours=24)).timestamp())
+    assert len(feed["entries"]) == 1
+    assert len(seen) == 1 + feed_parser.STOP_AFTER_OLD_ENTRIES
+
+def test_unordered_feed_is_read_fully():
+    """Test that out-of-order feeds are not cut short."""
+    hours = [1, 3, 2, 40, 50, 60, 70, 4]
+    feed = parse_feed(_feed(hours), since_ts=(NOW - timedelta(hours=24)).timestamp())
+    assert [e["title"] for e in feed["entries"]] == ["Story 1", "Story 3", "Story 2", "Story 4"]
+
+def test_atom_fast_path():
+    """Test that Atom feeds are handled by the streaming parser."""
+    body = (
+        "<feed xmlns='http://www.w3.org/2005/Atom'><title>Example Atom</title>"
+        "<entry><title>Atom story</title><link rel='alternate' href='https://example.com/a'/>"
+        "<summary>Short &amp; sweet</summary><updated>2025-06-01T11:00:00Z</updated></entry></feed>"
+    ).encode()
+    feed = parse_feed_streaming(body)
+    assert feed["title"] == "Example Atom"
+    assert feed["entries"] == [{
+        "title": "Atom story",
+        "link": "https://example.com/a",
+        "summary": "Short & sweet",
+        "published_ts": (NOW - timedelta(hours=1)).timestamp()
+    }]
+
+def test_rdf_falls_back_to_feedparser():
+    """Test that RSS 1.0 (RDF) documents go through feedparser."""
+    body = (
+        "<rdf:RDF xmlns:rdf='http://www.w3.org/1999/02/22-rdf-syntax-ns#' xmlns='http://purl.org/rss/1.0/' "
+        "xmlns:dc='http://purl.org/dc/elements/1.1/'><channel><title>Example RDF</title></channel>"
+        "<item><title>RDF story</title><link>https://example.com/r</link>"
+        "<dc:date>2025-06-01T10:00:00Z</dc:date></item></rdf:RDF>"
+    ).encode()
+    feed = parse_feed(body)
+    assert feed["title"] == "Example RDF"
+    assert feed["entries"][0]["title"] == "RDF story"
+    assert feed["entries"][0]["published_ts"] == (NOW - timedelta(hours=2)).timestamp()
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from src import audio_generator
+from src.line_chunker import chunk_text
+from src.tts_client import TTSClientPool
+from src.tts_scheduler import TTSScheduler
+
+SENTENCE = "Zeta is explaining yet another chip announcement in far too much detail. "
+
+def _words(text):
+    return text.split()
+
+def test_short_lines_are_not_split():
+    """Test that a line within the limit comes back as a single chunk."""
+    assert chunk_text("Just a normal line.", max_bytes=100) == ["Just a normal line."]
+
+def test_long_lines_split_at_sentences_into_balanced_chunks():
+    """Test that chunks fit the limit, end on sentence boundaries, keep every word and are about equal."""
+    text = SENTENCE * 100
+    chunks = chunk_text(text, max_bytes=5000)
+
+    assert len(chunks) == 2
+    assert all(len(chunk.encode("utf-8")) <= 5000 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert _words(" ".join(chunks)) == _words(text)
+    sizes = [len(chunk) for chunk in chunks]
+    assert max(sizes) - min(sizes) <= len(SENTENCE)
+
+def test_run_on_sentences_fall_back_to_clause_and_word_boundaries():
+    """Test that a sentence longer than the limit is cut at commas, then between words."""
+    run_on = ", ".join(["and then another thing happened"] * 20) + "."
+    chunks = chunk_text(run_on, max_bytes=200)
+    assert all(len(chunk.encode("utf-8")) <= 200 for chunk in chunks)
+    assert all(chunk.endswith((",", ".")) for chunk in chunks)
+    assert _words(" ".join(chunks)) == _words(run_on)
+
+    no_punctuation = " ".join(["word"] * 100)
+    chunks = chunk_text(no_punctuation, max_bytes=60)
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    assert _words(" ".join(chunks)) == _words(no_punctuation)
+
+def test_multibyte_text_is_limited_by_bytes_not_characters():
+    """Test that the limit counts UTF-8 bytes."""
+    text = "Café déjà vu — naïve résumé. " * 30
+    chunks = chunk_text(text, max_bytes=300)
+    assert all(len(chunk.encode("utf-8")) <= 300 for chunk in chunks)
+
+class _RecordingClient:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = []
+
+    def synthesize_speech(self, input, voice, audio_config):
+        assert len(input.text.encode("utf-8")) <= 5000
+        with self.lock:
+            self.requests.append((voice.name, input.text))
+        return type("Response", (), {"audio_content": (input.text + " ").encode("utf-8")})()
+
+def test_over_long_line_is_synthesized_in_parts_with_its_own_voice(tmp_path, monkeypatch):
+    """Test that an over-long line goes to Google in parts, in the speaker's voice, joined into one clip."""
+    client = _RecordingClient()
+    joined = []
+
+    def fake_join(parts, output_file):
+        joined.append(list(parts))
+        with open(output_file, "wb") as out:
+            for part in parts:
+                with open(part, "rb") as f:
+                    out.write(f.read())
+    monkeypatch.setattr(audio_generator, "join_clips", fake_join)
+    text = SENTENCE * 150
+
+    output = asyncio.run(audio_generator.generate_audio_for_line(
+        text, "Quill", 7, str(tmp_path), TTSClientPool(size=2, factory=lambda: client), TTSScheduler(3)
+    ))
+
+    assert output.endswith("007_Quill.mp3")
+    assert len(client.requests) == 3
+    assert {name for name, _ in client.requests} == {audio_generator.VOICES["Quill"]["name"]}
+    assert len(joined) == 1 and len(joined[0]) == 3
+    with open(output, "rb") as f:
+        assert _words(f.read().decode("utf-8")) == _words(text)
+    # Part files are cleaned up, only the clip remains
+    assert [p.name for p in tmp_path.iterdir()] == ["007_Quill.mp3"]
@@ -0,0 +1,75 @@
+import pytest
+from conftest import FakeClock
+from src.llm_client import LLMClient, TokenBucket, is_retryable
+
+class _ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+class _FlakyModel:
+    model_name = "models/fake"
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return f"reply to {prompt}"
+
+def _client(monkeypatch, **kwargs):
+    import src.llm_client as llm_client
+    monkeypatch.setattr(llm_client.genai, "configure", lambda **kw: None)
+    clock = FakeClock()
+    return LLMClient("test-key", sleep=clock.sleep, **kwargs), clock
+
+def test_token_bucket_waits_for_refill():
+    """Test that the bucket allows a burst up to capacity, then paces requests."""
+    clock = FakeClock()
+    bucket = TokenBucket(60, capacity=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(1.0)
+    # Requests larger than the bucket are clamped instead of blocking forever
+    assert bucket.acquire(10) == pytest.approx(2.0)
+
+def test_client_retries_retryable_errors_with_backoff(monkeypatch):
+    """Test that 429/503 are retried with jittered backoff and counted in the metrics."""
+    client, clock = _client(monkeypatch, max_retries=3)
+    model = _FlakyModel([_ApiError(429), _ApiError(503)])
+
+    assert client.generate(model, "hi") == "reply to hi"
+    assert model.calls == 3
+    assert len(clock.sleeps) == 2
+    assert clock.sleeps[0] <= 1.0 and clock.sleeps[1] <= 2.0
+    metrics = client.metrics()
+    assert metrics["calls"] == 1 and metrics["retries"] == 2 and metrics["failures"] == 0
+    assert "p95_latency" in metrics
+
+def test_client_gives_up_on_non_retryable_errors_and_exhausted_budget(monkeypatch):
+    """Test that a 400 fails immediately and retries are bounded."""
+    client, _ = _client(monkeypatch, max_retries=1)
+    with pytest.raises(_ApiError):
+        client.generate(_FlakyModel([_ApiError(400)]), "bad")
+    model = _FlakyModel([_ApiError(500)] * 5)
+    with pytest.raises(_ApiError):
+        client.generate(model, "down")
+    assert model.calls == 2
+    assert client.metrics()["failures"] == 2
+    assert is_retryable(ConnectionError()) and not is_retryable(ValueError())
+
+def test_client_shares_rate_limit_across_models(monkeypatch):
+    """Test that every model from the client draws from the same request bucket."""
+    import src.llm_client as llm_client
+    monkeypatch.setattr(llm_client.genai, "GenerativeModel", lambda name: _FlakyModel([]))
+    client, clock = _client(monkeypatch, requests_per_minute=2)
+    client.request_bucket = TokenBucket(2, clock=clock, sleep=clock.sleep)
+
+    assert client.model("a") is client.model("a")
+    for name in ("a", "b", "a"):
+        client.model(name).generate_content("x")
+    assert clock.sleeps == [pytest.approx(30.0)]
+    assert client.metrics()["throttled_seconds"] == pytest.approx(30.0)
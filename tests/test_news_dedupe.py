@@ -0,0 +1,33 @@
+from src.news_dedupe import NearDuplicateIndex, minhash_signature
+
+def _item(title, summary, source, link):
+    return {"title": title, "summary": summary, "source": source, "link": link}
+
+def test_signature_is_stable_for_identical_text():
+    """Test that identical text always produces the same fingerprint."""
+    assert minhash_signature("OpenAI ships a new model") == minhash_signature("OpenAI ships a new model")
+
+def test_index_collapses_near_duplicates_and_records_sources():
+    """Test that a lightly edited copy of a story is folded into the first one."""
+    summary = ("The company said on Tuesday that its newest language model beats rivals "
+               "on coding benchmarks and will be available to developers next month.")
+    index = NearDuplicateIndex()
+    first = _item("Startup unveils faster AI model", summary, "TechCrunch AI", "https://a.example/1")
+    copy = _item("Startup unveils faster AI model", summary + " Read more.", "TechCrunch", "https://b.example/1")
+
+    assert index.add(first) is None
+    assert index.add(copy) is first
+    assert first["sources"] == ["TechCrunch AI", "TechCrunch"]
+
+def test_index_keeps_unrelated_stories():
+    """Test that different stories are not merged."""
+    index = NearDuplicateIndex()
+    assert index.add(_item("Rocket lands on barge", "A reusable booster landed at sea.", "Space", "https://c.example/1")) is None
+    assert index.add(_item("Chip prices climb", "Memory makers raised contract prices again.", "CNBC", "https://d.example/1")) is None
+    assert index.duplicates == 0
+
+def test_index_matches_on_link():
+    """Test that the same link is always a duplicate, whatever its text."""
+    index = NearDuplicateIndex()
+    index.add(_item("Title A", "Summary A", "Feed A", "https://e.example/1"))
+    assert index.add(_item("Totally different", "Other text", "Feed B", "https://e.example/1")) is not None
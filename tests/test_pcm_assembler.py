@@ -0,0 +1,126 @@
+import asyncio
+import io
+import wave
+from array import array
+from src import audio_generator
+from src.pcm_assembler import PCMAssembler, apply_gain, decode_audio, encode_episode, read_wav
+from src.tts_client import TTSClientPool
+
+RATE = 24000
+
+def _wav(samples, rate=RATE):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(array("h", samples).tobytes())
+    return buffer.getvalue()
+
+def _samples(pcm):
+    return list(array("h", pcm))
+
+def test_linear16_wav_is_unpacked_without_ffmpeg():
+    """Test that a WAV at the target rate is decoded in memory."""
+    data = _wav([1, -2, 3])
+    assert read_wav(data) == (array("h", [1, -2, 3]).tobytes(), RATE)
+    assert _samples(decode_audio(data, RATE)) == [1, -2, 3]
+
+def test_gain_scales_and_clips_samples():
+    """Test that +6 dB roughly doubles samples, clips at full scale and 0 dB is a no-op."""
+    pcm = array("h", [1000, -1000, 20000, -20000]).tobytes()
+    assert apply_gain(pcm, 0.0) is pcm
+    louder = _samples(apply_gain(pcm, 6.0))
+    assert 1990 <= louder[0] <= 2000 and -2000 <= louder[1] <= -1990
+    assert louder[2:] == [32767, -32768]
+    assert _samples(apply_gain(pcm, -6.0))[0] in range(495, 505)
+
+def test_render_lays_out_clips_in_order_with_zero_pauses():
+    """Test that clips appear in script order, each followed by a zero-filled pause, with per-speaker gain."""
+    assembler = PCMAssembler(sample_rate=10, pause_seconds=0.3, gains_db={"Quill": 6.0})
+    assembler.add(2, "Quill", array("h", [100, 100]).tobytes())
+    assembler.add(0, "Zeta", array("h", [5, 6, 7]).tobytes() + b"\x01")
+
+    samples = _samples(assembler.render())
+    assert samples[:6] == [5, 6, 7, 0, 0, 0]
+    assert samples[6] in range(198, 201) and samples[7] == samples[6]
+    assert samples[8:] == [0, 0, 0]
+    assert assembler.durations() == {0: 0.3, 2: 0.2}
+
+    # A gTTS fallback clip is assembled but not used to calibrate the duration estimate
+    assembler.add(4, "Zeta", array("h", [1] * 5).tobytes(), fallback=True)
+    assert assembler.durations() == {0: 0.3, 2: 0.2, 4: 0.5}
+    assert assembler.durations(include_fallbacks=False) == {0: 0.3, 2: 0.2}
+
+def test_wav_episode_is_a_single_write(tmp_path):
+    """Test that a .wav episode is written directly from the buffer."""
+    output = str(tmp_path / "episode.wav")
+    assert encode_episode(array("h", [0, 1, 2]).tobytes(), output, sample_rate=RATE) == output
+    with wave.open(output, "rb") as wav:
+        assert wav.getframerate() == RATE and wav.getnframes() == 3
+    assert [p.name for p in tmp_path.iterdir()] == ["episode.wav"]
+
+class _Linear16Client:
+    def __init__(self):
+        self.encodings = set()
+
+    def synthesize_speech(self, input, voice, audio_config):
+        self.encodings.add((audio_config.audio_encoding.name, audio_config.sample_rate_hertz))
+        return type("Response", (), {"audio_content": _wav([len(input.text)] * 4)})()
+
+def test_episode_pcm_is_generated_without_leaving_clips(tmp_path, monkeypatch):
+    """Test that PCM mode requests LINEAR16 at the episode rate and keeps no per-line clips."""
+    monkeypatch.chdir(tmp_path)
+    client = _Linear16Client()
+    monkeypatch.setattr(audio_generator, "get_tts_pool", lambda size=None: TTSClientPool(size=1, factory=lambda: client))
+    monkeypatch.setattr(audio_generator, "close_tts_pool", lambda: None)
+    script = [{"speaker": "Zeta", "text": "Hi"}, {"speaker": "Quill", "text": "Hello"}, {"speaker": "Zeta", "text": ""}]
+
+    assembler = asyncio.run(audio_generator.generate_episode_pcm(script))
+
+    assert client.encodings == {("LINEAR16", RATE)}
+    assert sorted(assembler.clips) == [0, 1]
+    assert _samples(assembler.clips[1][1]) == [5, 5, 5, 5]
+    assert list(tmp_path.iterdir()) == []
+
+class _DownClient:
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize_speech(self, input, voice, audio_config):
+        self.calls += 1
+        raise ConnectionError("unreachable")
+
+class _WavProvider:
+    """Stands in for gTTS: writes a WAV at the episode rate, so decoding needs no ffmpeg."""
+    name = "gtts"
+
+    async def synthesize(self, text, speaker, output_file, on_start=lambda: None, label="line"):
+        on_start()
+        with open(output_file, "wb") as f:
+            f.write(_wav([7] * 3))
+
+class _MissingProvider:
+    name = "edge-tts"
+
+    async def synthesize(self, text, speaker, output_file, on_start=lambda: None, label="line"):
+        from src.tts_providers import ProviderUnavailable
+        raise ProviderUnavailable("edge-tts is not installed")
+
+def test_episode_pcm_goes_through_the_provider_breakers(monkeypatch):
+    """Test that PCM mode stops calling a failing Google and decodes the fallback audio."""
+    from src.tts_scheduler import TTSScheduler
+    client = _DownClient()
+    monkeypatch.setattr(audio_generator, "get_tts_pool", lambda size=None: TTSClientPool(size=1, factory=lambda: client))
+    monkeypatch.setattr(audio_generator, "close_tts_pool", lambda: None)
+    monkeypatch.setattr(audio_generator, "GTTSProvider", _WavProvider)
+    monkeypatch.setattr(audio_generator, "EdgeTTSProvider", _MissingProvider)
+    script = [{"speaker": "Zeta", "text": f"Line {i}"} for i in range(10)]
+
+    assembler = asyncio.run(audio_generator.generate_episode_pcm(script, scheduler=TTSScheduler(max_concurrency=1)))
+
+    assert sorted(assembler.clips) == list(range(10))
+    assert _samples(assembler.clips[9][1]) == [7, 7, 7]
+    assert assembler.fallbacks == set(range(10))
+    # The breaker trips after three failures; at most one more line already had the slot
+    assert client.calls <= 4
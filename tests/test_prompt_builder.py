@@ -0,0 +1,49 @@
+from src.prompt_builder import clean_summary, compact_news
+
+def _format(item):
+    return f"- {item['title']}: {item['summary']}\n"
+
+def _item(title, summary, published="2024-01-01 00:00", sources=None):
+    item = {"title": title, "summary": summary, "source": "Feed", "published": published}
+    if sources:
+        item["sources"] = sources
+    return item
+
+def test_clean_summary_strips_feed_boilerplate():
+    """Test that 'appeared first on', 'Continue reading' and HN metadata are removed."""
+    assert clean_summary("Chips got faster. The post Chips Are Fast appeared first on TechBlog.") == "Chips got faster."
+    assert clean_summary("Robots  are here.\n Continue reading...") == "Robots are here."
+    assert clean_summary("Article URL: https://x.io Comments URL: https://y.io Points: 12 # Comments: 3") == ""
+
+def test_compact_news_drops_redundant_summaries_without_budget_pressure():
+    """Test that summaries repeating the title or another item are dropped, and input is untouched."""
+    news = {"tech": [
+        _item("Robots fold laundry", "Robots fold laundry."),
+        _item("Chips get faster", "A new chip doubles speed."),
+        _item("Other chip story", "A new chip doubles speed."),
+    ]}
+    compacted, report = compact_news(news, 10_000, _format)
+    assert [item["summary"] for item in compacted["tech"]] == ["", "A new chip doubles speed.", ""]
+    assert news["tech"][0]["summary"] == "Robots fold laundry."
+    assert report["dropped"] == 0 and report["items"] == 3
+
+def test_compact_news_shrinks_least_important_first_and_keeps_top_items():
+    """Test that the budget is met by shortening, then dropping, the least important items."""
+    long_summary = "First sentence about it. " + "More detail words here. " * 40
+    news = {
+        "ai": [_item(f"AI story {i}", long_summary + str(i), published=f"2024-01-0{i + 1} 00:00") for i in range(4)],
+        "science": [_item("Comet seen", long_summary + "comet", sources=["NASA", "ESA"])],
+    }
+    compacted, report = compact_news(news, 25, _format, overhead_tokens=10)
+
+    assert report["tokens"] <= 25
+    assert report["dropped"] > 0
+    # Category top items survive even when everything else is dropped
+    assert compacted["ai"][0]["title"] == "AI story 0"
+    assert compacted["science"][0]["title"] == "Comet seen"
+
+    loose, loose_report = compact_news(news, 600, _format)
+    assert loose_report["dropped"] == 0 and loose_report["shortened"] > 0
+    # The multi-source story is the most important, so it keeps its full summary longest
+    assert loose["science"][0]["summary"].startswith(long_summary.strip()[:100])
+    assert loose["ai"][1]["summary"] == "First sentence about it."
@@ -9,3 +9,243 @@ def test_generate_script_empty_input():
 
 # Note: Testing generate_script with real input requires an API key.
 # We should mock the API call for a proper unit test.
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class _FakeModel:
+    """Stands in for genai.GenerativeModel; records every prompt it is sent."""
+    calls = []
+    replies = []
+
+    def __init__(self, model_name):
+        self.model_name = f"models/{model_name}"
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        _FakeModel.calls.append(prompt)
+        text = _FakeModel.replies.pop(0)
+        if stream:
+            return [_FakeResponse(text[i:i + 7]) for i in range(0, len(text), 7)]
+        return _FakeResponse(text)
+
+def _patch_gemini(monkeypatch, replies):
+    import src.llm_client as llm_client
+    import src.script_generator as script_generator
+    _FakeModel.calls = []
+    _FakeModel.replies = list(replies)
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(llm_client.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(llm_client.genai, "GenerativeModel", _FakeModel)
+    monkeypatch.setattr(llm_client, "_shared_client", None)
+    return script_generator
+
+NEWS = {"tech": [{"title": "Robots learn to fold laundry", "summary": "Finally.", "source": "The Verge"}]}
+SCRIPT_JSON = '[{"speaker": "Zeta", "text": "Laundry robots!"}, {"speaker": "Quill", "text": "Wake me when they iron."}]'
+
+def test_generate_script_reuses_cached_responses(monkeypatch, tmp_path):
+    """Test that a rerun with the same news is served from the response cache."""
+    from src.llm_cache import ResponseCache
+    script_generator = _patch_gemini(monkeypatch, [SCRIPT_JSON, "Folded Under Pressure"])
+    cache = ResponseCache(cache_dir=str(tmp_path))
+
+    first = script_generator.generate_script(NEWS, cache=cache)
+    second = script_generator.generate_script(NEWS, cache=cache)
+
+    assert first == second
+    assert first[1] == "Folded_Under_Pressure"
+    assert len(_FakeModel.calls) == 2
+    assert cache.hits == 2
+
+def test_generate_script_cache_bypass_and_invalid_responses(monkeypatch, tmp_path):
+    """Test that use_cache=False skips the cache and malformed scripts are never cached."""
+    from src.llm_cache import ResponseCache
+    script_generator = _patch_gemini(monkeypatch, ["not json", SCRIPT_JSON, "Title", SCRIPT_JSON, "Title"])
+    cache = ResponseCache(cache_dir=str(tmp_path))
+
+    assert script_generator.generate_script(NEWS, cache=cache) == ([], "Error_Episode")
+    assert script_generator.generate_script(NEWS, cache=cache)[0]
+    script_generator.generate_script(NEWS, use_cache=False)
+    assert len(_FakeModel.calls) == 5
+
+def test_generate_script_drops_lines_with_unexpected_speakers(monkeypatch, tmp_path):
+    """Test that one odd line no longer fails a non-structured episode."""
+    from src.llm_cache import ResponseCache
+    reply = SCRIPT_JSON[:-1] + ', {"speaker": "Narrator", "text": "Meanwhile..."}]'
+    script_generator = _patch_gemini(monkeypatch, [reply, "Title"])
+
+    script, _ = script_generator.generate_script(NEWS, cache=ResponseCache(cache_dir=str(tmp_path)))
+    assert [line["speaker"] for line in script] == ["Zeta", "Quill"]
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    """Test that the response cache keeps at most max_entries responses."""
+    import os
+    from src.llm_cache import ResponseCache, cache_key
+
+    cache = ResponseCache(cache_dir=str(tmp_path), max_entries=2)
+    keys = [cache_key("model", f"prompt {i}") for i in range(3)]
+    cache.put(keys[0], "a")
+    cache.put(keys[1], "b")
+    os.utime(cache._path(keys[0]), (1, 1))
+    os.utime(cache._path(keys[1]), (2, 2))
+    cache.get(keys[0])
+    cache.put(keys[2], "c")
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "a"
+    assert cache_key("model", "p", {"temperature": 0}) != cache_key("model", "p")
+
+def test_incremental_parser_emits_objects_across_chunk_boundaries():
+    """Test that dialogue objects are emitted as soon as they close, whatever the chunking."""
+    from src.script_generator import IncrementalScriptParser
+
+    text = '```json\n[{"speaker": "Zeta", "text": "Braces {like} these and \\"quotes\\"!"},\n {"speaker": "Quill", "text": "Sure."}]\n```'
+    parser = IncrementalScriptParser()
+    emitted = []
+    for i in range(0, len(text), 3):
+        emitted.append(parser.feed(text[i:i + 3]))
+
+    lines = [line for chunk in emitted for line in chunk]
+    assert lines == [
+        {"speaker": "Zeta", "text": 'Braces {like} these and "quotes"!'},
+        {"speaker": "Quill", "text": "Sure."}
+    ]
+    # The first line is available before the stream has finished
+    assert emitted.index([lines[0]]) < len(emitted) - 1
+
+def test_incremental_parser_validates_lines_and_stops_at_the_closing_bracket():
+    """Test that streamed lines are checked like batch lines and nothing after the array is emitted."""
+    from src.script_generator import IncrementalScriptParser
+
+    text = ('[{"speaker": "quill", "text": " Fine. "}, {"speaker": "Narrator", "text": "Meanwhile"},'
+            ' {"speaker": "Zeta", "text": ""}]\n{"speaker": "Zeta", "text": "Bonus line"}')
+    parser = IncrementalScriptParser()
+
+    assert parser.feed(text) == [{"speaker": "Quill", "text": "Fine."}]
+    assert parser.feed('{"speaker": "Zeta", "text": "Later"}') == []
+    assert parser.lines == [{"speaker": "Quill", "text": "Fine."}]
+
+def test_generate_script_streaming_calls_back_per_line(monkeypatch, tmp_path):
+    """Test that streaming emits indexed lines and returns the same script as the batch call."""
+    from src.llm_cache import ResponseCache
+    script_generator = _patch_gemini(monkeypatch, [SCRIPT_JSON, "Folded Under Pressure"])
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    received = []
+
+    script, title = script_generator.generate_script_streaming(
+        NEWS, on_line=lambda index, line: received.append((index, line)), cache=cache
+    )
+
+    assert [index for index, _ in received] == [0, 1]
+    assert [line for _, line in received] == script
+    assert title == "Folded_Under_Pressure"
+    # The streamed response was cached for the non-streaming path too
+    assert script_generator.generate_script(NEWS, cache=cache) == (script, title)
+
+def test_generate_script_segmented_retries_only_the_bad_segment(monkeypatch, tmp_path):
+    """Test that segments are generated separately, retried alone and stitched in order."""
+    import threading
+    from src.llm_cache import ResponseCache
+    script_generator = _patch_gemini(monkeypatch, [])
+    attempts = {}
+    lock = threading.Lock()
+
+    def reply(prompt, **kwargs):
+        with lock:
+            _FakeModel.calls.append(prompt)
+        if "stitching together" in prompt:
+            return _FakeResponse('[{"speaker": "Quill", "text": "Speaking of disappointments..."}]')
+        if "Episode title" in prompt or "episode title" in prompt:
+            return _FakeResponse("Segmented Sarcasm")
+        for name in ("opening", "sign-off", "TECH", "SCIENCE"):
+            if f"Write ONLY the {name}" in prompt or f"ONLY the {name} segment" in prompt:
+                with lock:
+                    attempts[name] = attempts.get(name, 0) + 1
+                if name == "SCIENCE" and attempts[name] == 1:
+                    return _FakeResponse('[{"speaker": "Zeta", "text": "truncated')
+                return _FakeResponse(f'[{{"speaker": "Zeta", "text": "{name} line"}}]')
+        raise AssertionError(prompt[:200])
+
+    monkeypatch.setattr(_FakeModel, "generate_content", lambda self, prompt, **kwargs: reply(prompt, **kwargs))
+    news = {"tech": NEWS["tech"], "science": [{"title": "Comet spotted", "summary": "Shiny.", "source": "NASA"}]}
+    script, title = script_generator.generate_script_segmented(news, cache=ResponseCache(cache_dir=str(tmp_path)))
+
+    assert [line["text"] for line in script] == [
+        "opening line", "TECH line", "Speaking of disappointments...", "SCIENCE line", "sign-off line"
+    ]
+    assert attempts == {"opening": 1, "TECH": 1, "SCIENCE": 2, "sign-off": 1}
+    assert title == "Segmented_Sarcasm"
+
+def test_generate_script_structured_single_call_with_bounded_retry(monkeypatch, tmp_path):
+    """Test that structured mode returns script and title from one call and retries only bad responses."""
+    from src.llm_cache import ResponseCache
+    episode = '{"title": "Folded: Under Pressure", "lines": ' + SCRIPT_JSON[:-1] + ',]'
+    script_generator = _patch_gemini(monkeypatch, ["I cannot comply", episode])
+
+    script, title = script_generator.generate_script_structured(NEWS, cache=ResponseCache(cache_dir=str(tmp_path)))
+
+    assert [line["speaker"] for line in script] == ["Zeta", "Quill"]
+    assert title == "Folded_Under_Pressure"
+    assert len(_FakeModel.calls) == 2
+    assert '"title"' in _FakeModel.calls[0]
+
+def test_generate_script_structured_regenerates_only_missing_title(monkeypatch):
+    """Test that a valid script without a title costs one extra title call, and the retry budget is bounded."""
+    script_generator = _patch_gemini(monkeypatch, [SCRIPT_JSON, "Laundry Day Lies"])
+    assert script_generator.generate_script_structured(NEWS, use_cache=False) == (
+        [{"speaker": "Zeta", "text": "Laundry robots!"}, {"speaker": "Quill", "text": "Wake me when they iron."}],
+        "Laundry_Day_Lies"
+    )
+
+    _patch_gemini(monkeypatch, ["nope", "still nope"])
+    assert script_generator.generate_script_structured(NEWS, use_cache=False, retries=1) == ([], "Error_Episode")
+    assert len(_FakeModel.calls) == 2
+
+def test_generate_script_structured_rewrites_only_invalid_lines(monkeypatch):
+    """Test that a bad line is rewritten on its own while the valid lines are kept."""
+    episode = ('{"title": "Iron Clad", "lines": [{"speaker": "Zeta", "text": "Laundry robots!"}, '
+               '{"speaker": "Narrator", "text": "Meanwhile..."}, {"speaker": "Quill", "text": "Wake me when they iron."}]}')
+    script_generator = _patch_gemini(monkeypatch, [episode, '[{"speaker": "Quill", "text": "Meanwhile, nothing irons."}]'])
+
+    script, title = script_generator.generate_script_structured(NEWS, use_cache=False)
+
+    assert [line["text"] for line in script] == ["Laundry robots!", "Meanwhile, nothing irons.", "Wake me when they iron."]
+    assert title == "Iron_Clad"
+    assert len(_FakeModel.calls) == 2
+    assert "Narrator" in _FakeModel.calls[1] and "Laundry robots!" in _FakeModel.calls[1]
+
+    _patch_gemini(monkeypatch, [episode, "not json"])
+    script, _ = script_generator.generate_script_structured(NEWS, use_cache=False)
+    assert [line["text"] for line in script] == ["Laundry robots!", "Wake me when they iron."]
+
+def test_script_prompts_start_with_the_static_prefix():
+    """Test that everything that changes per run follows the static prefix, so prompt caching can apply."""
+    from src.script_generator import build_script_prefix, build_script_prompt
+
+    prefix = build_script_prefix("daily")
+    prompt = build_script_prompt(NEWS, holiday_theme="Halloween")
+    retry = build_script_prompt(NEWS, holiday_theme="Halloween", length_note="Write about 1500 words.")
+
+    assert prompt.startswith(prefix) and retry.startswith(prompt)
+    assert "Halloween" not in prefix and "Robots learn to fold laundry" not in prefix
+
+def test_fit_script_length_extends_short_scripts_before_the_sign_off(monkeypatch, tmp_path):
+    """Test that a too-short script gets extra lines inserted before its closing lines."""
+    from src.duration_estimator import DurationEstimator
+    body = " ".join(["chat"] * 150)
+    extension = "[" + ",".join(['{"speaker": "Quill", "text": "%s"}' % body] * 10) + "]"
+    script_generator = _patch_gemini(monkeypatch, [extension])
+    estimator = DurationEstimator(path=str(tmp_path / "cal.json"))
+    script = [{"speaker": "Zeta", "text": body}] * 3 + [{"speaker": "Zeta", "text": "Bye!"}, {"speaker": "Quill", "text": "Finally."}]
+
+    fitted = script_generator.fit_script_length(script, NEWS, estimator=estimator, use_cache=False)
+
+    assert len(fitted) == 15
+    assert fitted[-2:] == script[-2:]
+    assert estimator.check(fitted, "daily")[1] == 0
+    assert "Robots learn to fold laundry" in _FakeModel.calls[0]
+
+    # A script already on target costs no Gemini calls
+    _patch_gemini(monkeypatch, [])
+    assert script_generator.fit_script_length(fitted, NEWS, estimator=estimator, use_cache=False) == fitted
+    assert _FakeModel.calls == []
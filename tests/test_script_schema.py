@@ -0,0 +1,39 @@
+import pytest
+from src.script_schema import ScriptValidationError, parse_episode, repair_json, validate_lines
+
+def test_repair_json_handles_fences_chatter_and_trailing_commas():
+    """Test that near-valid JSON with fences, surrounding text and trailing commas parses."""
+    text = 'Sure! Here you go:\n```json\n{"title": "Hype, Again", "lines": [{"speaker": "Zeta", "text": "Hi, folks",},],}\n```'
+    assert repair_json(text) == {"title": "Hype, Again", "lines": [{"speaker": "Zeta", "text": "Hi, folks"}]}
+
+def test_repair_json_closes_truncated_array_after_last_complete_line():
+    """Test that a response cut off mid-object keeps every complete line."""
+    text = '{"title": "T", "lines": [{"speaker": "Zeta", "text": "one \\"quoted\\" }"}, {"speaker": "Quill", "text": "tw'
+    assert repair_json(text)["lines"] == [{"speaker": "Zeta", "text": 'one "quoted" }'}]
+
+    with pytest.raises(ScriptValidationError):
+        repair_json('{"title": "never finis')
+
+def test_parse_episode_validates_lines_and_title():
+    """Test speaker normalization, blank-line dropping and the missing-title signal."""
+    lines, title = parse_episode('{"title": " ", "lines": [{"speaker": "quill", "text": "Meh."}, {"speaker": "Zeta", "text": ""}]}')
+    assert lines == [{"speaker": "Quill", "text": "Meh."}]
+    assert title is None
+
+    with pytest.raises(ScriptValidationError):
+        validate_lines([{"speaker": "Narrator", "text": "Once upon a time"}])
+    with pytest.raises(ScriptValidationError):
+        parse_episode('{"title": "Empty", "lines": []}')
+
+def test_validate_lines_drops_bad_lines_when_not_strict():
+    """Test that the legacy path keeps the episode when a single line is malformed."""
+    lines = validate_lines([
+        {"speaker": "Narrator", "text": "Once upon a time"},
+        {"speaker": "zeta", "text": " Hi! "},
+        "stray text",
+        {"speaker": "Quill"}
+    ], strict=False)
+    assert lines == [{"speaker": "Zeta", "text": "Hi!"}]
+
+    with pytest.raises(ScriptValidationError):
+        validate_lines([{"speaker": "Narrator", "text": "Only me"}], strict=False)
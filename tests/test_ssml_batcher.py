@@ -0,0 +1,109 @@
+import asyncio
+import os
+import re
+import pytest
+from src import audio_generator
+from src.ssml_batcher import LINE_BREAK_MS, build_batches, build_ssml, clip_spans, mark_name, ssml_bytes
+from src.tts_client import TTSClientPool
+
+def _script(n, text="Line number {i} of the episode, with a few extra words."):
+    return [(i, {"speaker": "Zeta" if i % 2 == 0 else "Quill", "text": text.format(i=i)}) for i in range(n)]
+
+class _FakeBetaClient:
+    """Answers an SSML request with one timepoint per mark, one second apart."""
+
+    def __init__(self, drop_marks=False):
+        self.requests = 0
+        self.drop_marks = drop_marks
+
+    def synthesize_speech(self, request):
+        self.requests += 1
+        marks = re.findall(r'<mark name="([^"]+)"/>', request.input.ssml)
+        timepoints = [] if self.drop_marks else [
+            type("Timepoint", (), {"mark_name": name, "time_seconds": float(i)})() for i, name in enumerate(marks)
+        ]
+        return type("Response", (), {"audio_content": b"batch", "timepoints": timepoints})()
+
+class _FakeLineClient:
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize_speech(self, input, voice, audio_config):
+        self.calls += 1
+        return type("Response", (), {"audio_content": b"line"})()
+
+def test_batches_group_lines_per_speaker_within_the_byte_limit():
+    """Test that each batch holds one speaker's lines in script order and fits the SSML limit."""
+    entries = _script(120)
+    batches = build_batches(entries, max_bytes=5000)
+
+    assert len(batches) <= 12
+    assert sorted(index for batch in batches for index, _ in batch) == list(range(120))
+    for batch in batches:
+        assert len({line["speaker"] for _, line in batch}) == 1
+        assert [index for index, _ in batch] == sorted(index for index, _ in batch)
+        assert ssml_bytes(batch) <= 5000
+
+def test_oversized_line_gets_its_own_batch():
+    """Test that a line longer than the limit is not merged with others."""
+    entries = [(0, {"speaker": "Zeta", "text": "short"}), (2, {"speaker": "Zeta", "text": "x" * 300}),
+               (4, {"speaker": "Zeta", "text": "short too"})]
+    batches = build_batches(entries, max_bytes=200)
+    assert [[index for index, _ in batch] for batch in batches] == [[0], [2], [4]]
+
+def test_ssml_escapes_text_and_marks_every_line():
+    """Test that special characters are escaped and every line is preceded by its mark."""
+    ssml = build_ssml([(3, {"speaker": "Zeta", "text": "AT&T <3 \"quotes\""})])
+    assert ssml.startswith("<speak>") and ssml.endswith("</speak>")
+    assert f'<mark name="{mark_name(3)}"/>AT&amp;T &lt;3' in ssml
+
+def test_spans_split_the_pause_between_neighbouring_lines():
+    """Test that clips cover the batch back to back, cutting in the middle of each pause."""
+    entries = _script(3)
+    half = LINE_BREAK_MS / 2000.0
+    spans = clip_spans(entries, {mark_name(0): 0.0, mark_name(1): 2.0, mark_name(2): 5.0})
+    assert spans == [(0.0, 2.0 - half), (2.0 - half, 5.0 - half), (5.0 - half, None)]
+
+    with pytest.raises(ValueError):
+        clip_spans(entries, {mark_name(0): 0.0, mark_name(2): 5.0})
+
+def _patch_clients(monkeypatch, beta_client, line_client, cut):
+    monkeypatch.setattr(audio_generator, "beta_client_factory", lambda: beta_client)
+    monkeypatch.setattr(audio_generator, "get_tts_pool", lambda size=None: TTSClientPool(size=1, factory=lambda: line_client))
+    monkeypatch.setattr(audio_generator, "close_tts_pool", lambda: None)
+
+    def fake_split(source, start, end, output_file):
+        cut.append((start, end))
+        with open(output_file, "wb") as f:
+            f.write(f"{start}-{end}".encode())
+    monkeypatch.setattr(audio_generator, "split_clip", fake_split)
+
+def test_batch_mode_cuts_one_clip_per_line_with_far_fewer_requests(tmp_path, monkeypatch):
+    """Test that batching produces every clip in order with an order of magnitude fewer requests."""
+    beta, line_client, cut = _FakeBetaClient(), _FakeLineClient(), []
+    _patch_clients(monkeypatch, beta, line_client, cut)
+    script = [line for _, line in _script(100)]
+
+    files = asyncio.run(audio_generator.generate_audio_files(
+        script, output_dir=str(tmp_path), use_cache=False, batch=True
+    ))
+
+    assert len(files) == 100 and files == sorted(files)
+    assert [os.path.basename(f)[:3] for f in files] == [f"{i:03d}" for i in range(100)]
+    assert beta.requests <= 10 and line_client.calls == 0
+    assert len(cut) == 100
+    assert not list(tmp_path.glob("batch_*"))
+
+def test_batch_without_timepoints_falls_back_to_single_lines(tmp_path, monkeypatch):
+    """Test that a batch that cannot be split is synthesized line by line instead."""
+    beta, line_client, cut = _FakeBetaClient(drop_marks=True), _FakeLineClient(), []
+    _patch_clients(monkeypatch, beta, line_client, cut)
+    script = [line for _, line in _script(4)]
+
+    files = asyncio.run(audio_generator.generate_audio_files(
+        script, output_dir=str(tmp_path), use_cache=False, batch=True
+    ))
+
+    assert len(files) == 4 and all(files)
+    assert beta.requests == 2 and line_client.calls == 4
+    assert not list(tmp_path.glob("batch_*"))
@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from conftest import FakeTTSClient
+from src import audio_generator
+from src.tts_client import TTSClientPool
+
+def test_pool_creates_at_most_size_clients_and_round_robins():
+    """Test that the pool never creates more clients than its size and spreads requests over them."""
+    created = []
+    pool = TTSClientPool(size=2, factory=lambda: created.append(FakeTTSClient()) or created[-1])
+
+    handed_out = [pool.client() for _ in range(6)]
+    assert len(created) == 2
+    assert handed_out.count(created[0]) == 3 and handed_out.count(created[1]) == 3
+    assert pool.requests == 6
+
+def test_close_shuts_every_channel_and_rejects_new_requests():
+    """Test that close() closes each client's transport once and the pool cannot be used afterwards."""
+    pool = TTSClientPool(size=3, factory=FakeTTSClient)
+    clients = [pool.client() for _ in range(3)]
+    pool.close()
+    pool.close()
+
+    assert all(client.transport.closed for client in clients)
+    with pytest.raises(RuntimeError):
+        pool.client()
+
+def test_generate_audio_files_reuses_pooled_clients(tmp_path, monkeypatch):
+    """Test that an episode's lines share the pooled clients and the pool is closed afterwards."""
+    created = []
+    pool = TTSClientPool(size=2, factory=lambda: created.append(FakeTTSClient()) or created[-1])
+    monkeypatch.setattr(audio_generator, "get_tts_pool", lambda size=None: pool)
+    monkeypatch.setattr(audio_generator, "close_tts_pool", pool.close)
+    script = [{"speaker": "Zeta" if i % 2 else "Quill", "text": f"Line {i}"} for i in range(10)]
+
+    files = asyncio.run(audio_generator.generate_audio_files(script, output_dir=str(tmp_path), use_cache=False))
+
+    assert len(files) == 10 and all(f for f in files)
+    assert len(created) == 2
+    assert sum(client.calls for client in created) == 10
+    assert pool.closed
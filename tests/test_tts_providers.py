@@ -0,0 +1,152 @@
+import asyncio
+import os
+from src.audio_generator import generate_audio_for_line
+from src.tts_providers import CircuitBreaker, ProviderChain, ProviderUnavailable
+
+class _AuthError(Exception):
+    code = 401
+
+class _FakeProvider:
+    """Local provider that writes its name as the audio, after optional delays, or fails."""
+
+    def __init__(self, name, error=None, delays=None, queue_delay=0.0, slots=None):
+        self.name = name
+        self.error = error
+        self.delays = list(delays or [])
+        self.queue_delay = queue_delay
+        self.slots = slots
+        self.calls = 0
+        self.started = 0
+
+    async def synthesize(self, text, speaker, output_file, on_start=lambda: None, label="line"):
+        self.calls += 1
+        # Time spent waiting for a scheduler slot does not count as latency
+        await asyncio.sleep(self.queue_delay)
+        if self.slots is not None:
+            async with self.slots:
+                await self._request(output_file, on_start)
+        else:
+            await self._request(output_file, on_start)
+
+    async def _request(self, output_file, on_start):
+        on_start()
+        self.started += 1
+        await asyncio.sleep(self.delays.pop(0) if self.delays else 0.0)
+        if self.error:
+            raise self.error
+        with open(output_file, "wb") as f:
+            f.write(self.name.encode())
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read().decode()
+
+def _run_lines(chain, tmp_path, count):
+    async def run():
+        return [await chain.synthesize("text", "Zeta", str(tmp_path / f"{i:03d}_Zeta.mp3"), label=f"line {i}")
+                for i in range(count)]
+    return asyncio.run(run())
+
+def test_breaker_routes_remaining_lines_after_repeated_failures(tmp_path):
+    """Test that a failing provider is tried only failure_threshold times, then skipped for every line."""
+    down = _FakeProvider("google", error=ConnectionError("unreachable"))
+    backup = _FakeProvider("gtts")
+    chain = ProviderChain([down, backup], failure_threshold=3)
+
+    assert _run_lines(chain, tmp_path, 10) == ["gtts"] * 10
+    assert down.calls == 3 and backup.calls == 10
+    assert chain.breakers["google"].state == "open" and chain.breakers["google"].trips == 1
+    assert _read(tmp_path / "009_Zeta.mp3") == "gtts"
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{i:03d}_Zeta.mp3" for i in range(10)]
+
+def test_breaker_stops_lines_already_queued_for_the_provider(tmp_path):
+    """Test that lines admitted together stop calling a provider whose breaker opens while they wait for a slot."""
+    async def run(chain):
+        return await asyncio.gather(*(
+            chain.synthesize("text", "Zeta", str(tmp_path / f"{i:03d}_Zeta.mp3"), label=f"line {i}")
+            for i in range(40)
+        ))
+
+    down = _FakeProvider("google", error=ConnectionError("unreachable"), delays=[0.01] * 40,
+                         slots=asyncio.Semaphore(2))
+    chain = ProviderChain([down, _FakeProvider("gtts")], failure_threshold=3)
+
+    assert asyncio.run(run(chain)) == ["gtts"] * 40
+    # Only the lines that got a slot before the third failure was recorded reach the provider
+    assert down.calls == 40 and down.started <= 3 + 2 * 2
+    assert chain.breakers["google"].trips == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{i:03d}_Zeta.mp3" for i in range(40)]
+
+def test_permanent_errors_trip_the_breaker_at_once(tmp_path):
+    """Test that missing credentials or a missing package skip the provider after one failure."""
+    unauthenticated = _FakeProvider("google", error=_AuthError("401 unauthenticated"))
+    missing = _FakeProvider("edge-tts", error=ProviderUnavailable("edge-tts is not installed"))
+    chain = ProviderChain([unauthenticated, missing, _FakeProvider("gtts")])
+
+    assert _run_lines(chain, tmp_path, 5) == ["gtts"] * 5
+    assert unauthenticated.calls == 1 and missing.calls == 1
+
+def test_open_breaker_lets_one_probe_through_after_reset():
+    """Test the open -> half-open -> closed cycle with a single probe."""
+    now = [0.0]
+    breaker = CircuitBreaker("google", failure_threshold=2, reset_seconds=60, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.record_failure() is True
+    assert not breaker.allow()
+
+    now[0] = 61.0
+    assert breaker.state == "half_open"
+    assert breaker.allow() and not breaker.allow()
+    # A failed probe opens the breaker again for another reset period
+    assert breaker.record_failure() is True
+    assert breaker.state == "open"
+    now[0] = 122.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+def test_slow_request_is_hedged_and_the_faster_backup_wins(tmp_path):
+    """Test that a request past the primary's p95 is raced against the backup provider."""
+    primary = _FakeProvider("google", delays=[0.01, 0.01, 0.01, 1.0])
+    backup = _FakeProvider("edge-tts")
+    chain = ProviderChain([primary, backup], hedge=True, hedge_min_samples=3)
+
+    results = _run_lines(chain, tmp_path, 4)
+
+    assert results == ["google", "google", "google", "edge-tts"]
+    assert chain.hedged == 1 and chain.hedge_wins == 1
+    assert _read(tmp_path / "003_Zeta.mp3") == "edge-tts"
+    assert "1 hedged requests, 1 won by the backup" in chain.report()
+
+def test_hedging_ignores_time_spent_queued(tmp_path):
+    """Test that the p95 clock starts when the provider starts the request, not when it was queued."""
+    primary = _FakeProvider("google", delays=[0.01] * 4)
+    chain = ProviderChain([primary, _FakeProvider("edge-tts")], hedge=True, hedge_min_samples=3)
+    _run_lines(chain, tmp_path, 3)
+
+    primary.queue_delay = 0.3
+    assert _run_lines(chain, tmp_path, 1) == ["google"]
+    assert chain.hedged == 0
+
+def test_line_fails_only_when_every_provider_fails(tmp_path):
+    """Test that generate_audio_for_line reports failure with an empty path and leaves no partial files."""
+    chain = ProviderChain([_FakeProvider("google", error=ConnectionError("down")),
+                           _FakeProvider("gtts", error=ConnectionError("down too"))])
+
+    output = asyncio.run(generate_audio_for_line("Hello", "Zeta", 0, str(tmp_path), providers=chain))
+
+    assert output == ""
+    assert os.listdir(tmp_path) == []
+
+def test_only_google_clips_report_durations(tmp_path):
+    """Test that fallback clips are left out of the durations used to calibrate the estimator."""
+    from src.audio_generator import GOOGLE_MP3_BITRATE
+    google = _FakeProvider("google", delays=[0.0, 0.0])
+    chain = ProviderChain([google, _FakeProvider("gtts")])
+    durations = {}
+
+    asyncio.run(generate_audio_for_line("Hi", "Zeta", 0, str(tmp_path), providers=chain, durations=durations))
+    google.error = ConnectionError("down")
+    asyncio.run(generate_audio_for_line("Hi", "Quill", 1, str(tmp_path), providers=chain, durations=durations))
+
+    assert durations == {0: len("google") * 8 / GOOGLE_MP3_BITRATE}
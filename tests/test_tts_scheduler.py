@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+import pytest
+from google.api_core import exceptions
+from src.tts_scheduler import TTSScheduler, is_quota_error
+
+async def _no_sleep(seconds):
+    pass
+
+def test_quota_errors_are_recognized():
+    """Test that 429/503 answers count as quota errors and others do not."""
+    assert is_quota_error(exceptions.ResourceExhausted("quota"))
+    assert is_quota_error(exceptions.ServiceUnavailable("busy"))
+    assert not is_quota_error(exceptions.InvalidArgument("bad ssml"))
+    assert not is_quota_error(ValueError("boom"))
+
+def test_never_more_requests_in_flight_than_the_limit():
+    """Test that concurrent lines are capped at max_concurrency."""
+    scheduler = TTSScheduler(max_concurrency=3)
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def synthesize():
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.01)
+        with lock:
+            state["active"] -= 1
+
+    async def run_all():
+        await asyncio.gather(*(scheduler.run(synthesize, cost=10) for _ in range(12)))
+
+    asyncio.run(run_all())
+    assert state["peak"] == 3
+    assert scheduler.requests == 12 and scheduler.characters == 120
+
+def test_waiting_lines_are_dispatched_longest_first():
+    """Test that free slots go to the longest waiting line."""
+    scheduler = TTSScheduler(max_concurrency=1)
+    order = []
+
+    async def run_all():
+        costs = [5, 40, 10, 80, 20]
+        await asyncio.gather(*(
+            scheduler.run(lambda cost=cost: order.append(cost), cost=cost) for cost in costs
+        ))
+
+    asyncio.run(run_all())
+    # The first line takes the free slot; everything queued behind it goes by length
+    assert order == [5, 80, 40, 20, 10]
+
+def test_quota_errors_back_off_shrink_the_limit_and_retry():
+    """Test that a 429 halves the concurrency, the line is retried and the limit grows back on success."""
+    scheduler = TTSScheduler(max_concurrency=4, base_delay=0.01, sleep=_no_sleep)
+    calls = {"n": 0}
+
+    def flaky():
+        calls["n"] += 1
+        if calls["n"] <= 2:
+            raise exceptions.ResourceExhausted("quota exceeded")
+        return "audio"
+
+    assert asyncio.run(scheduler.run(flaky, cost=50)) == "audio"
+    assert calls["n"] == 3
+    assert scheduler.quota_errors == 2
+    # 4 -> 2 -> 1 on the errors, back to 2 after the first success
+    assert scheduler.limit == 2
+
+    for _ in range(3):
+        asyncio.run(scheduler.run(lambda: None, cost=1))
+    assert scheduler.limit == 3
+
+def test_other_errors_and_exhausted_retries_are_raised():
+    """Test that non-quota errors are not retried and quota errors give up after max_retries."""
+    scheduler = TTSScheduler(max_concurrency=2, max_retries=2, base_delay=0.01, sleep=_no_sleep)
+    attempts = {"n": 0}
+
+    def invalid():
+        attempts["n"] += 1
+        raise exceptions.InvalidArgument("bad input")
+
+    def always_limited():
+        raise exceptions.ResourceExhausted("quota exceeded")
+
+    with pytest.raises(exceptions.InvalidArgument):
+        asyncio.run(scheduler.run(invalid, cost=10))
+    assert attempts["n"] == 1
+    with pytest.raises(exceptions.ResourceExhausted):
+        asyncio.run(scheduler.run(always_limited, cost=10))
+    assert scheduler.failures == 2 and scheduler.quota_errors == 2
+
+def test_metrics_report_throughput_and_tail_latency():
+    """Test that the report includes characters per second and latency percentiles."""
+    scheduler = TTSScheduler(max_concurrency=2)
+
+    async def run_all():
+        await asyncio.gather(*(scheduler.run(lambda: time.sleep(0.005), cost=100) for _ in range(4)))
+
+    asyncio.run(run_all())
+    metrics = scheduler.metrics()
+    assert metrics["chars_per_second"] > 0
+    assert 0 < metrics["p50_latency"] <= metrics["p95_latency"] <= metrics["max_latency"]
+    assert "chars/s" in scheduler.report() and "p99" in scheduler.report()
@@ -0,0 +1,123 @@
+import asyncio
+from conftest import FakeClock
+from src.tweet_outbox import OutboxWorker, PermanentPostError, PostResult, RateLimited, TweetOutbox
+
+class _FakeTwitter:
+    """Local stand-in for the X API: answers with IDs and rate-limit info, or scripted errors."""
+
+    def __init__(self, clock, errors=None, remaining=None):
+        self.clock = clock
+        self.errors = dict(errors or {})
+        self.remaining = remaining
+        self.posts = []
+        self.calls = 0
+
+    def create_tweet(self, text, in_reply_to_tweet_id=None):
+        call = self.calls
+        self.calls += 1
+        if call in self.errors:
+            raise self.errors.pop(call)
+        self.posts.append((text, in_reply_to_tweet_id))
+        remaining = None if self.remaining is None else self.remaining - len(self.posts)
+        return PostResult(tweet_id=f"id{len(self.posts)}", remaining=remaining, reset_at=self.clock.now + 900)
+
+def _worker(tmp_path, api, clock, **kwargs):
+    tmp_path.mkdir(exist_ok=True)
+    outbox = TweetOutbox(db_path=str(tmp_path / "outbox.db"))
+    return outbox, OutboxWorker(outbox, api, clock=clock, sleep=clock.async_sleep, **kwargs)
+
+def test_thread_is_posted_as_replies_with_paced_gaps(tmp_path):
+    """Test that each tweet replies to the previous one, with the minimum gap in between."""
+    clock = FakeClock(now=1_000.0)
+    api = _FakeTwitter(clock)
+    outbox, worker = _worker(tmp_path, api, clock)
+    thread_id = outbox.enqueue(["one", "two", "x" * 300], reply_to="root")
+
+    assert asyncio.run(worker.drain()) == 3
+    assert api.posts == [("one", "root"), ("two", "id1"), ("x" * 277 + "...", "id2")]
+    assert clock.sleeps == [1.0, 1.0]
+    assert outbox.thread(thread_id)["status"] == "done"
+
+def test_partially_posted_thread_resumes_after_a_failure(tmp_path):
+    """Test that a transient failure keeps posted IDs and the next run continues from there."""
+    clock = FakeClock(now=1_000.0)
+    api = _FakeTwitter(clock, errors={1: ConnectionError("reset by peer")})
+    outbox, worker = _worker(tmp_path, api, clock, base_retry=30)
+    thread_id = outbox.enqueue(["one", "two", "three"])
+
+    assert asyncio.run(worker.drain()) == 1
+    thread = outbox.thread(thread_id)
+    assert thread["status"] == "pending" and thread["attempts"] == 1
+    assert [t["tweet_id"] for t in thread["tweets"]] == ["id1", None, None]
+    assert outbox.due(clock.now) == []
+
+    # A later run (new worker, same database) picks the thread up where it stopped
+    clock.now += 31
+    outbox2, worker2 = _worker(tmp_path, api, clock)
+    assert asyncio.run(worker2.drain()) == 2
+    assert api.posts[1:] == [("two", "id1"), ("three", "id2")]
+    assert outbox2.thread(thread_id)["status"] == "done"
+
+def test_rate_limit_headers_pause_or_defer_posting(tmp_path):
+    """Test that an exhausted window is waited out when short, and deferred when too long."""
+    clock = FakeClock(now=1_000.0)
+    api = _FakeTwitter(clock, remaining=1)
+    outbox, worker = _worker(tmp_path, api, clock)
+    first = outbox.enqueue(["a", "b"])
+
+    assert asyncio.run(worker.drain(max_wait=60)) == 1
+    thread = outbox.thread(first)
+    assert thread["status"] == "pending" and thread["next_attempt_at"] == 1_900.0
+    assert clock.sleeps == []
+
+    clock2 = FakeClock(now=1_000.0)
+    api2 = _FakeTwitter(clock2, errors={0: RateLimited(clock2.now + 5)})
+    outbox2, worker2 = _worker(tmp_path / "second", api2, clock2)
+    second = outbox2.enqueue(["c"])
+    assert asyncio.run(worker2.drain(max_wait=60)) == 1
+    assert clock2.sleeps == [5.0]
+    assert outbox2.thread(second)["status"] == "done"
+
+def test_permanent_errors_fail_the_thread_without_retrying(tmp_path):
+    """Test that a 401/403-style failure marks the thread failed and moves on."""
+    clock = FakeClock(now=1_000.0)
+    api = _FakeTwitter(clock, errors={0: PermanentPostError("403")})
+    outbox, worker = _worker(tmp_path, api, clock)
+    failed = outbox.enqueue(["nope"])
+    ok = outbox.enqueue(["yes"])
+
+    asyncio.run(worker.drain())
+    assert outbox.thread(failed)["status"] == "failed"
+    assert outbox.thread(ok)["status"] == "done"
+    assert outbox.stats() == {"done": 1, "failed": 1}
+
+def test_post_tweets_is_sync_only_and_closes_its_own_outbox(tmp_path, monkeypatch):
+    """Test that post_tweets refuses to run inside an event loop and closes the outbox it opened."""
+    import pytest
+    import src.twitter_poster as twitter_poster
+
+    opened = []
+
+    class _TrackedOutbox(TweetOutbox):
+        def __init__(self):
+            super().__init__(db_path=str(tmp_path / "outbox.db"))
+            self.closed = False
+            opened.append(self)
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    api = _FakeTwitter(FakeClock(now=1_000.0))
+    monkeypatch.setattr(twitter_poster, "get_twitter_api", lambda: api)
+    monkeypatch.setattr(twitter_poster, "TweetOutbox", _TrackedOutbox)
+
+    assert twitter_poster.post_tweets(["one"], reply_to_status_id="root")
+    assert api.posts == [("one", "root")]
+    assert len(opened) == 1 and opened[0].closed
+
+    async def from_a_loop():
+        twitter_poster.post_tweets(["three"])
+    with pytest.raises(RuntimeError):
+        asyncio.run(from_a_loop())
+    assert len(opened) == 1